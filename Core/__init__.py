@@ -0,0 +1,8 @@
+#!/usr/bin/env python3
+# __init__.py
+"""
+Top-level package for PyShell's core subsystems
+"""
+import os
+
+PYSHELL_DIR = os.environ.get("PYSHELL_HOME", os.path.join(os.path.expanduser("~"), ".pyshell"))
@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""Concurrent boot pipeline with an on-disk boot-facts cache"""
+import json
+import os
+import platform
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Any, Callable, Dict, List, Optional
+
+from Core import PYSHELL_DIR
+
+BOOT_CACHE_PATH = os.path.join(PYSHELL_DIR, "boot_facts.json")
+BOOT_CACHE_TTL = 24 * 60 * 60
+
+
+def machine_key() -> str:
+    """
+    Builds boot-facts cache key from platform.uname()
+    :return: cache key
+    """
+    return "|".join(platform.uname())
+
+
+class BootStage:
+    """Single boot step"""
+    def __init__(self, name: str, function: Callable[[], Any], cacheable: bool = False):
+        self.name = name
+        self.function = function
+        self.cacheable = cacheable
+
+
+class BootPipeline:
+    """Runs boot stages concurrently, serving cacheable stages from the boot-facts cache"""
+    def __init__(self, cache_path: str = BOOT_CACHE_PATH, ttl: float = BOOT_CACHE_TTL):
+        self.cache_path = cache_path
+        self.ttl = ttl
+        self.stages: List[BootStage] = []
+        self.results: Dict[str, Any] = {}
+        self.timings: Dict[str, float] = {}
+        self.cached: List[str] = []
+
+    def add_stage(self, name: str, function: Callable[[], Any], cacheable: bool = False) -> None:
+        """
+        Adds stage to pipeline
+        :param name: stage name
+        :param function: stage function, its return value is the stage's fact
+        :param cacheable: store result in boot-facts cache (default: False)
+        """
+        self.stages.append(BootStage(name, function, cacheable))
+
+    def _read_cache(self) -> Dict[str, Any]:
+        try:
+            with open(self.cache_path, "r") as cache_file:
+                cache = json.load(cache_file)
+        except (OSError, ValueError):
+            return {}
+        return cache if isinstance(cache, dict) else {}
+
+    def _load_facts(self) -> Dict[str, Any]:
+        entry = self._read_cache().get(machine_key())
+        if not entry or time.time() - entry.get("timestamp", 0) > self.ttl:
+            return {}
+        return entry.get("facts", {})
+
+    def _store_facts(self, facts: Dict[str, Any]) -> None:
+        cache = self._read_cache()
+        cache[machine_key()] = {"timestamp": time.time(), "facts": facts}
+        try:
+            os.makedirs(os.path.dirname(self.cache_path), exist_ok=True)
+            descriptor, temp_path = tempfile.mkstemp(dir=os.path.dirname(self.cache_path), suffix=".tmp")
+            with os.fdopen(descriptor, "w") as temp_file:
+                json.dump(cache, temp_file)
+            os.replace(temp_path, self.cache_path)
+        except OSError:
+            pass
+
+    def _timed(self, stage: BootStage) -> Any:
+        started = time.perf_counter()
+        try:
+            return stage.function()
+        finally:
+            self.timings[stage.name] = time.perf_counter() - started
+
+    def run(self, on_complete: Optional[Callable[[str, Any], None]] = None, refresh: bool = False) -> Dict[str, Any]:
+        """
+        Runs all stages
+        :param on_complete: called with (stage name, result) as each stage finishes
+        :param refresh: ignore boot-facts cache (default: False)
+        :return: results by stage name
+        """
+        facts = {} if refresh else self._load_facts()
+        pending = []
+        for stage in self.stages:
+            if stage.cacheable and stage.name in facts:
+                self.results[stage.name] = facts[stage.name]
+                self.timings[stage.name] = 0.0
+                self.cached.append(stage.name)
+                if on_complete is not None:
+                    on_complete(stage.name, facts[stage.name])
+            else:
+                pending.append(stage)
+        if pending:
+            with ThreadPoolExecutor(max_workers=len(pending)) as pool:
+                futures = {pool.submit(self._timed, stage): stage for stage in pending}
+                for future in as_completed(futures):
+                    stage = futures[future]
+                    self.results[stage.name] = future.result()
+                    if on_complete is not None:
+                        on_complete(stage.name, self.results[stage.name])
+        if any(stage.cacheable and stage.name not in self.cached for stage in self.stages):
+            self._store_facts({stage.name: self.results[stage.name] for stage in self.stages if stage.cacheable})
+        return self.results
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""Tab completion of commands, variables and paths from cached indexes"""
+import bisect
+import os
+import threading
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from Core.expansion import DirectoryCache, Entry, expand_user
+from Core.external import CommandHash
+
+COMMAND_BREAKS = ";&|"
+VARIABLE_COMMANDS = ["get", "set"]
+
+
+def prefixed(names: Sequence, prefix: str) -> Sequence:
+    """
+    Selects names starting with prefix from sorted sequence
+    :param names: sorted names (or Entry tuples sorted by name)
+    :param prefix: prefix
+    :return: matching slice of names
+    """
+    if not prefix:
+        return names
+    if names and isinstance(names[0], tuple):
+        low = bisect.bisect_left(names, (prefix,))
+        high = bisect.bisect_left(names, (prefix + "\U0010ffff",))
+    else:
+        low = bisect.bisect_left(names, prefix)
+        high = bisect.bisect_left(names, prefix + "\U0010ffff")
+    return names[low:high]
+
+
+class Completer:
+    """
+    Completes command line words for readline
+    Command names and directory listings come from caches validated by mtime and warmed on a background thread
+    """
+    def __init__(self, command_names: Callable[[], Iterable[str]], variables: Dict[str, object], command_hash: CommandHash, directory_cache: DirectoryCache):
+        self.command_names = command_names
+        self.variables = variables
+        self.command_hash = command_hash
+        self.directory_cache = directory_cache
+        self._commands: Tuple[str, ...] = ()
+        self._commands_key: Optional[tuple] = None
+        self._matches: List[str] = []
+        self._warming: Optional[threading.Thread] = None
+
+    def commands(self) -> Tuple[str, ...]:
+        """
+        Sorted builtin, plugin and PATH command names, rebuilt only when one of the sources changed
+        PATH names are compared by identity, the frozenset is kept so its id can't be reused by a newer listing
+        :return: command names
+        """
+        own = tuple(self.command_names())
+        path_names = self.command_hash.names()
+        if self._commands_key is None or self._commands_key[0] != own or self._commands_key[1] is not path_names:
+            self._commands = tuple(sorted(set(own) | path_names))
+            self._commands_key = (own, path_names)
+        return self._commands
+
+    def warm(self) -> None:
+        """Refreshes command names and current directory listing on background thread"""
+        if self._warming is not None and self._warming.is_alive():
+            return
+        directory = os.getcwd()
+        self._warming = threading.Thread(target=self._warm, args=(directory,), name="pyshell-completion", daemon=True)
+        self._warming.start()
+
+    def _warm(self, directory: str) -> None:
+        self.commands()
+        self.directory_cache.listing(directory)
+
+    def paths(self, text: str, directories_only: bool = False) -> List[str]:
+        """
+        Completes path
+        :param text: path typed so far
+        :param directories_only: only complete directories (default: False)
+        :return: completions, directories end with path separator
+        """
+        directory, base = os.path.split(text)
+        listed = directory
+        if listed.startswith("~"):
+            listed = expand_user(listed, str(self.variables.get("HOME_PATH") or os.path.expanduser("~")))
+        entries: Sequence[Entry] = prefixed(self.directory_cache.listing(listed or "."), base)
+        head = os.path.join(directory, "") if directory else ""
+        return [
+            head + entry.name + os.sep if entry.is_dir else head + entry.name
+            for entry in entries
+            if (base.startswith(".") or not entry.name.startswith(".")) and (entry.is_dir or not directories_only)
+        ]
+
+    def matches(self, before: str, text: str) -> List[str]:
+        """
+        Completes word
+        :param before: command line before word
+        :param text: word typed so far
+        :return: completions
+        """
+        if text.startswith("$"):
+            return [f"${name}$" for name in sorted(self.variables) if name.startswith(text[1:])]
+        stripped = before.rstrip()
+        command_start = max(stripped.rfind(character) for character in COMMAND_BREAKS) + 1
+        words = stripped[command_start:].split()
+        if not words:
+            if os.sep in text:
+                return self.paths(text)
+            return list(prefixed(self.commands(), text))
+        if words[0] in VARIABLE_COMMANDS and len(words) == 1:
+            return [name for name in sorted(self.variables) if name.startswith(text)]
+        return self.paths(text, directories_only=words[0] == "cd")
+
+    def complete(self, text: str, state: int) -> Optional[str]:
+        """
+        readline completer
+        :param text: word typed so far
+        :param state: index of requested completion
+        :return: completion, None when there are no more
+        """
+        if state == 0:
+            import readline
+            line = readline.get_line_buffer()
+            self._matches = self.matches(line[:readline.get_begidx()], text)
+        return self._matches[state] if state < len(self._matches) else None
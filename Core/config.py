@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""Write-behind configuration store with atomic saves"""
+import atexit
+import json
+import os
+import tempfile
+import threading
+from typing import Any, Dict, Iterable, Optional, Set, Tuple
+
+from Core import PYSHELL_DIR
+
+CONFIG_PATH = os.path.join(PYSHELL_DIR, "conf.json")
+FLUSH_DELAY = 0.5
+
+
+class ConfigStore:
+    """
+    Configuration kept in memory and saved to a fixed path
+    Changes are marked dirty and flushed after a short delay, so several changes cost one write
+    Session keys live only in memory, they are neither written nor overwritten by other sessions' saves
+    """
+    def __init__(self, defaults: Dict[str, Any], path: str = CONFIG_PATH, flush_delay: float = FLUSH_DELAY, session_keys: Iterable[str] = ()):
+        self.path = path
+        self.flush_delay = flush_delay
+        self.session_keys = frozenset(session_keys)
+        self.values: Dict[str, Any] = dict(defaults)
+        self._saved: Dict[str, Any] = {}
+        self._dirty: Set[str] = set()
+        self._signature: Optional[Tuple[int, int]] = None
+        self._timer: Optional[threading.Timer] = None
+        self._lock = threading.RLock()
+        atexit.register(self._flush_quietly)
+
+    def _stat(self) -> Optional[Tuple[int, int]]:
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def exists(self) -> bool:
+        """
+        Detects if configuration file exists
+        :return: Result bool
+        """
+        return os.path.exists(self.path)
+
+    def load(self) -> bool:
+        """
+        Reads configuration file if it changed since last read or write, unsaved changes are kept
+        :return: True if file was read
+        :raises ValueError: file is not a valid configuration
+        """
+        with self._lock:
+            signature = self._stat()
+            if signature is None or signature == self._signature:
+                return False
+            with open(self.path, "r") as conf_file:
+                data = json.load(conf_file)
+            if not isinstance(data, dict):
+                raise ValueError("Configuration must be a JSON object")
+            self._signature = signature
+            self._saved = data
+            for key, value in data.items():
+                if key not in self._dirty and key not in self.session_keys:
+                    self.values[key] = value
+            return True
+
+    def set(self, key: str, value: Any) -> None:
+        """
+        Changes value and schedules write-behind flush
+        :param key: variable name
+        :param value: new value
+        """
+        with self._lock:
+            self.values[key] = value
+            if key in self.session_keys:
+                return
+            self._dirty.add(key)
+            if self._timer is None:
+                self._timer = threading.Timer(self.flush_delay, self._flush_quietly)
+                self._timer.daemon = True
+                self._timer.start()
+
+    def save(self) -> None:
+        """Marks all values dirty and writes them immediately"""
+        with self._lock:
+            self._dirty.update(key for key in self.values if key not in self.session_keys)
+        self.flush()
+
+    def flush(self) -> None:
+        """
+        Writes dirty values atomically (temporary file and rename)
+        Keys not changed here keep their saved values, including changes made by other sessions
+        :raises OSError: file can't be written
+        """
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            if not self._dirty:
+                return
+            try:
+                self.load()
+            except (OSError, ValueError):
+                pass
+            data = dict(self._saved)
+            data.update((key, self.values[key]) for key in self._dirty)
+            for key in self.session_keys:
+                data.pop(key, None)
+            directory = os.path.dirname(self.path)
+            os.makedirs(directory, exist_ok=True)
+            descriptor, temp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+            try:
+                with os.fdopen(descriptor, "w") as temp_file:
+                    json.dump(data, temp_file)
+                    temp_file.flush()
+                    os.fsync(temp_file.fileno())
+                os.replace(temp_path, self.path)
+            except BaseException:
+                try:
+                    os.remove(temp_path)
+                except OSError:
+                    pass
+                raise
+            self._signature = self._stat()
+            self._saved = data
+            self._dirty.clear()
+
+    def _flush_quietly(self) -> None:
+        try:
+            self.flush()
+        except OSError:
+            pass
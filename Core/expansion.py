@@ -0,0 +1,229 @@
+#!/usr/bin/env python3
+"""Tilde, variable ($NAME$) and glob expansion of parsed words"""
+import collections
+import fnmatch
+import os
+import re
+import threading
+from functools import lru_cache
+from typing import Dict, Iterator, List, NamedTuple, Optional, Pattern, Tuple
+
+from Core.parser import Word
+
+DIRECTORY_CACHE_SIZE = 256
+VARIABLE_TOKEN = re.compile(r"\$([A-Za-z_][A-Za-z0-9_]*)\$")
+GLOB_MAGIC = re.compile(r"[*?[]")
+
+
+class Entry(NamedTuple):
+    """Directory entry from os.scandir"""
+    name: str
+    is_dir: bool
+    is_link: bool
+
+
+class DirectoryCache:
+    """
+    Directory listings shared by expansion and completion
+    Directories are listed with os.scandir once and listed again only when their mtime changes
+    """
+    def __init__(self, max_directories: int = DIRECTORY_CACHE_SIZE):
+        self.max_directories = max_directories
+        self._listings: "collections.OrderedDict[str, Tuple[int, Tuple[Entry, ...]]]" = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def listing(self, directory: str) -> Tuple[Entry, ...]:
+        """
+        Lists directory
+        :param directory: directory path, relative paths are resolved from current working directory
+        :return: entries sorted by name, empty if directory can't be read
+        """
+        path = os.path.join(os.getcwd(), directory or ".")
+        try:
+            mtime = os.stat(path).st_mtime_ns
+        except OSError:
+            return ()
+        with self._lock:
+            cached = self._listings.get(path)
+            if cached is not None and cached[0] == mtime:
+                self._listings.move_to_end(path)
+                return cached[1]
+        entries = []
+        try:
+            with os.scandir(path) as iterator:
+                for entry in iterator:
+                    try:
+                        is_dir = entry.is_dir()
+                    except OSError:
+                        is_dir = False
+                    entries.append(Entry(entry.name, is_dir, entry.is_symlink()))
+        except OSError:
+            return ()
+        entries.sort()
+        listing = tuple(entries)
+        with self._lock:
+            self._listings[path] = (mtime, listing)
+            self._listings.move_to_end(path)
+            while len(self._listings) > self.max_directories:
+                self._listings.popitem(last=False)
+        return listing
+
+    def clear(self) -> None:
+        """Forgets all listings"""
+        with self._lock:
+            self._listings.clear()
+
+
+@lru_cache(maxsize=256)
+def compile_template(text: str) -> Tuple[Tuple[Optional[str], str], ...]:
+    """
+    Compiles text with variable references into segments
+    :param text: text with $NAME$ references
+    :return: segments (None, text) for static text or (name, reference) for variables
+    """
+    segments = []
+    position = 0
+    for match in VARIABLE_TOKEN.finditer(text):
+        if match.start() > position:
+            segments.append((None, text[position:match.start()]))
+        segments.append((match.group(1), match.group(0)))
+        position = match.end()
+    if position < len(text):
+        segments.append((None, text[position:]))
+    return tuple(segments)
+
+
+def substitute(text: str, variables: Dict[str, object]) -> str:
+    """
+    Replaces $NAME$ references with variables, unknown names are kept as typed
+    :param text: text to expand
+    :param variables: variables
+    :return: expanded text
+    """
+    if "$" not in text:
+        return text
+    parts = []
+    for name, value in compile_template(text):
+        if name is None:
+            parts.append(value)
+        else:
+            parts.append(str(variables[name]) if name in variables else value)
+    return "".join(parts)
+
+
+def expand_user(text: str, home: str) -> str:
+    """
+    Expands leading ~ (home) and ~user
+    :param text: text starting with ~
+    :param home: directory used for ~
+    :return: expanded text
+    """
+    if text == "~" or text.startswith("~" + os.sep):
+        return home + text[1:]
+    return os.path.expanduser(text)
+
+
+def escape_glob(text: str) -> str:
+    """
+    Escapes glob characters so they match literally
+    :param text: text
+    :return: pattern matching text
+    """
+    return GLOB_MAGIC.sub(lambda match: f"[{match.group(0)}]", text)
+
+
+@lru_cache(maxsize=256)
+def _component_pattern(component: str) -> Pattern:
+    return re.compile(fnmatch.translate(component))
+
+
+def _join(directory: str, name: str) -> str:
+    return os.path.join(directory, name) if directory else name
+
+
+def _walk(directory: str, cache: DirectoryCache) -> Iterator[str]:
+    yield directory
+    for entry in cache.listing(directory):
+        if entry.is_dir and not entry.is_link and not entry.name.startswith("."):
+            yield from _walk(_join(directory, entry.name), cache)
+
+
+def _walk_entries(directory: str, cache: DirectoryCache) -> Iterator[str]:
+    for entry in cache.listing(directory):
+        if not entry.name.startswith("."):
+            path = _join(directory, entry.name)
+            yield path
+            if entry.is_dir and not entry.is_link:
+                yield from _walk_entries(path, cache)
+
+
+def glob(pattern: str, cache: DirectoryCache) -> List[str]:
+    """
+    Finds paths matching pattern using cached directory listings
+    * ? and [...] match within a path component, ** matches any number of directories
+    Names starting with . are only matched by components starting with .
+    :param pattern: glob pattern
+    :param cache: directory listings
+    :return: sorted matching paths
+    """
+    root = os.sep if pattern.startswith(os.sep) else ""
+    components = pattern.lstrip(os.sep).split(os.sep)
+    paths = [root]
+    for index, component in enumerate(components):
+        last = index == len(components) - 1
+        if component == "":
+            if last:
+                paths = [path + os.sep for path in paths if path and os.path.isdir(path)]
+            continue
+        if component in [".", ".."]:
+            paths = [_join(path, component) for path in paths]
+        elif component == "**":
+            if last:
+                paths = [match for path in paths for match in _walk_entries(path, cache)]
+            else:
+                paths = [match for path in paths for match in _walk(path, cache)]
+        else:
+            regex = _component_pattern(component)
+            hidden = component.startswith(".")
+            paths = [
+                _join(path, entry.name)
+                for path in paths
+                for entry in cache.listing(path)
+                if (last or entry.is_dir) and (hidden or not entry.name.startswith(".")) and regex.match(entry.name)
+            ]
+        if not paths:
+            break
+    return sorted(set(paths))
+
+
+def expand_word(word: Word, variables: Dict[str, object], cache: DirectoryCache) -> List[str]:
+    """
+    Expands word: leading ~, $NAME$ outside single quotes, then globs in unquoted text
+    :param word: parsed word
+    :param variables: variables, HOME_PATH is used for ~
+    :param cache: directory listings for globbing
+    :return: arguments, the expanded word if a glob matches nothing, none for unquoted empty words
+    """
+    texts = []
+    patterns = []
+    magic = False
+    for index, part in enumerate(word.parts):
+        text = part.text
+        if index == 0 and part.quote == "" and text.startswith("~"):
+            text = expand_user(text, str(variables.get("HOME_PATH") or os.path.expanduser("~")))
+        if part.quote != "'":
+            text = substitute(text, variables)
+        texts.append(text)
+        if part.quote == "" and GLOB_MAGIC.search(text):
+            magic = True
+            patterns.append(text)
+        else:
+            patterns.append(escape_glob(text))
+    value = "".join(texts)
+    if magic:
+        matches = glob("".join(patterns), cache)
+        if matches:
+            return matches
+    if value == "" and not word.quoted:
+        return []
+    return [value]
@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+"""External command lookup (hashed PATH) and process spawning"""
+import os
+import signal
+import subprocess
+import threading
+import time
+from typing import Dict, FrozenSet, List, Optional, Tuple
+
+VALIDATE_INTERVAL = 1.0
+
+
+class CommandHash:
+    """
+    Remembers where commands were found in PATH, like bash's hash
+    PATH directories are listed once (no stat per entry) and re-listed only when their mtime changes
+    """
+    def __init__(self, validate_interval: float = VALIDATE_INTERVAL):
+        self.validate_interval = validate_interval
+        self.hits: Dict[str, List] = {}
+        self._path = None
+        self._directories: List[str] = []
+        self._listings: Dict[str, Tuple[int, FrozenSet[str]]] = {}
+        self._validated = 0.0
+        self._names: Optional[FrozenSet[str]] = None
+        self._lock = threading.RLock()
+
+    def reset(self) -> None:
+        """Forgets all remembered commands and directory listings"""
+        with self._lock:
+            self.hits.clear()
+            self._listings.clear()
+            self._names = None
+            self._path = None
+
+    def _listing(self, directory: str) -> FrozenSet[str]:
+        if directory not in self._listings:
+            try:
+                mtime = os.stat(directory).st_mtime_ns
+                names = frozenset(os.listdir(directory))
+            except OSError:
+                mtime, names = -1, frozenset()
+            self._listings[directory] = (mtime, names)
+        return self._listings[directory][1]
+
+    def _validate(self) -> None:
+        path = os.environ.get("PATH", os.defpath)
+        if path != self._path:
+            self.reset()
+            self._path = path
+            self._directories = [directory or "." for directory in path.split(os.pathsep)]
+            self._validated = time.monotonic()
+            return
+        now = time.monotonic()
+        if now - self._validated < self.validate_interval:
+            return
+        self._validated = now
+        changed = False
+        for directory, (mtime, _) in list(self._listings.items()):
+            try:
+                current = os.stat(directory).st_mtime_ns
+            except OSError:
+                current = -1
+            if current != mtime:
+                del self._listings[directory]
+                changed = True
+        if changed:
+            self.hits.clear()
+            self._names = None
+
+    def lookup(self, name: str) -> Optional[str]:
+        """
+        Finds program in PATH
+        :param name: command name or path
+        :return: program path, None if not found
+        """
+        if os.sep in name or (os.altsep and os.altsep in name):
+            return name if os.path.isfile(name) and os.access(name, os.X_OK) else None
+        with self._lock:
+            self._validate()
+            hit = self.hits.get(name)
+            if hit is not None:
+                hit[1] += 1
+                return hit[0]
+            for directory in self._directories:
+                if name in self._listing(directory):
+                    program = os.path.join(directory, name)
+                    if os.path.isfile(program) and os.access(program, os.X_OK):
+                        self.hits[name] = [program, 1]
+                        return program
+        return None
+
+    def names(self) -> FrozenSet[str]:
+        """
+        Lists names in PATH directories (not checked for being executable)
+        :return: names
+        """
+        with self._lock:
+            self._validate()
+            if self._names is None:
+                self._names = frozenset().union(*(self._listing(directory) for directory in self._directories))
+            return self._names
+
+
+def exit_code(wait_status: int) -> int:
+    """
+    Converts os.waitpid status to exit code, 128 + signal number for signals like POSIX shells
+    :param wait_status: status from os.waitpid
+    :return: exit code
+    """
+    if os.WIFSIGNALED(wait_status):
+        return 128 + os.WTERMSIG(wait_status)
+    return os.WEXITSTATUS(wait_status)
+
+
+class SpawnedProcess:
+    """Process started by os.posix_spawn"""
+    def __init__(self, pid: int):
+        self.pid = pid
+        self.returncode = None
+
+    def poll(self) -> Optional[int]:
+        """
+        Checks if process exited
+        :return: exit code, None if still running
+        """
+        if self.returncode is None:
+            pid, wait_status = os.waitpid(self.pid, os.WNOHANG)
+            if pid != 0:
+                self.returncode = exit_code(wait_status)
+        return self.returncode
+
+    def wait(self) -> int:
+        """
+        Waits for process to exit
+        :return: exit code
+        """
+        if self.returncode is None:
+            while True:
+                try:
+                    _, wait_status = os.waitpid(self.pid, 0)
+                    break
+                except InterruptedError:
+                    continue
+            self.returncode = exit_code(wait_status)
+        return self.returncode
+
+    def send_signal(self, signal_number: int) -> None:
+        """
+        Sends signal to process
+        :param signal_number: signal
+        """
+        if self.returncode is None:
+            os.kill(self.pid, signal_number)
+
+
+def spawn(argv: List[str], stdin: Optional[int], stdout: Optional[int], stderr: Optional[int], process_group: Optional[int] = None):
+    """
+    Starts external process, using os.posix_spawn where available
+    SIGPIPE and SIGXFSZ, ignored by Python, are restored to default so "yes | head" ends quietly
+    :param argv: program path and arguments
+    :param stdin: file descriptor for stdin, None to inherit
+    :param stdout: file descriptor for stdout, None to inherit
+    :param stderr: file descriptor for stderr, subprocess.STDOUT to join stdout, None to inherit
+    :param process_group: process group to join, 0 for a new group, None to stay in shell's group
+    :return: started process (SpawnedProcess or subprocess.Popen)
+    """
+    if not hasattr(os, "posix_spawn"):
+        return subprocess.Popen(argv, stdin=stdin, stdout=stdout, stderr=stderr, start_new_session=process_group is not None)
+    file_actions = []
+    if stdin is not None:
+        file_actions.append((os.POSIX_SPAWN_DUP2, stdin, 0))
+    if stdout is not None:
+        file_actions.append((os.POSIX_SPAWN_DUP2, stdout, 1))
+    if stderr == subprocess.STDOUT:
+        file_actions.append((os.POSIX_SPAWN_DUP2, 1, 2))
+    elif stderr is not None:
+        file_actions.append((os.POSIX_SPAWN_DUP2, stderr, 2))
+    default_signals = [getattr(signal, name) for name in ("SIGPIPE", "SIGXFSZ") if hasattr(signal, name)]
+    if process_group is None:
+        return SpawnedProcess(os.posix_spawn(argv[0], argv, os.environ, file_actions=file_actions, setsigdef=default_signals))
+    return SpawnedProcess(os.posix_spawn(argv[0], argv, os.environ, file_actions=file_actions, setpgroup=process_group, setsigdef=default_signals))
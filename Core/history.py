@@ -0,0 +1,306 @@
+#!/usr/bin/env python3
+"""Persistent command history shared by sessions, kept in an mmapped file with an index for prefix search"""
+import contextlib
+import heapq
+import mmap
+import os
+import tempfile
+import threading
+import time
+from array import array
+from typing import Dict, Iterator, List, NamedTuple, Optional
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+from Core import PYSHELL_DIR
+
+HISTORY_PATH = os.path.join(PYSHELL_DIR, "history")
+HISTORY_MAX_ENTRIES = 1000000
+COMPACT_MIN_ENTRIES = 10000
+PREFIX_SCAN_RATIO = 64
+
+
+class Entry(NamedTuple):
+    """History entry"""
+    command: str
+    timestamp: float
+    status: int
+    duration: float
+    cwd: str
+
+
+def escape_field(text: str) -> str:
+    """
+    Escapes backslashes, tabs and newlines so field fits on one line
+    :param text: field text
+    :return: escaped text
+    """
+    return text.replace("\\", "\\\\").replace("\t", "\\t").replace("\n", "\\n")
+
+
+def unescape_field(text: str) -> str:
+    """
+    Reverses escape_field
+    :param text: escaped text
+    :return: field text
+    """
+    if "\\" not in text:
+        return text
+    characters = []
+    iterator = iter(text)
+    for character in iterator:
+        if character == "\\":
+            character = {"t": "\t", "n": "\n"}.get(next(iterator, ""), "\\")
+        characters.append(character)
+    return "".join(characters)
+
+
+def format_entry(entry: Entry) -> bytes:
+    """
+    Formats entry as history file line: command, timestamp, status, duration and cwd separated by tabs
+    :param entry: entry
+    :return: line
+    """
+    return f"{escape_field(entry.command)}\t{entry.timestamp:.3f}\t{entry.status}\t{entry.duration:.3f}\t{escape_field(entry.cwd)}\n".encode()
+
+
+def parse_entry(line: bytes) -> Optional[Entry]:
+    """
+    Parses history file line
+    :param line: line without newline
+    :return: entry, None if line is malformed
+    """
+    fields = line.decode(errors="replace").split("\t")
+    if len(fields) != 5:
+        return None
+    try:
+        return Entry(unescape_field(fields[0]), float(fields[1]), int(fields[2]), float(fields[3]), unescape_field(fields[4]))
+    except ValueError:
+        return None
+
+
+class History:
+    """
+    Append-only history file
+    Lines start with the command, so prefix search is a binary search over offsets sorted by command
+    (common prefixes are found faster by scanning newest lines) and substring search runs mmap.rfind
+    backwards from the newest entry
+    """
+    def __init__(self, path: str = HISTORY_PATH, max_entries: int = HISTORY_MAX_ENTRIES):
+        self.path = path
+        self.max_entries = max_entries
+        self.count = 0
+        self.opened = False
+        self._map: Optional[mmap.mmap] = None
+        self._index: Optional[array] = None
+        self._session: List[Entry] = []
+        self._lock = threading.RLock()
+        self._ready = threading.Event()
+
+    @contextlib.contextmanager
+    def _file_lock(self) -> Iterator[None]:
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        descriptor = os.open(self.path + ".lock", os.O_RDWR | os.O_CREAT, 0o600)
+        try:
+            if fcntl is not None:
+                fcntl.flock(descriptor, fcntl.LOCK_EX)
+            yield
+        finally:
+            os.close(descriptor)
+
+    def _map_file(self) -> None:
+        with self._lock:
+            if self._map is not None:
+                self._map.close()
+            self._map, self._index = None, None
+            self._session.clear()
+            self._ready.clear()
+            try:
+                with open(self.path, "rb") as history_file:
+                    if os.fstat(history_file.fileno()).st_size > 0:
+                        self._map = mmap.mmap(history_file.fileno(), 0, access=mmap.ACCESS_READ)
+            except OSError:
+                pass
+
+    def open(self, background: bool = True) -> None:
+        """
+        Maps history file and builds search index, compacting file if it grew too large
+        :param background: build index on daemon thread (default: True)
+        """
+        self.opened = True
+        self._map_file()
+        if background:
+            threading.Thread(target=self._prepare, name="pyshell-history", daemon=True).start()
+        else:
+            self._prepare()
+
+    def _prepare(self) -> None:
+        unique = self._build_index()
+        if self.count > self.max_entries or (self.count > COMPACT_MIN_ENTRIES and self.count > 2 * unique):
+            self.compact()
+
+    def _build_index(self) -> int:
+        with self._lock:
+            history_map = self._map
+        latest: Dict[bytes, int] = {}
+        count = 0
+        if history_map is not None:
+            position = 0
+            for line in history_map[:].split(b"\n"):
+                tab = line.find(b"\t")
+                if tab != -1:
+                    latest[line[:tab]] = position
+                    count += 1
+                position += len(line) + 1
+        index = array("Q", (latest[command] for command in sorted(latest)))
+        with self._lock:
+            if self._map is history_map:
+                self._index = index
+                self.count = count
+                self._ready.set()
+        return len(latest)
+
+    def _command_at(self, offset: int) -> bytes:
+        return self._map[offset:self._map.find(b"\t", offset)]
+
+    def _lower_bound(self, key: bytes) -> int:
+        low, high = 0, len(self._index)
+        while low < high:
+            middle = (low + high) // 2
+            if self._command_at(self._index[middle]) < key:
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    def _entry_at(self, offset: int) -> Optional[Entry]:
+        end = self._map.find(b"\n", offset)
+        return parse_entry(self._map[offset:end if end != -1 else len(self._map)])
+
+    def append(self, command: str, cwd: str, status: int, duration: float) -> None:
+        """
+        Appends entry to history file
+        :param command: command line
+        :param cwd: directory command ran in
+        :param status: exit status
+        :param duration: duration in seconds
+        """
+        entry = Entry(command, time.time(), status, duration, cwd)
+        line = format_entry(entry)
+        with self._file_lock():
+            descriptor = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o600)
+            try:
+                os.write(descriptor, line)
+            finally:
+                os.close(descriptor)
+            with self._lock:
+                self._session.append(entry)
+
+    def tail(self, count: int) -> List[Entry]:
+        """
+        Newest entries
+        :param count: number of entries
+        :return: entries, oldest first
+        """
+        with self._lock:
+            entries = self._session[-count:] if count else []
+            end = len(self._map) if self._map is not None else 0
+            while len(entries) < count and end > 0:
+                start = self._map.rfind(b"\n", 0, end - 1) + 1
+                entry = parse_entry(self._map[start:end].rstrip(b"\n"))
+                if entry is not None:
+                    entries.insert(0, entry)
+                end = start
+        return entries
+
+    def prefix_search(self, prefix: str, limit: int = 10) -> List[Entry]:
+        """
+        Finds commands starting with prefix
+        :param prefix: command prefix
+        :param limit: maximum number of results
+        :return: newest entry of each matching command, newest first
+        """
+        key = escape_field(prefix).encode()
+        with self._lock:
+            results = self._unique(entry for entry in reversed(self._session) if entry.command.startswith(prefix))
+            if self._map is None:
+                return results[:limit]
+            wanted = limit + len(results)
+            if self._ready.is_set():
+                low, high = self._lower_bound(key), self._lower_bound(key + b"\xff")
+                if high - low <= wanted * PREFIX_SCAN_RATIO:
+                    offsets = heapq.nlargest(wanted, self._index[low:high])
+                    return self._unique(results + [self._entry_at(offset) for offset in offsets])[:limit]
+            end = len(self._map)
+            while len(results) < limit and end > 0:
+                position = self._map.rfind(b"\n" + key, 0, end)
+                if position == -1:
+                    if self._map[:len(key)] == key:
+                        results = self._unique(results + [self._entry_at(0)])
+                    break
+                results = self._unique(results + [self._entry_at(position + 1)])
+                end = position + len(key)
+            return results[:limit]
+
+    def search(self, text: str, limit: int = 10) -> List[Entry]:
+        """
+        Finds commands containing text anywhere in the file, scanning backwards from the newest entry (not indexed)
+        :param text: text to find
+        :param limit: maximum number of results
+        :return: newest entry of each matching command, newest first
+        """
+        needle = escape_field(text).encode()
+        with self._lock:
+            results = self._unique(entry for entry in reversed(self._session) if text in entry.command)
+            end = len(self._map) if self._map is not None else 0
+            while len(results) < limit and end > 0:
+                position = self._map.rfind(needle, 0, end)
+                if position == -1:
+                    break
+                start = self._map.rfind(b"\n", 0, position) + 1
+                if position + len(needle) <= self._map.find(b"\t", start):
+                    results = self._unique(results + [self._entry_at(start)])
+                    end = start
+                else:
+                    end = position + len(needle) - 1
+            return results[:limit]
+
+    @staticmethod
+    def _unique(entries) -> List[Entry]:
+        seen = set()
+        unique = []
+        for entry in entries:
+            if entry is not None and entry.command not in seen:
+                seen.add(entry.command)
+                unique.append(entry)
+        return unique
+
+    def compact(self) -> None:
+        """Rewrites history file keeping newest entry of each command, at most max_entries"""
+        with self._file_lock():
+            try:
+                with open(self.path, "rb") as history_file:
+                    lines = history_file.read().split(b"\n")
+            except OSError:
+                return
+            latest: Dict[bytes, bytes] = {}
+            for line in lines:
+                tab = line.find(b"\t")
+                if tab != -1:
+                    latest.pop(line[:tab], None)
+                    latest[line[:tab]] = line
+            kept = list(latest.values())[-self.max_entries:]
+            descriptor, temp_path = tempfile.mkstemp(dir=os.path.dirname(self.path), suffix=".tmp")
+            try:
+                with os.fdopen(descriptor, "wb") as temp_file:
+                    temp_file.write(b"".join(line + b"\n" for line in kept))
+                os.replace(temp_path, self.path)
+            except OSError:
+                with contextlib.suppress(OSError):
+                    os.remove(temp_path)
+                return
+            self._map_file()
+        self._build_index()
@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""Background jobs tracked by an asyncio event loop, each job runs on a worker thread"""
+import asyncio
+import collections
+import signal
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional
+
+MAX_JOB_WORKERS = 32
+CANCEL_SIGNALS = [signal.SIGINT, signal.SIGTERM] + [getattr(signal, name) for name in ["SIGKILL", "SIGHUP"] if hasattr(signal, name)]
+
+
+class Job:
+    """Background job: a command line with its processes and Python stages"""
+    def __init__(self, job_id: int, command: str):
+        self.id = job_id
+        self.command = command
+        self.state = "Running"
+        self.status: Optional[int] = None
+        self.processes: list = []
+        self.process_group: Optional[int] = None
+        self.cancelled = threading.Event()
+        self.cancel_callbacks: List[Callable[[], None]] = []
+        self.future: Optional[Future] = None
+
+    def signal(self, signal_number: int) -> None:
+        """
+        Sends signal to job's processes, cancels its Python stages for terminating signals
+        Job is marked cancelled first, so a process spawned meanwhile is either signalled here or sees the mark
+        :param signal_number: signal
+        """
+        if signal_number in CANCEL_SIGNALS:
+            self.cancelled.set()
+        for process in list(self.processes):
+            try:
+                process.send_signal(signal_number)
+            except (ProcessLookupError, OSError):
+                pass
+        if signal_number in CANCEL_SIGNALS:
+            for callback in list(self.cancel_callbacks):
+                callback()
+        if signal_number == getattr(signal, "SIGSTOP", None) or signal_number == getattr(signal, "SIGTSTP", None):
+            self.state = "Stopped"
+        elif signal_number == getattr(signal, "SIGCONT", None) and self.status is None:
+            self.state = "Running"
+
+
+class JobTable:
+    """
+    Starts jobs from a background asyncio loop and collects their completion notices
+    Job bodies (pipelines and process waits) block on a worker thread of a bounded pool, not on the loop
+    """
+    def __init__(self, max_workers: int = MAX_JOB_WORKERS):
+        self.jobs: Dict[int, Job] = {}
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="pyshell-job")
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._lock = threading.Lock()
+        self._notices = collections.deque()
+        self._local = threading.local()
+
+    def _event_loop(self) -> asyncio.AbstractEventLoop:
+        with self._lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                threading.Thread(target=self._loop.run_forever, name="pyshell-jobs", daemon=True).start()
+        return self._loop
+
+    def _call(self, job: Job, function: Callable[[], int]) -> int:
+        self._local.job = job
+        try:
+            return function()
+        finally:
+            self._local.job = None
+
+    async def _run(self, job: Job, function: Callable[[], int]) -> int:
+        try:
+            job.status = await asyncio.get_running_loop().run_in_executor(self._executor, self._call, job, function)
+        except BaseException:
+            job.status = 1
+            job.state = "Failed"
+        else:
+            if job.cancelled.is_set():
+                job.state = "Killed"
+            else:
+                job.state = "Done" if job.status == 0 else f"Exit {job.status}"
+        self._notices.append(job)
+        return job.status
+
+    def submit(self, command: str, function: Callable[[], int]) -> Job:
+        """
+        Starts job
+        :param command: command line shown in job listings
+        :param function: runs job, returns exit status
+        :return: started job
+        """
+        with self._lock:
+            job = Job(max(self.jobs, default=0) + 1, command)
+            self.jobs[job.id] = job
+        job.future = asyncio.run_coroutine_threadsafe(self._run(job, function), self._event_loop())
+        return job
+
+    def current(self) -> Optional[Job]:
+        """
+        Finds job running on calling thread
+        :return: job, None for foreground commands
+        """
+        return getattr(self._local, "job", None)
+
+    def find(self, spec: Optional[str] = None) -> Optional[Job]:
+        """
+        Finds job by specification
+        :param spec: %n, n, %% / %+ (latest job) or None for latest job
+        :return: job, None if not found
+        """
+        if spec in [None, "%", "%%", "%+"]:
+            return self.jobs[max(self.jobs)] if self.jobs else None
+        try:
+            return self.jobs.get(int(spec.lstrip("%")))
+        except ValueError:
+            return None
+
+    def wait(self, job: Job, timeout: Optional[float] = None) -> int:
+        """
+        Waits for job to finish, its completion is not reported as notice afterwards
+        :param job: job
+        :param timeout: seconds to wait, None waits forever
+        :return: exit status
+        """
+        status = job.future.result(timeout)
+        with self._lock:
+            self.jobs.pop(job.id, None)
+            if job in self._notices:
+                self._notices.remove(job)
+        return status
+
+    def pop_notices(self) -> List[Job]:
+        """
+        Takes finished jobs not yet reported, removing them from table
+        :return: finished jobs
+        """
+        finished = []
+        while self._notices:
+            job = self._notices.popleft()
+            with self._lock:
+                self.jobs.pop(job.id, None)
+            finished.append(job)
+        return finished
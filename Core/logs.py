@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""Shared logging: records are queued by callers and rendered on a background listener"""
+import atexit
+import contextlib
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import threading
+from typing import Iterator, Optional, TextIO
+
+from rich.logging import RichHandler
+from rich.markup import escape
+
+SUCCESS = 25
+LOG = 15
+SEVERITIES = {
+    "warning": (logging.WARNING, "bold yellow"),
+    "critical": (logging.CRITICAL, "bold red"),
+    "fatal": (logging.CRITICAL, "bold red blink"),
+    "error": (logging.ERROR, "bold orange"),
+    "info": (logging.INFO, "bold cyan"),
+    "success": (SUCCESS, "green"),
+    "log": (LOG, "gray")
+}
+LOG_LEVEL = os.environ.get("PYSHELL_LOG_LEVEL", "LOG")
+LOG_NDJSON = os.environ.get("PYSHELL_LOG_NDJSON")
+
+logging.addLevelName(SUCCESS, "SUCCESS")
+logging.addLevelName(LOG, "LOG")
+log = logging.getLogger("pyshell")
+log_queue: "queue.Queue[logging.LogRecord]" = queue.Queue()
+_listener: Optional[logging.handlers.QueueListener] = None
+_local = threading.local()
+
+
+class MarkupFormatter(logging.Formatter):
+    """Styles messages of logger() by severity, markup is only built when record is rendered"""
+    def format(self, record: logging.LogRecord) -> str:
+        message = super().format(record)
+        style = getattr(record, "style", None)
+        return f"[{style}]{escape(message)}[/]" if style else escape(message)
+
+
+class NDJSONHandler(logging.FileHandler):
+    """Writes records as newline-delimited JSON"""
+    def format(self, record: logging.LogRecord) -> str:
+        return json.dumps({
+            "time": record.created,
+            "level": record.levelname,
+            "logger": record.name,
+            "thread": record.threadName,
+            "message": record.getMessage()
+        })
+
+
+def setup_logging(level: str = LOG_LEVEL, ndjson_path: Optional[str] = LOG_NDJSON) -> None:
+    """
+    Routes logging through queue to rich console (and NDJSON file), does nothing if already set up
+    :param level: lowest level logged (default: PYSHELL_LOG_LEVEL or LOG)
+    :param ndjson_path: NDJSON log file, None to disable (default: PYSHELL_LOG_NDJSON)
+    """
+    global _listener
+    if _listener is not None:
+        return
+    console_handler = RichHandler(rich_tracebacks=True, markup=True, show_path=False)
+    console_handler.setFormatter(MarkupFormatter("%(message)s"))
+    handlers = [console_handler]
+    if ndjson_path:
+        handlers.append(NDJSONHandler(ndjson_path, encoding="utf-8"))
+    root = logging.getLogger()
+    root.setLevel(level)
+    root.addHandler(logging.handlers.QueueHandler(log_queue))
+    _listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+    _listener.start()
+    atexit.register(_listener.stop)
+
+
+def flush() -> None:
+    """Waits until queued records are rendered"""
+    if _listener is not None:
+        log_queue.join()
+
+
+@contextlib.contextmanager
+def redirect_logs(stream: Optional[TextIO]) -> Iterator[None]:
+    """
+    Writes messages of logger() called on this thread to stream (a command's 2> target) instead of the console
+    :param stream: target stream, None keeps current target
+    """
+    previous = getattr(_local, "stream", None)
+    if stream is not None:
+        _local.stream = stream
+    try:
+        yield
+    finally:
+        _local.stream = previous
+
+
+def logger(message: str, severity: str) -> None:
+    """
+    Log Function
+    :param message: message to print
+    :param severity: level of severity
+    """
+    level, style = SEVERITIES.get(severity, (logging.INFO, None))
+    if not log.isEnabledFor(level):
+        return
+    stream = getattr(_local, "stream", None)
+    if stream is not None:
+        stream.write(f"{logging.getLevelName(level):<8} {message}\n")
+        stream.flush()
+    else:
+        log.log(level, "%s", message, extra={"style": style})
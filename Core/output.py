@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""Buffered output of rich markup lines"""
+import threading
+import time
+from typing import Iterable, List, Optional
+
+from rich.console import Console
+
+from Core.pipeline import plain_text
+
+FLUSH_POLICIES = ["line", "size", "command"]
+OUTPUT_BUFFER_SIZE = 64 * 1024
+OUTPUT_MAX_BUFFER_SIZE = 8 * OUTPUT_BUFFER_SIZE
+FLUSH_INTERVAL = 0.1
+
+
+class Output:
+    """
+    Collects lines with rich markup and writes them in batches
+    On a terminal a batch is rendered by a single console.print, otherwise markup is stripped and plain text written
+    Flush policies: "line" writes every line, "size" writes when buffer is full or FLUSH_INTERVAL passed (a timer
+    writes the end of a burst when no further line arrives), "command" holds output until command ends (bounded by
+    OUTPUT_MAX_BUFFER_SIZE)
+    """
+    def __init__(self, console: Console, policy: str = "size", buffer_size: int = OUTPUT_BUFFER_SIZE):
+        self.console = console
+        self.policy = policy
+        self.buffer_size = buffer_size
+        self._lines: List[str] = []
+        self._size = 0
+        self._flushed = time.monotonic()
+        self._timer: Optional[threading.Timer] = None
+        self._lock = threading.RLock()
+
+    def write_line(self, line: str) -> None:
+        """
+        Adds line to buffer, writing buffer if flush policy requires it
+        :param line: line with rich markup
+        """
+        with self._lock:
+            self._lines.append(line)
+            self._size += len(line) + 1
+            if self.policy == "line":
+                self.flush()
+            elif self.policy == "command":
+                if self._size >= OUTPUT_MAX_BUFFER_SIZE:
+                    self.flush()
+            else:
+                elapsed = time.monotonic() - self._flushed
+                if self._size >= self.buffer_size or elapsed >= FLUSH_INTERVAL:
+                    self.flush()
+                elif self._timer is None:
+                    self._timer = threading.Timer(FLUSH_INTERVAL - elapsed, self.flush)
+                    self._timer.daemon = True
+                    self._timer.start()
+
+    def write_lines(self, lines: Iterable[str]) -> None:
+        """
+        Adds lines to buffer
+        :param lines: lines with rich markup
+        """
+        for line in lines:
+            self.write_line(line)
+
+    def flush(self) -> None:
+        """Writes buffered lines"""
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            self._flushed = time.monotonic()
+            if not self._lines:
+                return
+            lines, self._lines, self._size = self._lines, [], 0
+            if self.console.is_terminal:
+                self.console.print("\n".join(lines))
+            else:
+                self.console.file.write("\n".join(plain_text(line) for line in lines) + "\n")
+                self.console.file.flush()
+
+
+def print_lines(lines: Iterable[str], console: Optional[Console] = None) -> None:
+    """
+    Prints lines with rich markup through buffered output
+    :param lines: lines with rich markup
+    :param console: console to print to (default: new console)
+    """
+    output = Output(console or Console())
+    try:
+        output.write_lines(lines)
+    finally:
+        output.flush()
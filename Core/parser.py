@@ -0,0 +1,278 @@
+#!/usr/bin/env python3
+"""Command line lexer and parser for PyShell"""
+import shlex
+from functools import lru_cache
+from typing import List, NamedTuple, Optional, Tuple
+
+PARSE_CACHE_SIZE = 512
+OPERATORS = ["&&", "||", ";", "|", "&", "\n"]
+REDIRECTIONS = ["2>&1", "2>>", "2>", ">>", ">", "<"]
+SEPARATORS = [";", "&", "\n"]
+WORD_BREAKS = " \t\n;&|<>"
+
+
+class ParseError(ValueError):
+    """Raised for command lines with invalid syntax"""
+
+
+class WordPart(NamedTuple):
+    """
+    Piece of word with its quoting
+    quote is "" (unquoted), "'" (literal: single quotes or backslash escape) or '"' (double quotes)
+    """
+    text: str
+    quote: str
+
+
+class Word(NamedTuple):
+    """Shell word made of differently quoted parts"""
+    parts: Tuple[WordPart, ...]
+
+    @property
+    def value(self) -> str:
+        """Word text without quotes"""
+        return "".join(part.text for part in self.parts)
+
+    @property
+    def quoted(self) -> bool:
+        """If any part of word was quoted or escaped"""
+        return any(part.quote for part in self.parts)
+
+
+class Redirection(NamedTuple):
+    """Redirection of file descriptor, target is None for 2>&1"""
+    fd: int
+    operator: str
+    target: Optional[Word]
+
+
+class Command(NamedTuple):
+    """Simple command: words and redirections"""
+    words: Tuple[Word, ...]
+    redirections: Tuple[Redirection, ...]
+
+
+class Pipeline(NamedTuple):
+    """Commands joined by |"""
+    commands: Tuple[Command, ...]
+
+
+class AndOr(NamedTuple):
+    """Pipelines joined by && and ||, operators[i] joins pipelines[i] and pipelines[i + 1]"""
+    pipelines: Tuple[Pipeline, ...]
+    operators: Tuple[str, ...]
+    background: bool
+
+
+class CommandList(NamedTuple):
+    """Parsed command line"""
+    items: Tuple[AndOr, ...]
+
+
+def _add_text(parts: List[WordPart], text: str, quote: str) -> None:
+    if parts and parts[-1].quote == quote:
+        parts[-1] = WordPart(parts[-1].text + text, quote)
+    else:
+        parts.append(WordPart(text, quote))
+
+
+def tokenize(source: str) -> List[tuple]:
+    """
+    Splits command line into tokens
+    :param source: command line
+    :return: tokens ("word", Word), ("op", operator) or ("redirect", operator)
+    """
+    tokens = []
+    parts: List[WordPart] = []
+    in_word = False
+    index = 0
+    length = len(source)
+    while index < length:
+        char = source[index]
+        if char in " \t":
+            if in_word:
+                tokens.append(("word", Word(tuple(parts))))
+                parts, in_word = [], False
+            index += 1
+        elif char == "#" and not in_word:
+            newline = source.find("\n", index)
+            index = length if newline == -1 else newline
+        elif char == "\\":
+            if index + 1 < length and source[index + 1] == "\n":
+                index += 2
+                continue
+            _add_text(parts, source[index + 1:index + 2], "'")
+            in_word = True
+            index += 2
+        elif char == "'":
+            end = source.find("'", index + 1)
+            if end == -1:
+                raise ParseError("unterminated single quote")
+            _add_text(parts, source[index + 1:end], "'")
+            in_word = True
+            index = end + 1
+        elif char == '"':
+            index += 1
+            text = []
+            while True:
+                if index >= length:
+                    raise ParseError("unterminated double quote")
+                char = source[index]
+                if char == '"':
+                    break
+                if char == "\\" and index + 1 < length and source[index + 1] in '"\\$\n':
+                    if source[index + 1] != "\n":
+                        if text:
+                            _add_text(parts, "".join(text), '"')
+                            text = []
+                        _add_text(parts, source[index + 1], "'")
+                    index += 2
+                    continue
+                text.append(char)
+                index += 1
+            if text or not parts:
+                _add_text(parts, "".join(text), '"')
+            in_word = True
+            index += 1
+        elif char in WORD_BREAKS or (char == "2" and not in_word and source.startswith("2>", index)):
+            if in_word:
+                tokens.append(("word", Word(tuple(parts))))
+                parts, in_word = [], False
+            for redirection in REDIRECTIONS:
+                if source.startswith(redirection, index):
+                    tokens.append(("redirect", redirection))
+                    index += len(redirection)
+                    break
+            else:
+                for operator in OPERATORS:
+                    if source.startswith(operator, index):
+                        tokens.append(("op", operator))
+                        index += len(operator)
+                        break
+        else:
+            end = index + 1
+            while end < length and source[end] not in WORD_BREAKS and source[end] not in "\\'\"":
+                end += 1
+            _add_text(parts, source[index:end], "")
+            in_word = True
+            index = end
+    if in_word:
+        tokens.append(("word", Word(tuple(parts))))
+    return tokens
+
+
+class _Parser:
+    def __init__(self, tokens: List[tuple]):
+        self._tokens = tokens
+        self._index = 0
+
+    def _peek(self) -> tuple:
+        return self._tokens[self._index] if self._index < len(self._tokens) else ("end", None)
+
+    def _next(self) -> tuple:
+        token = self._peek()
+        self._index += 1
+        return token
+
+    def command_list(self) -> CommandList:
+        items = []
+        while True:
+            while self._peek() == ("op", "\n"):
+                self._next()
+            if self._peek()[0] == "end":
+                break
+            pipelines, operators = [self.pipeline()], []
+            while self._peek() in [("op", "&&"), ("op", "||")]:
+                operators.append(self._next()[1])
+                while self._peek() == ("op", "\n"):
+                    self._next()
+                pipelines.append(self.pipeline())
+            kind, value = self._peek()
+            if kind == "op" and value in SEPARATORS:
+                self._next()
+            elif kind != "end":
+                raise ParseError(f"unexpected '{value}'")
+            items.append(AndOr(tuple(pipelines), tuple(operators), value == "&"))
+        return CommandList(tuple(items))
+
+    def pipeline(self) -> Pipeline:
+        commands = [self.command()]
+        while self._peek() == ("op", "|"):
+            self._next()
+            while self._peek() == ("op", "\n"):
+                self._next()
+            commands.append(self.command())
+        return Pipeline(tuple(commands))
+
+    def command(self) -> Command:
+        words, redirections = [], []
+        while True:
+            kind, value = self._peek()
+            if kind == "word":
+                words.append(self._next()[1])
+            elif kind == "redirect":
+                self._next()
+                if value == "2>&1":
+                    redirections.append(Redirection(2, ">&", None))
+                    continue
+                target_kind, target = self._next()
+                if target_kind != "word":
+                    raise ParseError(f"missing file name after '{value}'")
+                fd = 2 if value.startswith("2") else (0 if value == "<" else 1)
+                redirections.append(Redirection(fd, value.lstrip("2"), target))
+            else:
+                break
+        if not words and not redirections:
+            raise ParseError(f"unexpected '{value}'" if value is not None else "unexpected end of line")
+        return Command(tuple(words), tuple(redirections))
+
+
+@lru_cache(maxsize=PARSE_CACHE_SIZE)
+def parse(source: str) -> CommandList:
+    """
+    Parses command line, results are cached by source text
+    :param source: command line
+    :return: parsed command list
+    """
+    return _Parser(tokenize(source)).command_list()
+
+
+def word_source(word: Word) -> str:
+    """
+    Formats word back into command line text, keeping the quoting of its parts
+    :param word: parsed word
+    :return: word text
+    """
+    source = []
+    for part in word.parts:
+        if part.quote == "'":
+            source.append(shlex.quote(part.text))
+        elif part.quote == '"':
+            source.append('"' + part.text.replace("\\", "\\\\").replace('"', '\\"') + '"')
+        else:
+            source.append(part.text)
+    return "".join(source)
+
+
+def to_source(item: AndOr) -> str:
+    """
+    Formats parsed pipelines back into command line text
+    :param item: parsed pipelines joined by && and ||
+    :return: command line
+    """
+    pipelines = []
+    for pipeline in item.pipelines:
+        commands = []
+        for command in pipeline.commands:
+            words = [word_source(word) for word in command.words]
+            for redirection in command.redirections:
+                if redirection.operator == ">&":
+                    words.append("2>&1")
+                else:
+                    words.append(f"{'2' if redirection.fd == 2 else ''}{redirection.operator} {word_source(redirection.target)}")
+            commands.append(" ".join(words))
+        pipelines.append(" | ".join(commands))
+    text = pipelines[0]
+    for operator, pipeline in zip(item.operators, pipelines[1:]):
+        text += f" {operator} {pipeline}"
+    return text
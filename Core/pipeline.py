@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""Streaming pipeline plumbing between builtins and external processes"""
+import os
+import re
+import threading
+from typing import Callable, Iterable, Iterator, Optional
+
+MARKUP_TAG = re.compile(r"(\\*)\[([a-z#/@].*?)\]")
+
+
+def _strip_tag(match) -> str:
+    backslashes = len(match.group(1))
+    return "\\" * (backslashes // 2) + (f"[{match.group(2)}]" if backslashes % 2 else "")
+
+
+def plain_text(line: str) -> str:
+    """
+    Removes rich markup from line without parsing it into styled text
+    :param line: line with rich markup
+    :return: plain line
+    """
+    return MARKUP_TAG.sub(_strip_tag, line) if "[" in line else line
+
+
+def read_lines(fd: int) -> Iterator[str]:
+    """
+    Reads lines from OS pipe
+    :param fd: readable file descriptor, closed when iteration ends
+    :return: iterator of lines without line endings
+    """
+    with os.fdopen(fd, "r", errors="replace") as stream:
+        for line in stream:
+            yield line.rstrip("\n")
+
+
+def _hold(lines: Iterator[str], streams: Iterable) -> Iterator[str]:
+    try:
+        yield ""
+        return (yield from lines)
+    finally:
+        for stream in streams:
+            stream.close()
+
+
+def hold_streams(lines: Iterator[str], streams: Iterable) -> Iterator[str]:
+    """
+    Keeps redirection streams open while stage output is consumed
+    :param lines: lines produced by stage
+    :param streams: files closed when lines are exhausted or closed
+    :return: generator of lines, started so closing it always closes streams
+    """
+    held = _hold(lines, list(streams))
+    next(held)
+    return held
+
+
+def drain(lines: Iterable[str], write: Callable[[str], object], cancelled: Optional[threading.Event] = None) -> int:
+    """
+    Consumes stage output
+    :param lines: lines produced by stage
+    :param write: called for every line
+    :param cancelled: stops consuming once set (default: None)
+    :return: exit status returned by stage generator, 130 if cancelled
+    """
+    iterator = iter(lines)
+    while True:
+        if cancelled is not None and cancelled.is_set():
+            close = getattr(iterator, "close", None)
+            if close is not None:
+                close()
+            return 130
+        try:
+            line = next(iterator)
+        except StopIteration as stop:
+            return stop.value or 0
+        write(line)
+
+
+def _feed(lines: Iterator[str], fd: int) -> None:
+    try:
+        with os.fdopen(fd, "w") as stream:
+            for line in lines:
+                stream.write(plain_text(line) + "\n")
+    except BrokenPipeError:
+        pass
+    finally:
+        close = getattr(lines, "close", None)
+        if close is not None:
+            close()
+
+
+def start_feeder(lines: Iterator[str]) -> int:
+    """
+    Writes lines into OS pipe from background thread
+    :param lines: lines produced by previous stage
+    :return: readable end of pipe
+    """
+    read_fd, write_fd = os.pipe()
+    threading.Thread(target=_feed, args=(lines, write_fd), daemon=True).start()
+    return read_fd
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""Lazy plugin registry for PyShell"""
+import ast
+import importlib
+import os
+from typing import Callable, Dict, List, Optional
+
+PLUGINS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "Plugins")
+METADATA_FIELDS = ["__package__", "__version__", "__description__", "__commands__"]
+
+
+def read_metadata(init_path: str) -> Dict[str, object]:
+    """
+    Reads plugin metadata from its __init__.py without importing it
+    :param init_path: path to plugin's __init__.py
+    :return: metadata fields found in file
+    """
+    with open(init_path, "r", encoding="utf-8") as init_file:
+        module = ast.parse(init_file.read(), init_path)
+    metadata = {}
+    for node in module.body:
+        if not isinstance(node, ast.Assign) or len(node.targets) != 1 or not isinstance(node.targets[0], ast.Name):
+            continue
+        if node.targets[0].id in METADATA_FIELDS:
+            try:
+                metadata[node.targets[0].id] = ast.literal_eval(node.value)
+            except ValueError:
+                pass
+    return metadata
+
+
+class Plugin:
+    """Plugin metadata and its lazily imported command handlers"""
+    def __init__(self, name: str, metadata: Dict[str, object]):
+        self.name = name
+        self.package = metadata.get("__package__", name)
+        self.version = metadata.get("__version__", "")
+        self.description = metadata.get("__description__", "")
+        self.commands = metadata.get("__commands__") or {name.lower(): f"{name}:{name.lower()}"}
+        self._handlers: Dict[str, Callable] = {}
+
+    def load(self, command: str) -> Callable:
+        """
+        Imports handler of command, on first use only
+        :param command: command name
+        :return: command handler
+        """
+        if command not in self._handlers:
+            module_name, function_name = self.commands[command].split(":")
+            module = importlib.import_module(f"Plugins.{self.name}.{module_name}")
+            self._handlers[command] = getattr(module, function_name)
+        return self._handlers[command]
+
+
+class PluginRegistry:
+    """Maps command names to plugins found in Plugins/*/__init__.py"""
+    def __init__(self, directory: str = PLUGINS_DIR):
+        self.directory = directory
+        self.plugins: List[Plugin] = []
+        self.commands: Dict[str, Plugin] = {}
+
+    def scan(self) -> None:
+        """Scans plugins directory for plugin metadata"""
+        self.plugins = []
+        self.commands = {}
+        try:
+            names = sorted(os.listdir(self.directory))
+        except OSError:
+            return
+        for name in names:
+            init_path = os.path.join(self.directory, name, "__init__.py")
+            if not os.path.isfile(init_path):
+                continue
+            try:
+                plugin = Plugin(name, read_metadata(init_path))
+            except (OSError, SyntaxError):
+                continue
+            self.plugins.append(plugin)
+            for command in plugin.commands:
+                self.commands.setdefault(command, plugin)
+
+    def get(self, command: str) -> Optional[Callable]:
+        """
+        Finds handler of command
+        :param command: command name
+        :return: command handler, None if no plugin provides command
+        """
+        plugin = self.commands.get(command)
+        return plugin.load(command) if plugin is not None else None
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""Precompiled prompt (PS) templates"""
+import getpass
+import platform
+import re
+from datetime import datetime
+from functools import lru_cache
+from typing import Optional, Tuple
+
+from rich.markup import escape
+
+PROMPT_TOKEN = re.compile(r"\$(COMPUTERNAME|USERNAME|CWD|STATUS|DURATION|JOBS)\$|\$TIME\$(.*?)\$/TIME\$", re.DOTALL)
+
+
+@lru_cache(maxsize=1)
+def hostname() -> str:
+    """
+    Computer name, looked up once per session
+    :return: computer name
+    """
+    return platform.node()
+
+
+@lru_cache(maxsize=1)
+def username() -> str:
+    """
+    User name, looked up once per session
+    :return: user name
+    """
+    return getpass.getuser()
+
+
+@lru_cache(maxsize=16)
+def compile_prompt(template: str) -> Tuple[Tuple[Optional[str], str], ...]:
+    """
+    Compiles prompt template into static and dynamic segments
+    Tokens: $COMPUTERNAME$, $USERNAME$, $CWD$, $STATUS$, $DURATION$, $JOBS$ and $TIME$format$/TIME$
+    :param template: prompt template (PS variable)
+    :return: segments (None, text) for static text or (token, argument) for values rendered per prompt
+    """
+    segments = []
+    static = []
+    position = 0
+    for match in PROMPT_TOKEN.finditer(template):
+        static.append(template[position:match.start()])
+        position = match.end()
+        token = match.group(1)
+        if token == "COMPUTERNAME":
+            static.append(escape(hostname()))
+        elif token == "USERNAME":
+            static.append(escape(username()))
+        else:
+            if static:
+                segments.append((None, "".join(static)))
+                static = []
+            segments.append(("TIME", match.group(2)) if token is None else (token, ""))
+    static.append(template[position:])
+    if "".join(static):
+        segments.append((None, "".join(static)))
+    return tuple(segments)
+
+
+def render_prompt(template: str, cwd: str, home: str, status: int = 0, duration: float = 0.0, job_count: int = 0) -> str:
+    """
+    Renders prompt, only per-prompt values (CWD, time, status, duration, jobs) are computed
+    :param template: prompt template (PS variable)
+    :param cwd: current working directory
+    :param home: home directory, shown as ~
+    :param status: exit status of last command
+    :param duration: duration of last command in seconds
+    :param job_count: number of running background jobs
+    :return: prompt
+    """
+    parts = []
+    now = None
+    for token, value in compile_prompt(template):
+        if token is None:
+            parts.append(value)
+        elif token == "CWD":
+            parts.append("~" if cwd == home else escape(cwd))
+        elif token == "TIME":
+            now = now or datetime.now()
+            parts.append(escape(now.strftime(value)))
+        elif token == "STATUS":
+            parts.append(str(status))
+        elif token == "DURATION":
+            parts.append(f"{duration:.2f}s")
+        elif token == "JOBS":
+            parts.append(str(job_count))
+    return "".join(parts)
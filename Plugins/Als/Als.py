@@ -1,10 +1,14 @@
 #!/usr/bin/env python3
 """Als Plugin for PyShell"""
+import collections
 import logging
 import os
+import stat
+import threading
 from datetime import datetime
 from pathlib import Path
-from rich import print as printf, pretty
+from typing import Dict, Iterator, List, Optional, Set, Tuple
+from rich import get_console, print as printf, pretty
 from rich.console import Console
 from rich.filesize import decimal
 from rich.logging import RichHandler
@@ -16,13 +20,49 @@ from rich.tree import Tree
 
 pretty.install()
 console = Console()
-logging.basicConfig(
-    level="NOTSET",
-    format="%(message)s",
-    datefmt="[%X]",
-    handlers=[RichHandler(rich_tracebacks=True)]
-)
-log = logging.getLogger("rich")
+try:
+    from Core.output import print_lines
+except ImportError:
+    def print_lines(lines, console=None) -> None:
+        """
+        Prints lines with rich markup
+        :param lines: lines to print
+        :param console: console to print to (default: rich's console)
+        """
+        for line in lines:
+            (console or get_console()).print(line)
+try:
+    from Core.logs import logger, setup_logging
+    setup_logging()
+except ImportError:
+    logging.basicConfig(
+        level="NOTSET",
+        format="%(message)s",
+        datefmt="[%X]",
+        handlers=[RichHandler(rich_tracebacks=True)]
+    )
+    log = logging.getLogger("rich")
+
+    def logger(message: str, severity: str) -> None:
+        """
+        Log Function
+        :param message: message to print
+        :param severity: level of severity
+        """
+        if severity == "warning":
+            log.warning(f"[bold yellow]{message}[/]", extra={"markup": True})
+        elif severity == "critical":
+            log.critical(f"[bold red]{message}[/]", extra={"markup": True})
+        elif severity == "fatal":
+            log.fatal(f"[bold red blink]{message}[/]", extra={"markup": True})
+        elif severity == "error":
+            log.error(f"[bold orange]{message}[/]", extra={"markup": True})
+        elif severity == "info":
+            log.info(f"[bold cyan]{message}[/]", extra={"markup": True})
+        elif severity == "success":
+            printf(f"[#1a3f5c][{datetime.now().strftime('%H:%M:%S')}][/] [bold green]SUCCESS[/]  [green]{message}[/]")
+        elif severity == "log":
+            printf(f"[gray]{message}[/]")
 __package__ = "[red]Als-Plugin[/]"
 __version__ = "[yellow]0.0.1[/]"
 __description__ = "[red]Als[/] Plugin for [bold green]Py[/][italic black on white]Shell[/]"
@@ -40,7 +80,7 @@ lock_file_extension = [".lock"]
 known_file_extensions = ["aac", "au", "flac", "mid", "midi", "mka", "mp3", "mpc", "ogg", "ra", "wav", "axa", "oga", "spx", "xspf", "tar", "tgz", "arj", "taz", "lzh", "lzma", "tlz", "txz", "zip", "z", "Z", "dz", "gz", "lz", "xz", "bz2", "bz", "tbz", "tbz2", "tz", "deb", "rpm", "jar", "rar", "ace", "zoo", "cpio", "7z", "rz", "jpg", "jpeg", "gif", "bmp", "pbm", "pgm", "ppm", "tga", "xbm", "xpm", "tif", "tiff", "png", "svg", "svgz", "mng", "pcx", "mov", "mpg", "mpeg", "m2v", "mkv", "ogm", "mp4", "m4v", "mp4v", "vob", "qt", "nuv", "wmv", "asf", "rm", "rmvb", "flc", "avi", "fli", "flv", "gl", "dl", "xcf", "xwd", "yuv", "cgm", "emf", "axv", "anx", "ogv", "ogx", ".py", ".pyw", ".pyc", ".pps", ".ppm.lock", ".package", ".lock"]
 file_types = {
     "audio": "AUDIO-FILE",
-    "achieve_file_extensions": "ACHIEVE-FILE",
+    "achieve": "ACHIEVE-FILE",
     "media": "MEDIA-FILE",
     "python": "PYTHON-FILE",
     "pps": "PY$SHELL-SCRIPT",
@@ -48,6 +88,31 @@ file_types = {
     "package": "PACKAGE-FILE",
     "lock": "LOCK-FILE"
 }
+SNIFF_SIZE = 512
+SNIFF_CACHE_SIZE = 65536
+MAGIC_SIGNATURES = [
+    (0, b"\x89PNG\r\n\x1a\n", "media"),
+    (0, b"\xff\xd8\xff", "media"),
+    (0, b"GIF87a", "media"),
+    (0, b"GIF89a", "media"),
+    (0, b"\x1aE\xdf\xa3", "media"),
+    (4, b"ftyp", "media"),
+    (8, b"AVI ", "media"),
+    (8, b"WAVE", "audio"),
+    (0, b"OggS", "audio"),
+    (0, b"fLaC", "audio"),
+    (0, b"ID3", "audio"),
+    (0, b"MThd", "audio"),
+    (0, b"PK\x03\x04", "achieve"),
+    (0, b"\x1f\x8b", "achieve"),
+    (0, b"BZh", "achieve"),
+    (0, b"\xfd7zXZ\x00", "achieve"),
+    (0, b"7z\xbc\xaf\x27\x1c", "achieve"),
+    (0, b"Rar!\x1a\x07", "achieve"),
+    (0, b"\xed\xab\xee\xdb", "achieve"),
+    (0, b"!<arch>\ndebian", "achieve"),
+    (257, b"ustar", "achieve")
+]
 helper_ = ["-h", "--help"]
 version_ = ["-v", "--version"]
 tree_ = ["-t", "--tree"]
@@ -55,35 +120,38 @@ dir_only_ = ["-d", "--dir_only"]
 colors_ = ["-c", "--colors"]
 permissions_ = ["-p", "--permissions"]
 rich_tree_ = ["-r", "--rich_tree"]
+sniff_ = ["-s", "--sniff"]
 
 
-def logger(message: str, severity: str) -> None:
+def build_file_type_index() -> Dict[str, str]:
     """
-    Log Function
-    :param message: message to print
-    :param severity: level of severity
+    Builds suffix to file type index from extension lists, earlier categories win
+    :return: file types by dotted suffix (e.g. ".mp3", ".ppm.lock")
     """
-    if severity == "warning":
-        log.warning(f"[bold yellow]{message}[/]", extra={"markup": True})
-    elif severity == "critical":
-        log.critical(f"[bold red]{message}[/]", extra={"markup": True})
-    elif severity == "fatal":
-        log.fatal(f"[bold red blink]{message}[/]", extra={"markup": True})
-    elif severity == "error":
-        log.error(f"[bold orange]{message}[/]", extra={"markup": True})
-    elif severity == "info":
-        log.info(f"[bold cyan]{message}[/]", extra={"markup": True})
-    elif severity == "success":
-        printf(f"[#1a3f5c][{datetime.now().strftime('%H:%M:%S')}][/] [bold green]SUCCESS[/]  [green]{message}[/]")
-    elif severity == "log":
-        printf(f"[gray]{message}[/]")
+    index = {}
+    for category, extensions in [
+        ("audio", audio_file_extensions),
+        ("achieve", achieve_file_extensions),
+        ("media", media_file_extensions),
+        ("python", python_file_extensions),
+        ("pps", pps_file_extension),
+        ("ppm", ppm_file_extension),
+        ("package", package_file_extension),
+        ("lock", lock_file_extension)
+    ]:
+        for extension in extensions:
+            index.setdefault("." + extension.lstrip("."), file_types[category])
+    return index
+
+
+file_type_index = build_file_type_index()
 
 
 def print_als_help_msg() -> None:
     """Prints Help Message for Als Plugin"""
     description_panel = Panel.fit(f"{__description__}\n\tby: {__author__}", title="Package [italic purple]Description[/]", border_style="green")
     usage_panel = Panel.fit(
-        "\tUsage: [bold red]als[/] [[bold italic]-h, --help[/]] [[bold italic]-v, --version[/]] [[bold italic]-t, --tree[/]] {[italic]-d, --dir_only[/]} {[italic]-p, --permissions[/]} {[italic]-c, --colors[/]}", title="Package [italic yellow]Command Line Usage[/]", border_style="purple")
+        "\tUsage: [bold red]als[/] [[bold italic]-h, --help[/]] [[bold italic]-v, --version[/]] [[bold italic]-t, --tree[/]] {[italic]-d, --dir_only[/]} {[italic]-p, --permissions[/]} {[italic]-c, --colors[/]} [[bold italic]-s, --sniff[/]]", title="Package [italic yellow]Command Line Usage[/]", border_style="purple")
     table = Table(title="[bold italic yellow]Usage Help[/]")
     package = Table(title="[bold italic yellow]Package[/]")
     package.add_row(description_panel)
@@ -97,6 +165,7 @@ def print_als_help_msg() -> None:
     table.add_row("Extension", "[yellow]-d[/], [yellow]--dir_only[/]", "set [italic green]\"tree\"[/] module to [italic]\"directory only\"[/]")
     table.add_row("Extension", "[yellow]-p[/], [yellow]--permissions[/]", "set [italic green]\"ls\"[/] module to [italic]\"show permissions\"[/]")
     table.add_row("Extension", "[yellow]-c[/], [yellow]--colors[/]", "set [italic green]\"ls\"[/] module to [italic]\"show colors\"[/]")
+    table.add_row("Optional", "[yellow]-s[/], [yellow]--sniff[/]", "set [italic green]\"ls\"[/] module to [italic]\"detect type of unknown files from content\"[/]")
     table.add_row("Alternative", "[yellow]-rt[/], [yellow]--rich_tree[/]",
                   "change [italic green]\"tree\"[/] module to [italic]\"rich tree\"[/]")
     package_info = Table(title="Package Info")
@@ -113,32 +182,52 @@ def als(args=None) -> None:
     Als function
     :param args: Arguments
     """
+    print_lines(als_lines(args), console)
+
+
+def als_lines(args=None) -> Iterator[str]:
+    """
+    Als function producing output lines lazily, used by PyShell pipelines
+    :param args: Arguments
+    :return: iterator of output lines (rich markup)
+    """
     if args is None:
         args = ["ls"]
     if not args or args == ["ls"]:
-        ls()
+        yield from ls_lines(path=os.getcwd())
     elif len(args) > 2:
         logger("Invalid number of arguments", "error")
     elif len(args) == 1:
         if args[0] in version_:
-            printf(f"{__package__} v{__version__}")
+            yield f"{__package__} v{__version__}"
         elif args[0] in helper_:
             print_als_help_msg()
         elif args[0] in tree_:
-            tree_generator(os.getcwd())
+            yield from DirectoryTree(os.getcwd()).lines()
         elif args[0] in colors_:
-            ls(color=True)
+            yield from ls_lines(color=True, path=os.getcwd())
         elif args[0] in permissions_:
-            ls(permissions=True)
+            yield from ls_lines(permissions=True, path=os.getcwd())
         elif args[0] in rich_tree_:
-            rich_tree()
+            rich_tree(os.getcwd())
+        elif args[0] in sniff_:
+            yield from ls_lines(path=os.getcwd(), sniff=True)
     elif len(args) == 2:
         if args[0] in tree_:
-            logger(f"only {dir_only_} is optional arguments for {tree_}", "error") if args[1] not in dir_only_ else tree_generator(os.getcwd(), True)
+            if args[1] not in dir_only_:
+                logger(f"only {dir_only_} is optional arguments for {tree_}", "error")
+            else:
+                yield from DirectoryTree(os.getcwd(), True).lines()
         elif args[0] in colors_:
-            logger(f"only {permissions_} is optional arguments for {colors_}", "error") if args[1] not in permissions_ else ls(color=True, permissions=True)
+            if args[1] not in permissions_:
+                logger(f"only {permissions_} is optional arguments for {colors_}", "error")
+            else:
+                yield from ls_lines(color=True, permissions=True, path=os.getcwd())
         elif args[0] in permissions_:
-            ls(color=True, permissions=True) if args[1] in colors_ else logger(f"only {colors_} is optional arguments for {permissions_}", "error")
+            if args[1] in colors_:
+                yield from ls_lines(color=True, permissions=True, path=os.getcwd())
+            else:
+                logger(f"only {colors_} is optional arguments for {permissions_}", "error")
 
 
 def tree_generator(path, dir_only=False) -> None:
@@ -153,48 +242,174 @@ def tree_generator(path, dir_only=False) -> None:
 def file_type_finder(extension: str) -> str:
     """
     Finds type of file
-    :param extension: file's extension
-    :return: file type
+    :param extension: file's extension, one or more suffixes with or without leading dot (e.g. ".tar.gz")
+    :return: file type of longest known suffix, FILE if none is known
     """
-    if extension in known_file_extensions:
-        if extension in audio_file_extensions:
-            return file_types["audio"]
-        elif extension in achieve_file_extensions:
-            return file_types["achieve"]
-        elif extension in media_file_extensions:
-            return file_types["media"]
-        elif extension in python_file_extensions:
-            return file_types["python"]
-        elif extension in pps_file_extension:
-            return file_types["pps"]
-        elif extension in ppm_file_extension:
-            return file_types["ppm"]
-        elif extension in package_file_extension:
-            return file_types["package"]
-        elif extension in lock_file_extension:
-            return file_types["lock"]
-    else:
+    suffixes = "." + extension.lstrip(".")
+    position = 0
+    while position != -1:
+        suffix = suffixes[position:]
+        file_type = file_type_index.get(suffix) or file_type_index.get(suffix.lower())
+        if file_type is not None:
+            return file_type
+        position = suffixes.find(".", position + 1)
+    return "FILE"
+
+
+def sniff_file_type(path: str) -> str:
+    """
+    Finds type of file from its first SNIFF_SIZE bytes
+    :param path: file path
+    :return: file type, FILE if content isn't recognized
+    """
+    try:
+        with open(path, "rb") as sniffed_file:
+            head = sniffed_file.read(SNIFF_SIZE)
+    except OSError:
         return "FILE"
+    for offset, signature, category in MAGIC_SIGNATURES:
+        if head.startswith(signature, offset):
+            return file_types[category]
+    if head.startswith(b"#!") and b"python" in head.split(b"\n", 1)[0]:
+        return file_types["python"]
+    return "FILE"
+
+
+class SniffCache:
+    """Sniffed file types keyed by (device, inode, mtime), so unchanged files aren't opened again"""
+    def __init__(self, max_entries: int = SNIFF_CACHE_SIZE):
+        self.max_entries = max_entries
+        self._types: "collections.OrderedDict[Tuple[int, int, int], str]" = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def file_type(self, path: str, file_stat: os.stat_result) -> str:
+        """
+        Finds type of file from its content, reading file only if it changed since last call
+        :param path: file path
+        :param file_stat: stat result of file
+        :return: file type
+        """
+        key = (file_stat.st_dev, file_stat.st_ino, file_stat.st_mtime_ns)
+        with self._lock:
+            file_type = self._types.get(key)
+            if file_type is not None:
+                self._types.move_to_end(key)
+                return file_type
+        file_type = sniff_file_type(path)
+        with self._lock:
+            self._types[key] = file_type
+            while len(self._types) > self.max_entries:
+                self._types.popitem(last=False)
+        return file_type
+
 
-def permissions_finder(file) -> list[str]:
+sniff_cache = SniffCache()
+
+
+def current_identity() -> Optional[Tuple[int, Set[int]]]:
+    """
+    Finds user and groups used for permission checks
+    :return: real user ID and group IDs, None where OS has no user IDs
+    """
+    if not hasattr(os, "getuid"):
+        return None
+    return os.getuid(), {os.getgid(), *os.getgroups()}
+
+
+def mode_permissions(file_stat: os.stat_result, identity: Optional[Tuple[int, Set[int]]]) -> List[str]:
+    """
+    Decodes permissions of user from st_mode, like os.access without a system call per check
+    :param file_stat: stat result of file
+    :param identity: result of current_identity()
+    :return: permissions array
+    """
+    mode = file_stat.st_mode
+    if identity is not None and identity[0] == 0:
+        return ["+r", "+w"] + (["+x"] if mode & 0o111 else [])
+    if identity is None or file_stat.st_uid == identity[0]:
+        shift = 6
+    elif file_stat.st_gid in identity[1]:
+        shift = 3
+    else:
+        shift = 0
+    bits = (mode >> shift) & 0o7
+    return [permission for bit, permission in [(0o4, "+r"), (0o2, "+w"), (0o1, "+x")] if bits & bit]
+
+
+def permissions_finder(file) -> List[str]:
     """
     Finds Permissions of file
     :param file: file
     :return: permissions array
     """
-    if os.path.isfile(file) and os.access(file, os.F_OK):
-        permissions = []
-        if os.access(file, os.R_OK):
-            permissions.append("+r")
-        if os.access(file, os.W_OK):
-            permissions.append("+w")
-        if os.access(file, os.X_OK):
-            permissions.append("+x")
-        return permissions
+    try:
+        file_stat = os.stat(file)
+    except OSError:
+        file_stat = None
+    if file_stat is not None and stat.S_ISREG(file_stat.st_mode):
+        return mode_permissions(file_stat, current_identity())
     else:
         printf(f"{file} should be file")
 
 
+def mode_item_type(mode: int) -> Optional[str]:
+    """
+    Decodes item type from st_mode
+    :param mode: st_mode
+    :return: item type, None for unknown types
+    """
+    if stat.S_ISREG(mode):
+        return "FILE"
+    elif stat.S_ISDIR(mode):
+        return "DIRECTORY"
+    elif stat.S_ISCHR(mode):
+        return "CHAR-DEVICE"
+    elif stat.S_ISBLK(mode):
+        return "BLOCK-DEVICE"
+    elif stat.S_ISSOCK(mode):
+        return "SOCKET"
+    elif stat.S_ISFIFO(mode):
+        return "FIFO"
+    return None
+
+
+def scan_item(entry: os.DirEntry, need_stat: bool = False) -> Tuple[Optional[str], Optional[os.stat_result]]:
+    """
+    Finds item type of directory entry with at most one stat
+    Files and directories are recognized from scandir's cached type, symbolic links are followed and
+    other types are decoded from st_mode
+    :param entry: directory entry
+    :param need_stat: stat regular files as well (default: False)
+    :return: item type (SYMBOLIC-LINK for broken links, None for unknown types), stat result if one was made
+    """
+    try:
+        if entry.is_symlink():
+            entry_stat = entry.stat()
+            item_type = mode_item_type(entry_stat.st_mode)
+            return item_type if item_type in ["FILE", "DIRECTORY"] else "SYMBOLIC-LINK", entry_stat
+        if entry.is_file(follow_symlinks=False):
+            return "FILE", entry.stat(follow_symlinks=False) if need_stat else None
+        if entry.is_dir(follow_symlinks=False):
+            return "DIRECTORY", None
+        entry_stat = entry.stat(follow_symlinks=False)
+        return mode_item_type(entry_stat.st_mode), entry_stat
+    except OSError:
+        return "SYMBOLIC-LINK", None
+
+
+def file_suffix(name: str) -> str:
+    """
+    Joins all suffixes of file name, like "".join(Path(name).suffixes)
+    :param name: file name
+    :return: suffixes, e.g. ".tar.gz"
+    """
+    if name.endswith("."):
+        return ""
+    stripped = name.lstrip(".")
+    dot = stripped.find(".")
+    return stripped[dot:] if dot != -1 else ""
+
+
 PIPE = "║ "
 ELBOW = "╚══⫸ "
 TEE = "╠══⫸ "
@@ -211,36 +426,49 @@ class DirectoryTree:
         """
         Generate Tree
         """
-        tree = self._generator.build_tree()
-        for entry in tree:
-            printf(entry)
+        print_lines(self.lines(), console)
+
+    def lines(self) -> Iterator[str]:
+        """
+        Generates Tree lazily, walking directories only as lines are consumed
+        :return: iterator of tree lines
+        """
+        return self._generator.iter_tree()
 
 
 class _TreeGenerator:
     def __init__(self, root_dir, dir_only=False):
         self._root_dir = Path(root_dir)
         self._dir_only = dir_only
-        self._tree = []
 
     def build_tree(self):
         """
         Builds Tree
         :return: built tree
         """
-        self._tree_head()
-        self._tree_body(self._root_dir)
-        return self._tree
+        return list(self.iter_tree())
+
+    def iter_tree(self) -> Iterator[str]:
+        """
+        Builds Tree lazily
+        :return: iterator of tree lines
+        """
+        yield from self._tree_head()
+        yield from self._tree_body(self._root_dir)
 
     def _tree_head(self):
-        self._tree.append(f"{self._root_dir}{os.sep}")
-        self._tree.append(PIPE)
+        yield f"{self._root_dir}{os.sep}"
+        yield PIPE
 
     def _tree_body(self, directory, prefix=""):
         entries = self._prepare_entries(directory)
         entries_count = len(entries)
         for index, entry in enumerate(entries):
             connector = ELBOW if index == entries_count - 1 else TEE
-            self._add_directory(entry, index, entries_count, prefix, connector) if entry.is_dir() else self._add_file(entry, prefix, connector)
+            if entry.is_dir():
+                yield from self._add_directory(entry, index, entries_count, prefix, connector)
+            else:
+                yield self._add_file(entry, prefix, connector)
 
     def _prepare_entries(self, directory):
         entries = directory.iterdir()
@@ -249,72 +477,84 @@ class _TreeGenerator:
         return sorted(entries, key=lambda entry: entry.is_file())
 
     def _add_directory(self, directory, index, entries_count, prefix, connector):
-        self._tree.append(f"{prefix}{connector} {directory.name}{os.sep}")
+        yield f"{prefix}{connector} {directory.name}{os.sep}"
         prefix += PIPE_PREFIX if index != entries_count - 1 else SPACE_PREFIX
-        self._tree_body(directory=directory, prefix=prefix, )
-        self._tree.append(prefix.rstrip())
+        yield from self._tree_body(directory=directory, prefix=prefix, )
+        yield prefix.rstrip()
 
     def _add_file(self, file, prefix, connector):
-        self._tree.append(f"{prefix}{connector} {file.name}")
+        return f"{prefix}{connector} {file.name}"
 
 
-def ls(color=False, permissions=False, path=os.getcwd()):
+def ls(color=False, permissions=False, path=None, sniff=False):
     """
     Bash's ls function for Python
     :param color: display colors (default: False)
     :param permissions:  display permissions (default: False)
-    :param path: path_item, from where to display items
+    :param path: path_item, from where to display items (default: current working directory)
+    :param sniff: detect type of files with unknown extension from content (default: False)
     """
-    for item in Path(path).iterdir():
-        extension = "".join(item.suffixes) if item.is_file() else extension = None
-        if not color and not permissions:
-            if item.is_file():
-                file_type = "FILE" if extension not in known_file_extensions else f"{file_type_finder(extension)}"
-                printf(f"<item-type/{file_type}>    |   {item}")
-            elif item.is_dir():
-                printf(f"<item-type/DIRECTORY>  |   {item}")
-            elif item.is_symlink():
-                printf(f"<item-type/SYMBOLIC-LINK>  |   {item}")
-            elif item.is_mount():
-                printf(f"<item-type/MOUNT>  |   {item}")
-            elif item.is_char_device():
-                printf(f"<item-type/CHAR-DEVICE>    |   {item}")
-            elif item.is_block_device():
-                printf(f"<item-type/BLOCK-DEVICE>   |   {item}")
-            elif item.is_socket():
-                printf(f"<item-type/SOCKET> |   {item}")
-            elif item.is_fifo():
-                printf(f"<item-type/FIFO>   |   {item}")
-            elif item.is_reserved():
-                printf(f"<item-type/RESERVED>   |   {item}")
-        elif not color and permissions:
-            if os.path.isfile(item):
-                printf(f"<item-type/FILE>   |   {item}  |   {''.join(permissions_finder(item))}" if os.path.isfile(item))
-            else:
-                printf(f"<item-type/DIRECTORY>  |   {item}")
-        elif color and permissions:
-            if os.path.isfile(item):
-                permissionsList = permissions_finder(item)
-                if "+x" in permissionsList and extension not in known_file_extensions:
-                    printf(
-                        f"<[yellow]item-type[/]/[bold italic green]FILE[/]> |   [italic green]{item}[/]    | {''.join(permissions_finder(item))}")
-            elif item.is_dir():
-                printf(f"<[yellow]item-type[/]/[bold italic blue]DIRECTORY[/]>  |   [italic blue]{item}[/]")
-            elif item.is_symlink():
-                printf(f"<[yellow]item-type[/]/[bold italic cyan]SYMBOLIC-LINK[/]>  |   [italic cyan]{item}[/]")
-            elif item.is_mount():
-                printf(
-                    f"<[yellow]item-type[/]/[bold italic yellow on black]MOUNT[/]>  |   [italic yellow on black]{item}[/]")
-            elif item.is_char_device():
-                printf(f"<item-type/CHAR-DEVICE>    |   {item}")
-            elif item.is_block_device():
-                printf(f"<item-type/BLOCK-DEVICE>   |   {item}")
-            elif item.is_socket():
-                printf(f"<item-type/SOCKET> |   {item}")
-            elif item.is_fifo():
-                printf(f"<item-type/FIFO>   |   {item}")
-            elif item.is_reserved():
-                printf(f"<item-type/RESERVED>   |   {item}")
+    print_lines(ls_lines(color, permissions, path, sniff), console)
+
+
+def ls_lines(color=False, permissions=False, path=None, sniff=False) -> Iterator[str]:
+    """
+    Bash's ls function for Python, producing lines lazily
+    Entries come from os.scandir, so each costs at most one stat
+    :param color: display colors (default: False)
+    :param permissions:  display permissions (default: False)
+    :param path: path_item, from where to display items (default: current working directory)
+    :param sniff: detect type of files with unknown extension from content (default: False)
+    :return: iterator of output lines (rich markup)
+    """
+    directory = str(Path(path if path is not None else os.getcwd()))
+    head = "" if directory == "." else os.path.join(directory, "")
+    identity = current_identity() if permissions else None
+    with os.scandir(directory) as entries:
+        for entry in entries:
+            item = head + entry.name
+            item_type, item_stat = scan_item(entry, need_stat=permissions or sniff)
+            extension = file_suffix(entry.name) if item_type == "FILE" else None
+            if not color and not permissions:
+                if item_type == "FILE":
+                    file_type = file_type_finder(extension)
+                    if sniff and file_type == "FILE":
+                        file_type = sniff_cache.file_type(item, item_stat)
+                    yield f"<item-type/{file_type}>    |   {item}"
+                elif item_type == "DIRECTORY":
+                    yield f"<item-type/DIRECTORY>  |   {item}"
+                elif item_type == "SYMBOLIC-LINK":
+                    yield f"<item-type/SYMBOLIC-LINK>  |   {item}"
+                elif item_type == "CHAR-DEVICE":
+                    yield f"<item-type/CHAR-DEVICE>    |   {item}"
+                elif item_type == "BLOCK-DEVICE":
+                    yield f"<item-type/BLOCK-DEVICE>   |   {item}"
+                elif item_type == "SOCKET":
+                    yield f"<item-type/SOCKET> |   {item}"
+                elif item_type == "FIFO":
+                    yield f"<item-type/FIFO>   |   {item}"
+            elif not color and permissions:
+                if item_type == "FILE":
+                    yield f"<item-type/FILE>   |   {item}  |   {''.join(mode_permissions(item_stat, identity))}"
+                else:
+                    yield f"<item-type/DIRECTORY>  |   {item}"
+            elif color and permissions:
+                if item_type == "FILE":
+                    permissionsList = mode_permissions(item_stat, identity)
+                    if "+x" in permissionsList and file_type_finder(extension) == "FILE":
+                        yield f"<[yellow]item-type[/]/[bold italic green]FILE[/]> |   [italic green]{item}[/]    | {''.join(permissionsList)}"
+                elif item_type == "DIRECTORY":
+                    yield f"<[yellow]item-type[/]/[bold italic blue]DIRECTORY[/]>  |   [italic blue]{item}[/]"
+                elif item_type == "SYMBOLIC-LINK":
+                    yield f"<[yellow]item-type[/]/[bold italic cyan]SYMBOLIC-LINK[/]>  |   [italic cyan]{item}[/]"
+                elif item_type == "CHAR-DEVICE":
+                    yield f"<item-type/CHAR-DEVICE>    |   {item}"
+                elif item_type == "BLOCK-DEVICE":
+                    yield f"<item-type/BLOCK-DEVICE>   |   {item}"
+                elif item_type == "SOCKET":
+                    yield f"<item-type/SOCKET> |   {item}"
+                elif item_type == "FIFO":
+                    yield f"<item-type/FIFO>   |   {item}"
 
 
 def walk_directory(directory: Path, tree: Tree) -> None:
@@ -325,8 +565,11 @@ def walk_directory(directory: Path, tree: Tree) -> None:
             continue
         if path.is_dir():
             style = "dim" if path.name.startswith("__") else ""
-            for x in sorted(Path(directory).iterdir(), key=lambda path_: (path_.is_file(), path_.name.lower()),):
-                branch = tree.add(f"[bold cyan] <[/]💠/📦[bold yellow]>[/] link file://{path}]{escape(path.name)}", style=style, guide_style=style, ) if x.is_file() and x.name.lower == "ppm_package" else branch = tree.add(f"[bold magenta]:open_file_folder: [link file://{path}]{escape(path.name)}", style=style, guide_style=style, )
+            is_ppm_package = any(x.is_file() and x.name.lower() == "ppm_package" for x in path.iterdir())
+            if is_ppm_package:
+                branch = tree.add(f"[bold cyan] <[/]💠/📦[bold yellow]>[/] [link file://{path}]{escape(path.name)}", style=style, guide_style=style, )
+            else:
+                branch = tree.add(f"[bold magenta]:open_file_folder: [link file://{path}]{escape(path.name)}", style=style, guide_style=style, )
             walk_directory(path, branch)
         else:
             is_PPM_Package = False
@@ -349,26 +592,26 @@ def walk_directory(directory: Path, tree: Tree) -> None:
             text_filename.append(f" ({decimal(file_size)})", "blue")
             if path.suffix in python_file_extensions:
                 icon = "🐍 "
-            elif path.suffix == pps_file_extension:
+            elif path.suffix in pps_file_extension:
                 icon = "💠 "
-            elif path.suffix == lock_file_extension:
+            elif "".join(path.suffixes) in ppm_file_extension:
+                icon = "💠🔒 "
+            elif path.suffix in lock_file_extension:
                 icon = "🔒 "
-            elif path.suffixe == package_file_extension:
+            elif path.suffix in package_file_extension:
                 icon = "📦 "
-            elif ".".join(path.suffixes) == ppm_file_extension:
-                icon = "💠🔒 "
             else:
                 icon = "📄 "
             tree.add(Text(icon) + text_filename)
 
 
-def rich_tree(path=os.getcwd()):
+def rich_tree(path=None):
     """
     Prints Rich Tree
-    :param path: path_item
+    :param path: path_item (default: current working directory)
     """
     try:
-        directory = os.path.abspath(path)
+        directory = os.path.abspath(path if path is not None else os.getcwd())
     except IndexError as ie:
         logger("f{ie}", "error")
     else:
@@ -8,6 +8,7 @@ __package__ = "Als-Plugin"
 __version__ = "0.0.1"
 __package_link__ = "GitHub: https://www.github.com/UltraStudioLTD/Als"
 __description__ = "Python based Advanced version of Bash's \"ls\" command"
+__commands__ = {"als": "Als:als_lines"}
 __author__ = "Luka Mamukashvili (GitHub: UltraStudioLTD)"
 __author_links__ = {
     "GitHub": "https://www.github.com/UltraStudioLTD",
@@ -1,15 +1,39 @@
 #!/usr/bin/env python3
 """DownCLI Plugin for PyShell"""
+import asyncio
+import collections
+import hashlib
+import itertools
+import json
 import os.path
+import queue
+import random
+import shutil
 import signal
+import sys
+import threading
+import time
 from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Deque, Dict, Iterable, Iterator, List, Optional, Set, TextIO, Tuple
+from urllib.parse import urlsplit
 import requests
+from requests.adapters import HTTPAdapter
 from rich import print as printf, pretty
 from rich.progress import *
 from rich.console import Console
+from rich.markup import escape
 from rich.table import Table
 from rich.panel import Panel
 
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+try:
+    from Core import PYSHELL_DIR
+except ImportError:
+    PYSHELL_DIR = os.path.join(os.path.expanduser("~"), ".pyshell")
+
 pretty.install()
 console = Console()
 __package__ = "[red]DownCLI-Plugin[/]"
@@ -18,60 +42,1191 @@ __description__ = "DownCLI Plugin for PyShell"
 __package_link__ = "[bold black on white]Git[/][bold italic]Hub[/]: https://www.github.com/UltraStudioLTD/DownCLI"
 __author__ = "[bold blue]Luka Mamukashvili[/] ([bold black on white]Git[/][bold italic]Hub[/]: [italic cyan]UltraStudioLTD[/])"
 __author_links__ = "[bold black on white]Git[/][bold italic]Hub[/]: https://www.github.com/UltraStudioLTD\n[bold black on white]Dev[/]: https://www.dev.to/ultrastudio"
-progress = Progress(TextColumn("[{task.fields[response_code]}] <[bold yellow]{task.fields[content_type]}[/]> [bold blue]{task.fields[filename]}", justify="right"), BarColumn(bar_width=None), "[progress.percentage]{task.percentage:>3.1f}%", "•", DownloadColumn(), "•", TransferSpeedColumn(), "•", TimeRemainingColumn(), TimeElapsedColumn(), SpinnerColumn())
-done_event = Event()
+MAX_WORKERS = 16
+MAX_PER_HOST = 4
+READ_AHEAD = 4096
+RETRIES = 3
+BACKOFF = 0.5
+RETRY_STATUSES = [408, 425, 429, 500, 502, 503, 504]
+PERMANENT_ERRORS = (requests.exceptions.MissingSchema, requests.exceptions.InvalidSchema, requests.exceptions.InvalidURL, requests.exceptions.URLRequired)
+TIMEOUT = (10, 60)
+HOST_POOLS = 32
+CHUNK_SIZE = 256 * 1024
+WRITE_BUFFER_SIZE = 4 * 1024 * 1024
+SEGMENTS = 4
+MIN_SEGMENT_SIZE = 8 * 1024 * 1024
+CONNECTIONS_PER_HOST = MAX_PER_HOST * SEGMENTS
+CACHE_DIR = os.path.join(PYSHELL_DIR, "downcli-cache")
+CACHE_MAX_SIZE = 1024 * 1024 * 1024
+HASH_BLOCK_SIZE = 1024 * 1024
+FICLONE = 0x40049409
+REFRESH_PER_SECOND = 10
+HEADLESS_INTERVAL = 1.0
+RATE_SMOOTHING = 0.3
+
+
+def create_progress() -> Progress:
+    """
+    Creates live progress display of downloads
+    :return: progress display
+    """
+    return Progress(TextColumn("[{task.fields[response_code]}] <[bold yellow]{task.fields[content_type]}[/]> [bold blue]{task.fields[filename]}", justify="right"), BarColumn(bar_width=None), "[progress.percentage]{task.percentage:>3.1f}%", "•", DownloadColumn(), "•", TransferSpeedColumn(), "•", TimeRemainingColumn(), TimeElapsedColumn(), SpinnerColumn())
+
+
+def unknown_total(display: Progress) -> Optional[float]:
+    """
+    Finds total shown for downloads of unknown size: None (pulsing bar) where rich supports it, else 0
+    Checked on a hidden task, before display is started
+    :param display: progress display
+    :return: total
+    """
+    task_id = None
+    try:
+        task_id = display.add_task("", total=None, visible=False)
+        display.update(task_id, total=None, completed=0)
+    except TypeError:
+        return 0
+    finally:
+        if task_id is not None:
+            display.remove_task(task_id)
+    return None
+
+
+def create_session(connections_per_host: int = CONNECTIONS_PER_HOST) -> requests.Session:
+    """
+    Creates HTTP session reusing keep-alive connections, at most connections_per_host per host
+    Requests wait for a free connection, so the limit must cover all segments of all downloads from one host
+    :param connections_per_host: connection limit per host (default: CONNECTIONS_PER_HOST)
+    :return: session
+    """
+    new_session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=HOST_POOLS, pool_maxsize=connections_per_host, pool_block=True)
+    new_session.mount("http://", adapter)
+    new_session.mount("https://", adapter)
+    return new_session
+
+
+class DownloadError(Exception):
+    """Failed download attempt, retryable errors are retried with backoff"""
+    def __init__(self, message: str, retryable: bool = True):
+        super().__init__(message)
+        self.retryable = retryable
+
+
+class HostSummary:
+    """Downloads, failures, retries and bytes of one host"""
+    def __init__(self):
+        self.files = 0
+        self.failures = 0
+        self.retries = 0
+        self.bytes = 0
+        self.started: Optional[float] = None
+        self.finished: Optional[float] = None
+
+    def throughput(self) -> float:
+        """
+        Average transfer rate while host had downloads running
+        :return: bytes per second
+        """
+        if self.started is None or self.finished is None or self.finished <= self.started:
+            return 0.0
+        return self.bytes / (self.finished - self.started)
+
+
+class TaskCounter:
+    """Bytes written by one worker for one task, only that worker writes it so no lock is taken per chunk"""
+    __slots__ = ["bytes"]
+
+    def __init__(self):
+        self.bytes = 0
+
+
+class ProgressAggregator:
+    """
+    Progress of downloads shared by workers
+    Workers count bytes in their own TaskCounter, totals are pushed to the rich display REFRESH_PER_SECOND times
+    a second, or written every HEADLESS_INTERVAL seconds as NDJSON lines (bytes, rate and ETA per task) when headless
+    """
+    def __init__(self, display: Progress, refresh_per_second: float = REFRESH_PER_SECOND, headless_interval: float = HEADLESS_INTERVAL):
+        self.display = display
+        self.unknown_total = unknown_total(display)
+        self.refresh_per_second = refresh_per_second
+        self.headless_interval = headless_interval
+        self.headless = False
+        self.output: Optional[TextIO] = None
+        self.sink: Optional[Callable[[str], object]] = None
+        self._tasks: Dict[int, dict] = {}
+        self._ids = itertools.count()
+        self._lock = threading.RLock()
+        self._stop = Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def __enter__(self) -> "ProgressAggregator":
+        self.output = sys.stdout
+        if not self.headless:
+            self.display.start()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="downcli-progress", daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self._stop.set()
+        self._thread.join()
+        self.push()
+        if not self.headless:
+            self.display.stop()
+
+    def _run(self) -> None:
+        interval = self.headless_interval if self.headless else 1 / self.refresh_per_second
+        while not self._stop.wait(interval):
+            self.push()
+
+    def add_task(self, url: str, filename: str) -> int:
+        """
+        Adds download, shown from next refresh
+        :param url: URL
+        :param filename: file name
+        :return: task ID
+        """
+        with self._lock:
+            task_id = next(self._ids)
+            self._tasks[task_id] = {
+                "url": url, "filename": filename, "content_type": "...", "status": None, "total": None, "started": False,
+                "base": 0, "counters": [], "sample": (time.monotonic(), 0), "rate": 0.0, "display_id": None, "display_started": False
+            }
+            return task_id
+
+    def update(self, task_id: int, **fields) -> None:
+        """
+        Changes task fields: filename, content_type, status (HTTP status code), total or started
+        :param task_id: task ID
+        """
+        with self._lock:
+            self._tasks[task_id].update(fields)
+
+    def start_task(self, task_id: int) -> None:
+        """
+        Marks task as transferring, so elapsed time and rate are shown
+        :param task_id: task ID
+        """
+        self.update(task_id, started=True)
+
+    def reset(self, task_id: int, completed: int = 0) -> None:
+        """
+        Sets completed bytes, discarding counters of earlier attempts
+        :param task_id: task ID
+        :param completed: bytes already downloaded (default: 0)
+        """
+        with self._lock:
+            task = self._tasks[task_id]
+            task["base"], task["counters"], task["sample"], task["rate"] = completed, [], (time.monotonic(), completed), 0.0
+
+    def counter(self, task_id: int) -> TaskCounter:
+        """
+        Creates byte counter of a worker
+        :param task_id: task ID
+        :return: counter
+        """
+        counter = TaskCounter()
+        with self._lock:
+            self._tasks[task_id]["counters"].append(counter)
+        return counter
+
+    def remove_task(self, task_id: int) -> None:
+        """
+        Removes finished task
+        :param task_id: task ID
+        """
+        with self._lock:
+            task = self._tasks.pop(task_id)
+            if self.headless:
+                self.emit(self._record(task_id, task, self._sample(task, time.monotonic()), done=True))
+            elif task["display_id"] is not None:
+                self.display.remove_task(task["display_id"])
+
+    def log(self, message: str) -> None:
+        """
+        Logs message above progress display, or as NDJSON line when headless
+        :param message: message
+        """
+        if self.headless:
+            self.emit({"event": "log", "time": time.time(), "message": message})
+        else:
+            self.display.console.log(message, _stack_offset=2)
+
+    def emit(self, record: dict) -> None:
+        """
+        Writes NDJSON line to sink, or to stdout of the running downcli (sys.stdout when not running)
+        :param record: JSON object
+        """
+        line = json.dumps(record)
+        with self._lock:
+            if self.sink is not None:
+                self.sink(line)
+                return
+            output = self.output or sys.stdout
+            output.write(line + "\n")
+            output.flush()
+
+    @staticmethod
+    def _sample(task: dict, now: float) -> int:
+        completed = task["base"] + sum(counter.bytes for counter in task["counters"])
+        sample_time, sample_bytes = task["sample"]
+        if now > sample_time:
+            rate = (completed - sample_bytes) / (now - sample_time)
+            task["rate"] = rate if task["rate"] == 0 else RATE_SMOOTHING * rate + (1 - RATE_SMOOTHING) * task["rate"]
+            task["sample"] = (now, completed)
+        return completed
+
+    @staticmethod
+    def _record(task_id: int, task: dict, completed: int, done: bool = False) -> dict:
+        total = task["total"]
+        rate = task["rate"]
+        return {
+            "event": "progress", "time": time.time(), "task": task_id, "url": task["url"], "file": task["filename"],
+            "status": task["status"], "bytes": completed, "total": total, "rate": round(rate, 1),
+            "eta": round((total - completed) / rate, 1) if total and rate > 0 and not done else None, "done": done
+        }
+
+    def push(self) -> None:
+        """Aggregates counters and updates display (or writes NDJSON lines)"""
+        now = time.monotonic()
+        with self._lock:
+            for task_id, task in self._tasks.items():
+                completed = self._sample(task, now)
+                if self.headless:
+                    if task["started"]:
+                        self.emit(self._record(task_id, task, completed))
+                    continue
+                status = task["status"]
+                response_code = "..." if status is None else f"[green]{status}[/]" if status < 400 else f"[red]{status}[/]"
+                fields = {"filename": task["filename"], "content_type": task["content_type"], "response_code": response_code}
+                total = task["total"] if task["total"] is not None else self.unknown_total
+                if task["display_id"] is None:
+                    task["display_id"] = self.display.add_task("download", total=total, start=False, **fields)
+                if task["started"] and not task["display_started"]:
+                    self.display.start_task(task["display_id"])
+                    task["display_started"] = True
+                self.display.update(task["display_id"], total=total, completed=completed, **fields)
+
+
+class DownloadRun:
+    """
+    State of one downcli invocation: HTTP session, cancellation event and progress
+    Every invocation has its own, so overlapping background downcli jobs don't interfere
+    """
+    def __init__(self, connections_per_host: int = CONNECTIONS_PER_HOST, headless: bool = False):
+        self.session = create_session(connections_per_host)
+        self.done_event = Event()
+        self.tracker = ProgressAggregator(create_progress())
+        self.tracker.headless = headless
+
+    def cancel(self, signum: Optional[int] = None, frame=None) -> None:
+        """
+        Stops downloads of this invocation, also installed as SIGINT handler
+        :param signum: signal number when called as signal handler (default: None)
+        :param frame: stack frame when called as signal handler (default: None)
+        """
+        self.done_event.set()
+
+
+active_runs: Dict[int, DownloadRun] = {}
+
+
+def preallocate(fd: int, size: int) -> None:
+    """
+    Reserves disk space for file of known size, where supported by OS and file system
+    :param fd: file descriptor
+    :param size: file size
+    """
+    if hasattr(os, "posix_fallocate"):
+        try:
+            os.posix_fallocate(fd, 0, size)
+        except OSError:
+            pass
+
+
+class DownloadState:
+    """
+    Sidecar file of a .part download: URL, validator (ETag or Last-Modified), size and completed byte ranges
+    """
+    def __init__(self, path: str, url: str, validator: str, size: int, completed: Optional[List[List[int]]] = None):
+        self.path = path
+        self.url = url
+        self.validator = validator
+        self.size = size
+        self.completed: List[List[int]] = completed or []
+        self._lock = threading.Lock()
+
+    @classmethod
+    def load(cls, path: str, url: str) -> Optional["DownloadState"]:
+        """
+        Reads state file
+        :param path: state file path
+        :param url: URL being downloaded, state of other URLs is ignored
+        :return: state, None if missing, invalid or for other URL
+        """
+        try:
+            with open(path, "r") as state_file:
+                data = json.load(state_file)
+            state = cls(path, data["url"], data["validator"], int(data["size"]), [[int(start), int(end)] for start, end in data["completed"]])
+        except (OSError, ValueError, KeyError, TypeError):
+            return None
+        return state if state.url == url and state.validator else None
+
+    def save(self) -> None:
+        """Writes state file atomically"""
+        with self._lock:
+            data = {"url": self.url, "validator": self.validator, "size": self.size, "completed": self.completed}
+            temp_path = f"{self.path}.{threading.get_ident()}.tmp"
+            with open(temp_path, "w") as state_file:
+                json.dump(data, state_file)
+            os.replace(temp_path, self.path)
+
+    def add(self, start: int, end: int) -> None:
+        """
+        Records downloaded byte range and saves state
+        :param start: first byte
+        :param end: end of range (exclusive)
+        """
+        if start >= end:
+            return
+        with self._lock:
+            merged = []
+            for span in sorted(self.completed + [[start, end]]):
+                if merged and span[0] <= merged[-1][1]:
+                    merged[-1][1] = max(merged[-1][1], span[1])
+                else:
+                    merged.append(list(span))
+            self.completed = merged
+        self.save()
+
+    def remaining(self) -> List[Tuple[int, int]]:
+        """
+        Byte ranges not downloaded yet
+        :return: (start, end) ranges, end exclusive
+        """
+        gaps = []
+        position = 0
+        for start, end in self.completed:
+            if start > position:
+                gaps.append((position, start))
+            position = max(position, end)
+        if position < self.size:
+            gaps.append((position, self.size))
+        return gaps
+
+    def downloaded(self) -> int:
+        """
+        Counts downloaded bytes
+        :return: bytes
+        """
+        return sum(end - start for start, end in self.completed)
+
+    def remove(self) -> None:
+        """Deletes state file"""
+        try:
+            os.remove(self.path)
+        except OSError:
+            pass
+
+
+def file_digest(path: str) -> str:
+    """
+    Hashes file content
+    :param path: file path
+    :return: SHA-256 hex digest
+    """
+    digest = hashlib.sha256()
+    with open(path, "rb") as content_file:
+        for block in iter(lambda: content_file.read(HASH_BLOCK_SIZE), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def clone_file(source: str, destination: str) -> str:
+    """
+    Makes destination an independent copy of source, sharing data blocks (reflink) where file system supports it
+    Destination is a new writable inode (never a hard link) and is replaced atomically
+    :param source: existing file
+    :param destination: new file path
+    :return: "reflink" or "copy"
+    """
+    temp_path = f"{destination}.{threading.get_ident()}.tmp"
+    method = None
+    try:
+        if fcntl is not None:
+            with open(source, "rb") as source_file, open(temp_path, "wb") as temp_file:
+                try:
+                    fcntl.ioctl(temp_file.fileno(), FICLONE, source_file.fileno())
+                    method = "reflink"
+                except OSError:
+                    pass
+            if method is None:
+                os.remove(temp_path)
+        if method is None:
+            shutil.copyfile(source, temp_path)
+            method = "copy"
+        os.replace(temp_path, destination)
+    except OSError:
+        try:
+            os.remove(temp_path)
+        except OSError:
+            pass
+        raise
+    return method
+
+
+class DownloadCache:
+    """
+    Content-addressed cache of downloads
+    Files are stored read-only once per SHA-256 digest in objects/, index.json maps URLs to digest and validators
+    (ETag, Last-Modified) sent as If-None-Match / If-Modified-Since, so unchanged files are copied from cache
+    Cache and downloaded files never share an inode (reflink or copy), so editing a download can't change the cache
+    Least recently used files are evicted when cache grows over max_size, which is kept in the index, larger files
+    aren't cached
+    """
+    def __init__(self, directory: str = CACHE_DIR, max_size: int = CACHE_MAX_SIZE):
+        self.directory = directory
+        self.max_size = max_size
+        self.urls: Dict[str, dict] = {}
+        self.objects: Dict[str, dict] = {}
+        self.stats: Dict[str, int] = {}
+        self._loaded = False
+        self._lock = threading.RLock()
+
+    @property
+    def index_path(self) -> str:
+        """Index file path"""
+        return os.path.join(self.directory, "index.json")
+
+    def object_path(self, digest: str) -> str:
+        """
+        Path of cached file
+        :param digest: SHA-256 hex digest
+        :return: path
+        """
+        return os.path.join(self.directory, "objects", digest[:2], digest)
+
+    def load(self) -> None:
+        """Reads index, once"""
+        with self._lock:
+            if self._loaded:
+                return
+            try:
+                with open(self.index_path, "r") as index_file:
+                    data = json.load(index_file)
+                self.urls, self.objects, self.stats = dict(data["urls"]), dict(data["objects"]), dict(data["stats"])
+                self.max_size = int(data.get("max_size", self.max_size))
+            except (OSError, ValueError, KeyError, TypeError):
+                self.urls, self.objects, self.stats = {}, {}, {}
+            self._loaded = True
+
+    def save(self) -> None:
+        """Writes index atomically"""
+        with self._lock:
+            if not self._loaded:
+                return
+            os.makedirs(self.directory, exist_ok=True)
+            temp_path = f"{self.index_path}.{os.getpid()}.tmp"
+            with open(temp_path, "w") as index_file:
+                json.dump({"urls": self.urls, "objects": self.objects, "stats": self.stats, "max_size": self.max_size}, index_file)
+            os.replace(temp_path, self.index_path)
+
+    def count(self, name: str, amount: int = 1) -> None:
+        """
+        Adds to statistics counter
+        :param name: counter name
+        :param amount: amount added (default: 1)
+        """
+        with self._lock:
+            self.stats[name] = self.stats.get(name, 0) + amount
+
+    def conditional_headers(self, url: str) -> Dict[str, str]:
+        """
+        Headers revalidating cached URL
+        :param url: URL
+        :return: If-None-Match / If-Modified-Since headers, empty if URL isn't cached
+        """
+        self.load()
+        with self._lock:
+            entry = self.urls.get(url)
+            if entry is None or entry["digest"] not in self.objects:
+                return {}
+            try:
+                if os.path.getsize(self.object_path(entry["digest"])) != self.objects[entry["digest"]]["size"]:
+                    return {}
+            except OSError:
+                return {}
+            headers = {}
+            if entry.get("etag"):
+                headers["If-None-Match"] = entry["etag"]
+            if entry.get("last_modified"):
+                headers["If-Modified-Since"] = entry["last_modified"]
+            return headers
+
+    def content_type(self, url: str) -> str:
+        """
+        Content type of cached URL
+        :param url: URL
+        :return: content type, "unknown" if not cached
+        """
+        with self._lock:
+            return self.urls.get(url, {}).get("content_type", "unknown")
+
+    def materialize(self, url: str, path: str) -> int:
+        """
+        Creates writable copy of cached URL
+        :param url: URL revalidated by server (304 Not Modified)
+        :param path: destination path
+        :return: file size
+        """
+        with self._lock:
+            entry = self.urls[url]
+            digest = entry["digest"]
+            try:
+                clone_file(self.object_path(digest), path)
+            except OSError:
+                del self.urls[url]
+                raise
+            self.objects[digest]["used"] = time.time()
+            size = self.objects[digest]["size"]
+            self.count("hits")
+            self.count("bytes_saved", size)
+            return size
+
+    def store(self, url: str, path: str, etag: Optional[str], last_modified: Optional[str], content_type: str) -> None:
+        """
+        Adds copy of downloaded file, identical content of other URLs is stored once, path itself is left untouched
+        Files larger than max_size are skipped
+        :param url: URL
+        :param path: downloaded file
+        :param etag: ETag response header
+        :param last_modified: Last-Modified response header
+        :param content_type: content type
+        """
+        self.load()
+        if os.path.getsize(path) > self.max_size:
+            with self._lock:
+                self.urls.pop(url, None)
+            return
+        digest = file_digest(path)
+        object_path = self.object_path(digest)
+        with self._lock:
+            if digest in self.objects and os.path.exists(object_path):
+                self.count("deduplicated")
+            else:
+                os.makedirs(os.path.dirname(object_path), exist_ok=True)
+                clone_file(path, object_path)
+                os.chmod(object_path, 0o444)
+                self.objects[digest] = {"size": os.path.getsize(object_path)}
+                self.count("stored")
+            self.objects[digest]["used"] = time.time()
+            self.urls[url] = {"digest": digest, "etag": etag, "last_modified": last_modified, "content_type": content_type}
+            self.evict()
+
+    def size(self) -> int:
+        """
+        Total size of cached files
+        :return: bytes
+        """
+        with self._lock:
+            return sum(cached["size"] for cached in self.objects.values())
+
+    def evict(self) -> None:
+        """Removes least recently used files until cache fits in max_size"""
+        with self._lock:
+            total = self.size()
+            if total <= self.max_size:
+                return
+            evicted = set()
+            for digest, cached in sorted(self.objects.items(), key=lambda item: item[1].get("used", 0)):
+                if total <= self.max_size:
+                    break
+                try:
+                    os.remove(self.object_path(digest))
+                    os.rmdir(os.path.dirname(self.object_path(digest)))
+                except OSError:
+                    pass
+                total -= cached["size"]
+                evicted.add(digest)
+                self.count("evicted")
+            for digest in evicted:
+                del self.objects[digest]
+            self.urls = {url: entry for url, entry in self.urls.items() if entry["digest"] not in evicted}
+
+
+download_cache = DownloadCache()
+
+
+def write_at(fd: int, data, offset: int) -> None:
+    """
+    Writes data at offset of file
+    :param fd: file descriptor
+    :param data: bytes-like data
+    :param offset: file offset
+    """
+    view = memoryview(data)
+    while view:
+        if hasattr(os, "pwrite"):
+            count = os.pwrite(fd, view, offset)
+        else:
+            os.lseek(fd, offset, os.SEEK_SET)
+            count = os.write(fd, view)
+        view = view[count:]
+        offset += count
+
+
+def write_stream(run: DownloadRun, task_id: int, response: requests.Response, fd: int, offset: int, length: Optional[int], state: Optional[DownloadState] = None) -> int:
+    """
+    Writes response body to file at offset, through reusable buffer of WRITE_BUFFER_SIZE
+    :param run: downcli invocation
+    :param task_id: task ID
+    :param response: streaming response
+    :param fd: file descriptor
+    :param offset: file offset of first byte
+    :param length: bytes to write, None for whole body
+    :param state: download state, written ranges are recorded in it (default: None)
+    :return: bytes written
+    """
+    buffer = bytearray(WRITE_BUFFER_SIZE)
+    filled = 0
+    written = 0
+    counter = run.tracker.counter(task_id)
+    try:
+        for data in response.iter_content(CHUNK_SIZE):
+            if length is not None and written + filled + len(data) > length:
+                data = data[:length - written - filled]
+            if filled + len(data) > len(buffer):
+                write_at(fd, memoryview(buffer)[:filled], offset + written)
+                if state is not None:
+                    state.add(offset + written, offset + written + filled)
+                written += filled
+                filled = 0
+            buffer[filled:filled + len(data)] = data
+            filled += len(data)
+            counter.bytes += len(data)
+            if run.done_event.is_set() or (length is not None and written + filled >= length):
+                break
+    finally:
+        write_at(fd, memoryview(buffer)[:filled], offset + written)
+        if state is not None:
+            state.add(offset + written, offset + written + filled)
+    return written + filled
 
 
-def handle_sigint():
-    """HandleSigint"""
-    done_event.set()
+def split_ranges(size: int, segments: int, min_segment_size: int) -> List[Tuple[int, int]]:
+    """
+    Splits file into byte ranges for parallel download
+    :param size: file size
+    :param segments: maximum number of segments
+    :param min_segment_size: minimum segment size in bytes
+    :return: (start, end) ranges, end exclusive
+    """
+    count = max(1, min(segments, size // max(min_segment_size, 1)))
+    step = -(-size // count)
+    return [(start, min(start + step, size)) for start in range(0, size, step)] or [(0, 0)]
 
 
-signal.signal(signal.SIGINT, handle_sigint)
+def fetch_range(run: DownloadRun, task_id: int, url: str, fd: int, start: int, end: int, validator: Optional[str], state: Optional[DownloadState] = None) -> int:
+    """
+    Downloads byte range of URL into file
+    :param run: downcli invocation
+    :param task_id: task ID
+    :param url: URL to Download
+    :param fd: file descriptor of destination file
+    :param start: first byte
+    :param end: end of range (exclusive)
+    :param validator: ETag or Last-Modified of first response, sent as If-Range
+    :param state: download state, written ranges are recorded in it (default: None)
+    :return: bytes written
+    :raises requests.RequestException: server didn't return requested range
+    """
+    headers = {"Range": f"bytes={start}-{end - 1}"}
+    if validator:
+        headers["If-Range"] = validator
+    with run.session.get(url, headers=headers, stream=True, timeout=TIMEOUT) as response:
+        if response.status_code != requests.codes.partial_content or not response.headers.get("Content-Range", "").startswith(f"bytes {start}-{end - 1}/"):
+            raise requests.RequestException(f"Server didn't return bytes {start}-{end - 1} of {url} (status {response.status_code})")
+        return write_stream(run, task_id, response, fd, start, end - start, state)
 
 
-def copy_url(task_id: TaskID, url: str, path: str) -> None:
+def copy_url(run: DownloadRun, task_id: int, url: str, path: str, segments: int = SEGMENTS, min_segment_size: int = MIN_SEGMENT_SIZE, cache: Optional[DownloadCache] = None) -> Optional[int]:
     """
-    Download URL
+    Download URL, size and content type are taken from the GET response headers
+    Large files from servers accepting byte ranges are downloaded in parallel segments written at their offsets
+    Data is written to path.part, with completed ranges recorded in path.part.json so an interrupted download
+    continues where it stopped (If-Range discards it when the file changed on server)
+    Cached URLs are requested conditionally and copied from cache when not modified
+    :param run: downcli invocation
     :param task_id: task ID
     :param url: URL to Download
-    :param path: Destination path
+    :param path: Destination path, .txt is added for plain text without extension
+    :param segments: maximum number of parallel segments (default: SEGMENTS)
+    :param min_segment_size: minimum segment size in bytes (default: MIN_SEGMENT_SIZE)
+    :param cache: download cache, None to disable (default: None)
+    :return: bytes downloaded, None if cancelled
+    :raises DownloadError: if download failed
     """
-    progress.console.log(f"Requesting {url}")
-    response = requests.get(url, stream=True)
-    meta = requests.head(url)
-    if "Content-Length" in meta.headers:
-        progress.update(task_id, total=int(meta.headers["Content-Length"]))
+    part_path = path + ".part"
+    state = DownloadState.load(part_path + ".json", url) if os.path.exists(part_path) else None
+    if state is not None and state.remaining():
+        headers = {"Range": f"bytes={state.remaining()[0][0]}-{state.remaining()[0][1] - 1}", "If-Range": state.validator}
+        run.tracker.log(f"Resuming {url}")
     else:
-        progress.update(task_id, total=int(len(response.content)))
-    with open(path, "wb") as destination_file:
-        progress.start_task(task_id)
-        for data in response.iter_content(32768):
-            destination_file.write(data)
-            progress.update(task_id, advance=len(data))
-            if done_event.is_set():
+        headers = cache.conditional_headers(url) if cache is not None else {}
+        run.tracker.log(f"Revalidating {url}" if headers else f"Requesting {url}")
+    try:
+        with run.session.get(url, headers=headers, stream=True, timeout=TIMEOUT) as response:
+            not_modified = response.status_code == requests.codes.not_modified and cache is not None
+            content_type = (cache.content_type(url) if not_modified else response.headers.get("Content-Type", "unknown")).split(";")[0]
+            if content_type == "text/plain" and len(os.path.basename(path).split(".")) == 1:
+                path += ".txt"
+            run.tracker.update(task_id, filename=os.path.basename(path), content_type=content_type, status=response.status_code)
+            if not_modified:
+                try:
+                    size = cache.materialize(url, path)
+                except OSError as cache_error:
+                    raise DownloadError(f"Can't copy {path} from cache: {cache_error}") from cache_error
+                run.tracker.update(task_id, total=size)
+                run.tracker.reset(task_id, size)
+                run.tracker.start_task(task_id)
+                run.tracker.log(f"Not modified, copied {path} from cache")
+                return 0
+            if not response.ok:
+                raise DownloadError(f"{response.status_code} {response.reason}", response.status_code in RETRY_STATUSES)
+            resumed = "Range" in headers and response.status_code == requests.codes.partial_content and response.headers.get("Content-Range", "").startswith(headers["Range"].replace("=", " ", 1) + "/")
+            etag, last_modified = response.headers.get("ETag"), response.headers.get("Last-Modified")
+            if resumed:
+                size = state.size
+                gaps = state.remaining()
+            else:
+                if state is not None:
+                    run.tracker.log(f"{url} changed on server, restarting download")
+                    state.remove()
+                size = int(response.headers["Content-Length"]) if "Content-Length" in response.headers and "Content-Encoding" not in response.headers else None
+                gaps = [(0, size)]
+                validator = etag or last_modified
+                state = DownloadState(part_path + ".json", url, validator, size) if validator and size else None
+            ranges = gaps
+            if size and (resumed or response.headers.get("Accept-Ranges") == "bytes"):
+                ranges = [(gap_start + start, gap_start + end) for gap_start, gap_end in gaps for start, end in split_ranges(gap_end - gap_start, max(segments // len(gaps), 1), min_segment_size)]
+            run.tracker.update(task_id, total=size)
+            run.tracker.reset(task_id, state.downloaded() if resumed else 0)
+            fd = os.open(part_path, os.O_WRONLY | os.O_CREAT | (0 if resumed else os.O_TRUNC) | getattr(os, "O_BINARY", 0), 0o666)
+            try:
+                if size and not resumed:
+                    preallocate(fd, size)
+                if state is not None:
+                    state.save()
+                if size is not None:
+                    run.tracker.start_task(task_id)
+                with ThreadPoolExecutor(max_workers=max(len(ranges) - 1, 1)) as segment_pool:
+                    futures = [segment_pool.submit(fetch_range, run, task_id, url, fd, start, end, state.validator if state else None, state) for start, end in ranges[1:]]
+                    first = ranges[0]
+                    written = write_stream(run, task_id, response, fd, first[0], None if first[1] is None else first[1] - first[0], state)
+                    written += sum(future.result() for future in futures)
+                if state is None and written != size and not run.done_event.is_set():
+                    os.ftruncate(fd, written)
+            finally:
+                os.close(fd)
+    except requests.RequestException as request_error:
+        raise DownloadError(str(request_error), not isinstance(request_error, PERMANENT_ERRORS)) from request_error
+    except OSError as os_error:
+        raise DownloadError(str(os_error), retryable=False) from os_error
+    if run.done_event.is_set():
+        if state is None:
+            try:
+                os.remove(part_path)
+            except OSError:
+                pass
+        return None
+    if state is not None and state.remaining():
+        raise DownloadError("connection closed early")
+    os.replace(part_path, path)
+    if state is not None:
+        state.remove()
+    if cache is not None and (etag or last_modified):
+        try:
+            cache.store(url, path, etag, last_modified, content_type)
+        except OSError as cache_error:
+            run.tracker.log(f"Can't cache {path}: {cache_error}")
+    if size is None:
+        run.tracker.update(task_id, total=written, started=True)
+    run.tracker.log(f"Downloaded {path}" + (f" ({len(ranges)} segments)" if len(ranges) > 1 else ""))
+    return written
+
+
+def read_manifest(manifest: Iterable[str]) -> Iterator[str]:
+    """
+    Reads URLs from manifest, one per line, empty lines and lines starting with # are skipped
+    :param manifest: manifest file, stdin or lines of previous pipeline stage
+    :return: URLs, read lazily
+    """
+    for line in manifest:
+        line = line.strip()
+        if line and not line.startswith("#"):
+            yield line
+
+
+async def download_with_retries(run: DownloadRun, url: str, destination_dir: str, pool: ThreadPoolExecutor, summary: HostSummary, retries: int, segments: int, min_segment_size: int, cache: Optional[DownloadCache]) -> None:
+    """
+    Downloads URL on thread pool, retrying retryable failures with exponential backoff
+    :param run: downcli invocation
+    :param url: URL to download
+    :param destination_dir: Download Directory
+    :param pool: thread pool running copy_url
+    :param summary: summary of URL's host
+    :param retries: number of retries
+    :param segments: maximum number of parallel segments
+    :param min_segment_size: minimum segment size in bytes
+    :param cache: download cache, None to disable
+    """
+    loop = asyncio.get_running_loop()
+    filename = url.split("/")[-1]
+    destination_path = os.path.join(destination_dir, filename)
+    task_id = run.tracker.add_task(url, filename)
+    if summary.started is None:
+        summary.started = time.monotonic()
+    try:
+        for attempt in range(retries + 1):
+            try:
+                written = await loop.run_in_executor(pool, copy_url, run, task_id, url, destination_path, segments, min_segment_size, cache)
+            except DownloadError as error:
+                if not error.retryable or attempt == retries or run.done_event.is_set():
+                    summary.failures += 1
+                    run.tracker.log(f"Failed {url}: {error}")
+                    return
+                delay = BACKOFF * 2 ** attempt * random.uniform(0.5, 1.5)
+                summary.retries += 1
+                run.tracker.log(f"Retrying {url} in {delay:.1f}s: {error}")
+                await asyncio.sleep(delay)
+            else:
+                if written is not None:
+                    summary.files += 1
+                    summary.bytes += written
                 return
-    progress.console.log(f"Downloaded {path}")
+    finally:
+        summary.finished = time.monotonic()
+        run.tracker.remove_task(task_id)
+
+
+async def download_all(run: DownloadRun, urls: Iterable[str], destination_dir: str, concurrency: int, per_host: int, retries: int, segments: int, min_segment_size: int, cache: Optional[DownloadCache]) -> Dict[str, HostSummary]:
+    """
+    Downloads URLs with at most concurrency downloads in total and per_host downloads per host
+    URLs are read on a thread into per-host queues holding at most READ_AHEAD URLs, so memory doesn't grow with number
+    of URLs, and a download starts only for a host with a free slot, so a busy host doesn't hold back the others
+    :param run: downcli invocation
+    :param urls: URLs to download
+    :param destination_dir: Download Directory
+    :param concurrency: maximum number of parallel downloads
+    :param per_host: maximum number of parallel downloads per host
+    :param retries: number of retries of failed downloads
+    :param segments: maximum number of parallel segments per file
+    :param min_segment_size: minimum segment size in bytes
+    :param cache: download cache, None to disable
+    :return: summaries by host
+    """
+    loop = asyncio.get_running_loop()
+    iterator = iter(urls)
+    pending: Dict[str, Deque[str]] = {}
+    active: Dict[str, int] = {}
+    summaries: Dict[str, HostSummary] = {}
+    running: Set[asyncio.Future] = set()
+    buffered = 0
+    exhausted = False
+    reading: Optional[asyncio.Future] = None
+    reader = ThreadPoolExecutor(max_workers=1, thread_name_prefix="downcli-reader")
+    pool = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="downcli")
+
+    async def download(host: str, url: str) -> None:
+        try:
+            await download_with_retries(run, url, destination_dir, pool, summaries[host], retries, segments, min_segment_size, cache)
+        finally:
+            active[host] -= 1
+
+    try:
+        while True:
+            if run.done_event.is_set():
+                pending.clear()
+                buffered = 0
+                exhausted = True
+            for host in list(pending):
+                queue = pending[host]
+                while queue and active[host] < per_host and len(running) < concurrency:
+                    buffered -= 1
+                    active[host] += 1
+                    running.add(asyncio.ensure_future(download(host, queue.popleft())))
+                if not queue:
+                    del pending[host]
+            if reading is None and not exhausted and buffered < READ_AHEAD:
+                reading = loop.run_in_executor(reader, next, iterator, None)
+            waiting = running | ({reading} if reading is not None else set())
+            if not waiting:
+                break
+            finished, _ = await asyncio.wait(waiting, return_when=asyncio.FIRST_COMPLETED)
+            for future in finished:
+                if future is reading:
+                    reading = None
+                    url = future.result()
+                    if url is None:
+                        exhausted = True
+                        continue
+                    host = urlsplit(url).netloc
+                    summaries.setdefault(host, HostSummary())
+                    active.setdefault(host, 0)
+                    pending.setdefault(host, collections.deque()).append(url)
+                    buffered += 1
+                else:
+                    running.discard(future)
+                    future.result()
+    finally:
+        if running:
+            await asyncio.wait(running)
+        pool.shutdown(wait=True)
+        reader.shutdown(wait=False)
+    return summaries
+
+
+def create_run(per_host: int = MAX_PER_HOST, segments: int = SEGMENTS, headless: Optional[bool] = None) -> DownloadRun:
+    """
+    Creates state of downcli invocation, with enough connections for all segments of per_host downloads
+    :param per_host: maximum number of parallel downloads per host (default: MAX_PER_HOST)
+    :param segments: maximum number of parallel segments per file (default: SEGMENTS)
+    :param headless: write progress as NDJSON lines instead of live display, None to do so when not on a terminal (default: None)
+    :return: invocation state
+    """
+    return DownloadRun(per_host * segments, not console.is_terminal if headless is None else headless)
 
 
-def downcli(urls: Iterable[str], destination_dir: str):
+def downcli(urls: Iterable[str], destination_dir: str, segments: int = SEGMENTS, min_segment_size: int = MIN_SEGMENT_SIZE, concurrency: int = MAX_WORKERS, per_host: int = MAX_PER_HOST, retries: int = RETRIES, cache: Optional[DownloadCache] = download_cache, headless: Optional[bool] = None, run: Optional[DownloadRun] = None) -> Dict[str, HostSummary]:
     """
     Runner for DownCLI
-    :param urls: Links to download
+    :param urls: Links to download, may be a lazy iterator
     :param destination_dir: Download Directory
+    :param segments: maximum number of parallel segments per file (default: SEGMENTS)
+    :param min_segment_size: minimum segment size in bytes (default: MIN_SEGMENT_SIZE)
+    :param concurrency: maximum number of parallel downloads (default: MAX_WORKERS)
+    :param per_host: maximum number of parallel downloads per host (default: MAX_PER_HOST)
+    :param retries: number of retries of failed downloads (default: RETRIES)
+    :param cache: download cache, None to disable (default: download_cache)
+    :param headless: write progress as NDJSON lines instead of live display, None to do so when not on a terminal (default: None)
+    :param run: state of this invocation, None to create it from per_host, segments and headless (default: None)
+    :return: summaries by host
+    """
+    if run is None:
+        run = create_run(per_host, segments, headless)
+    thread_id = threading.get_ident()
+    active_runs[thread_id] = run
+    in_main_thread = threading.current_thread() is threading.main_thread()
+    previous_handler = signal.signal(signal.SIGINT, run.cancel) if in_main_thread else None
+    try:
+        with run.tracker:
+            return asyncio.run(download_all(run, urls, destination_dir, concurrency, per_host, retries, segments, min_segment_size, cache))
+    finally:
+        active_runs.pop(thread_id, None)
+        if cache is not None:
+            try:
+                cache.save()
+            except OSError as cache_error:
+                console.log(f"Can't save download cache index: {cache_error}")
+        if in_main_thread:
+            signal.signal(signal.SIGINT, previous_handler)
+
+
+def print_summary(run: DownloadRun, summaries: Dict[str, HostSummary], elapsed: float) -> None:
+    """
+    Prints throughput, failures and bytes per host, as NDJSON line when progress is headless
+    :param run: downcli invocation
+    :param summaries: summaries by host
+    :param elapsed: duration of downloads in seconds
+    """
+    if run.tracker.headless:
+        run.tracker.emit({
+            "event": "summary", "time": time.time(), "elapsed": round(elapsed, 3),
+            "hosts": {host: {"files": summary.files, "failures": summary.failures, "retries": summary.retries, "bytes": summary.bytes, "rate": round(summary.throughput(), 1)} for host, summary in summaries.items()}
+        })
+        return
+    summary_table = Table(title="[bold italic yellow]Summary[/]")
+    for column in ["Host", "Files", "Failed", "Retries", "Bytes", "Throughput"]:
+        summary_table.add_column(column, justify="left" if column == "Host" else "right")
+    for host, summary in sorted(summaries.items()):
+        failed = f"[red]{summary.failures}[/]" if summary.failures else "0"
+        summary_table.add_row(host, str(summary.files), failed, str(summary.retries), str(summary.bytes), f"{summary.throughput() / 1e6:.1f} MB/s")
+    total_bytes = sum(summary.bytes for summary in summaries.values())
+    summary_table.add_row(
+        "[bold]Total[/]",
+        str(sum(summary.files for summary in summaries.values())),
+        str(sum(summary.failures for summary in summaries.values())),
+        str(sum(summary.retries for summary in summaries.values())),
+        str(total_bytes),
+        f"{total_bytes / elapsed / 1e6 if elapsed > 0 else 0:.1f} MB/s",
+        style="bold"
+    )
+    console.print(summary_table)
+
+
+def print_cache_stats(cache: DownloadCache) -> None:
+    """
+    Prints download cache statistics
+    :param cache: download cache
+    """
+    cache.load()
+    stats_table = Table(title="[bold italic yellow]Download Cache[/]")
+    stats_table.add_column("Statistic")
+    stats_table.add_column("Value", justify="right")
+    stats_table.add_row("Directory", cache.directory)
+    stats_table.add_row("URLs", str(len(cache.urls)))
+    stats_table.add_row("Files", str(len(cache.objects)))
+    stats_table.add_row("Size", f"{cache.size()} / {cache.max_size}")
+    for name in ["hits", "stored", "deduplicated", "evicted", "bytes_saved"]:
+        stats_table.add_row(name.replace("_", " ").capitalize(), str(cache.stats.get(name, 0)))
+    console.print(stats_table)
+
+
+def stream_ndjson(run: DownloadRun, work: Callable[[], object]) -> Iterator[str]:
+    """
+    Runs downloads on a thread and yields NDJSON lines of their progress, closing generator cancels downloads
+    :param run: headless downcli invocation
+    :param work: runs downloads and prints summary
+    :return: NDJSON lines, escaped as PyShell output
+    """
+    lines: "queue.Queue[Optional[str]]" = queue.Queue()
+    errors = []
+    run.tracker.sink = lines.put
+
+    def target() -> None:
+        try:
+            work()
+        except BaseException as error:
+            errors.append(error)
+        finally:
+            lines.put(None)
+
+    thread = threading.Thread(target=target, name="downcli-run", daemon=True)
+    thread_id = threading.get_ident()
+    active_runs[thread_id] = run
+    thread.start()
+    try:
+        while True:
+            line = lines.get()
+            if line is None:
+                break
+            yield escape(line)
+    finally:
+        run.cancel()
+        thread.join()
+        if active_runs.get(thread_id) is run:
+            del active_runs[thread_id]
+    if errors:
+        raise errors[0]
+
+
+def downcli_command(arguments: List[str], stdin: Optional[Iterable[str]] = None, terminal: Optional[bool] = None) -> Iterator[str]:
     """
-    with progress:
-        with ThreadPoolExecutor(max_workers=4) as pool:
-            for url in urls:
-                filename = url.split("/")[-1]
-                response = requests.head(url)
-                content_type = requests.head(url).headers['Content-Type'].split(';')[0]
-                if content_type == "text/plain" and len(filename.split(".")) == 1:
-                    filename += '.txt'
-                destination_path = os.path.join(destination_dir, filename)
-                response_code = f"[green]{str(response.status_code)}[/]" if response.status_code == requests.codes.ok else response_code = f"[red]{str(response.status_code)}[/]"
-                task_id = progress.add_task("download", filename=filename, contenttype=content_type, responsecode=response_code, start=False)
-                pool.submit(copy_url, task_id, url, destination_path)
+    Command Line entry for DownCLI
+    Progress is shown live on a terminal, otherwise (piped, redirected or --ndjson) it's the output as NDJSON lines
+    :param arguments: command arguments
+    :param stdin: lines of previous pipeline stage, read by -i - (default: sys.stdin)
+    :param terminal: output is shown on a terminal, None to check console (default: None)
+    :return: NDJSON lines when headless
+    """
+    destination_dir = "./"
+    segments = SEGMENTS
+    min_segment_size = MIN_SEGMENT_SIZE
+    concurrency = MAX_WORKERS
+    per_host = MAX_PER_HOST
+    retries = RETRIES
+    manifest_path = None
+    cache = download_cache
+    headless = None
+    urls = []
+    options = iter(arguments)
+    try:
+        for argument in options:
+            if argument in ["-h", "--help"]:
+                print_downcli_help_msg()
+            elif argument in ["-v", "--version"]:
+                console.print(f"{__package__} v{__version__}")
+                return
+            elif argument in ["-d", "--directory"]:
+                destination_dir = next(options)
+            elif argument in ["-s", "--segments"]:
+                segments = max(int(next(options)), 1)
+            elif argument == "--min-segment-size":
+                min_segment_size = int(next(options))
+            elif argument in ["-c", "--concurrency"]:
+                concurrency = max(int(next(options)), 1)
+            elif argument == "--per-host":
+                per_host = max(int(next(options)), 1)
+            elif argument in ["-r", "--retries"]:
+                retries = max(int(next(options)), 0)
+            elif argument in ["-i", "--input-file"]:
+                manifest_path = next(options)
+            elif argument == "--ndjson":
+                headless = True
+            elif argument == "--no-cache":
+                cache = None
+            elif argument == "--cache-size":
+                download_cache.load()
+                download_cache.max_size = int(next(options))
+                download_cache.evict()
+                download_cache.save()
+            elif argument == "--cache-stats":
+                print_cache_stats(download_cache)
+                return
+            else:
+                urls.append(argument)
+    except (StopIteration, ValueError):
+        print_downcli_help_msg()
+        return
+    if not urls and manifest_path is None:
+        if not arguments:
+            print_downcli_help_msg()
+        return
+    if headless is None:
+        headless = not (console.is_terminal if terminal is None else terminal)
+    manifest = None
+    if manifest_path == "-":
+        manifest = sys.stdin if stdin is None else stdin
+    elif manifest_path is not None:
+        try:
+            manifest = open(manifest_path, "r")
+        except OSError as manifest_error:
+            console.log(f"Can't read {manifest_path}: {manifest_error}")
+            return
+    try:
+        all_urls = itertools.chain(urls, read_manifest(manifest)) if manifest is not None else urls
+        run = create_run(per_host, segments, headless)
+
+        def work() -> None:
+            started = time.monotonic()
+            summaries = downcli(all_urls, destination_dir, segments, min_segment_size, concurrency, per_host, retries, cache, run=run)
+            print_summary(run, summaries, time.monotonic() - started)
+
+        if headless:
+            yield from stream_ndjson(run, work)
+        else:
+            work()
+    finally:
+        if manifest is not None and manifest_path != "-":
+            manifest.close()
+
+
+def cancel_downloads(thread_id: int) -> None:
+    """
+    Stops downloads of the invocation running on a thread, called by PyShell when a background downcli job is killed
+    :param thread_id: identifier of thread running the job
+    """
+    run = active_runs.get(thread_id)
+    if run is not None:
+        run.cancel()
+
+
+downcli_command.cancel = cancel_downloads
+downcli_command.reads_stdin = True
+downcli_command.terminal_output = True
 
 
 def print_downcli_help_msg():
@@ -79,7 +1234,7 @@ def print_downcli_help_msg():
     description_panel = Panel.fit(f"{__description__}\n\tby: {__author__}",
                                   title="Package [italic purple]Description[/]", border_style="green")
     usage_panel = Panel.fit(
-        "\tUsage: [bold blue]downcli[/] [[bold italic]-h, --help[/]] [[bold italic]-d, --directory[/] [purple]DOWNLOAD_DIRECTORY[/]] [bold italic red]URLs[/]",
+        "\tUsage: [bold blue]downcli[/] [[bold italic]-h, --help[/]] [[bold italic]-d, --directory[/] [purple]DOWNLOAD_DIRECTORY[/]] [[bold italic]-s, --segments[/] [purple]N[/]] [[bold italic]--min-segment-size[/] [purple]BYTES[/]] [[bold italic]-c, --concurrency[/] [purple]N[/]] [[bold italic]--per-host[/] [purple]N[/]] [[bold italic]-r, --retries[/] [purple]N[/]] [[bold italic]-i, --input-file[/] [purple]MANIFEST[/]] [[bold italic]--no-cache[/]] [[bold italic]--cache-size[/] [purple]BYTES[/]] [[bold italic]--cache-stats[/]] [[bold italic]--ndjson[/]] [bold italic red]URLs[/]",
         title="Package [italic yellow]Command Line Usage[/]", border_style="purple")
     help_table = Table(title="[bold italic yellow]Usage Help[/]")
     package = Table(title="[bold italic yellow]Package[/]")
@@ -91,6 +1246,16 @@ def print_downcli_help_msg():
     help_table.add_row("Optional", "[yellow]-h[/], [yellow]--help[/]", "Prints [purple]help[/] message and [yellow]exits[/]")
     help_table.add_row("Optional", "[yellow]-v[/], [yellow]--version[/]", "Prints [red]version[/] of plugin and [yellow]exits[/]")
     help_table.add_row("Optional", "[yellow]-d[/], [yellow]--directory[/] [purple]DOWNLOAD_DIRECTORY[/]", "Changes [purple]download[/] directory")
+    help_table.add_row("Optional", "[yellow]-s[/], [yellow]--segments[/] [purple]N[/]", f"Downloads large files in up to [purple]N[/] parallel segments (default: {SEGMENTS})")
+    help_table.add_row("Optional", "[yellow]--min-segment-size[/] [purple]BYTES[/]", f"Smallest [purple]segment[/] size (default: {MIN_SEGMENT_SIZE})")
+    help_table.add_row("Optional", "[yellow]-c[/], [yellow]--concurrency[/] [purple]N[/]", f"Runs up to [purple]N[/] downloads at once (default: {MAX_WORKERS})")
+    help_table.add_row("Optional", "[yellow]--per-host[/] [purple]N[/]", f"Runs up to [purple]N[/] downloads at once from one host (default: {MAX_PER_HOST})")
+    help_table.add_row("Optional", "[yellow]-r[/], [yellow]--retries[/] [purple]N[/]", f"Retries failed downloads [purple]N[/] times with backoff (default: {RETRIES})")
+    help_table.add_row("Optional", "[yellow]-i[/], [yellow]--input-file[/] [purple]MANIFEST[/]", "Reads [bold italic red]URLs[/] from [purple]MANIFEST[/], one per line ([yellow]-[/] reads stdin)")
+    help_table.add_row("Optional", "[yellow]--no-cache[/]", "Downloads without [purple]cache[/] of unchanged files")
+    help_table.add_row("Optional", "[yellow]--cache-size[/] [purple]BYTES[/]", f"Sets [purple]cache[/] size limit, least recently used files are removed (default: {CACHE_MAX_SIZE})")
+    help_table.add_row("Optional", "[yellow]--cache-stats[/]", "Prints [purple]cache[/] statistics and [yellow]exits[/]")
+    help_table.add_row("Optional", "[yellow]--ndjson[/]", "Writes [purple]progress[/] as NDJSON lines (bytes, rate and ETA per download) instead of live display, default when output isn't a terminal")
     help_table.add_row("Positional", "[bold italic red]URLs[/]", "Downloads [bold italic red]URLs[/] ([bold italic blinking red]Required[/])")
     package_info = Table(title="Package Info")
     package_info.add_row(Panel.fit(f"{__package_link__}", title="Package Link", border_style="yellow"))
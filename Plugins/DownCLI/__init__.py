@@ -8,6 +8,7 @@ __package__ = "DownCLI-Plugin"
 __version__ = "0.0.1"
 __package_link__ = "GitHub: https://www.github.com/UltraStudioLTD/DownCLI"
 __description__ = "File Downloader"
+__commands__ = {"downcli": "DownCLI:downcli_command"}
 __author__ = "Luka Mamukashvili (GitHub: UltraStudioLTD)"
 __author_links__ = {
     "GitHub": "https://www.github.com/UltraStudioLTD",
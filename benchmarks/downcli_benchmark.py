@@ -0,0 +1,244 @@
+#!/usr/bin/env python3
+"""DownCLI throughput benchmarks against a local HTTP stand-in server"""
+import argparse
+import json
+import os
+import platform
+import re
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BLOCK = bytes(range(256)) * 4096
+SEND_SIZE = 64 * 1024
+DEFAULT_FILES = 8
+DEFAULT_SIZE = 32 * 1024 * 1024
+SCENARIOS = {
+    "ranges": {},
+    "no-range": {"ranges": False},
+    "no-length": {"content_length": False, "ranges": False},
+    "latency": {"latency": 0.05},
+    "throttled": {"bandwidth": 50 * 1024 * 1024}
+}
+RANGE_HEADER = re.compile(r"bytes=(\d+)-(\d*)$")
+sys.path.insert(0, ROOT_DIR)
+
+
+class Throttle:
+    """Token bucket shared by all connections, like a link of limited bandwidth"""
+    def __init__(self, rate: Optional[float]):
+        self.rate = rate
+        self._next = time.monotonic()
+        self._lock = threading.Lock()
+
+    def wait(self, amount: int) -> None:
+        """
+        Waits until amount bytes may be sent
+        :param amount: bytes to send
+        """
+        if not self.rate:
+            return
+        with self._lock:
+            now = time.monotonic()
+            self._next = max(self._next, now) + amount / self.rate
+            delay = self._next - now
+        if delay > 0:
+            time.sleep(delay)
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    """Serves synthetic files /file<n> of server.file_size bytes"""
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self) -> None:
+        server: StandInServer = self.server
+        server.count_request()
+        if server.latency:
+            time.sleep(server.latency)
+        if not self.path.startswith("/file"):
+            self.send_error(404)
+            return
+        size = server.file_size
+        etag = f'"{self.path[5:]}-{size}"'
+        start, end = 0, size
+        match = RANGE_HEADER.match(self.headers.get("Range", ""))
+        partial = server.ranges and match is not None and self.headers.get("If-Range", etag) == etag
+        if partial:
+            start = int(match.group(1))
+            end = min(int(match.group(2)) + 1 if match.group(2) else size, size)
+            self.send_response(206)
+            self.send_header("Content-Range", f"bytes {start}-{end - 1}/{size}")
+        else:
+            self.send_response(200)
+        self.send_header("Content-Type", "application/octet-stream")
+        self.send_header("ETag", etag)
+        if server.ranges:
+            self.send_header("Accept-Ranges", "bytes")
+        if server.content_length:
+            self.send_header("Content-Length", str(end - start))
+        else:
+            self.send_header("Connection", "close")
+            self.close_connection = True
+        self.end_headers()
+        position = start
+        try:
+            while position < end:
+                length = min(SEND_SIZE, end - position)
+                offset = position % len(BLOCK)
+                chunk = (BLOCK[offset:] + BLOCK)[:length] if offset + length > len(BLOCK) else BLOCK[offset:offset + length]
+                server.throttle.wait(length)
+                self.wfile.write(chunk)
+                position += length
+        except (BrokenPipeError, ConnectionResetError):
+            self.close_connection = True
+
+    def log_message(self, format, *args) -> None:
+        pass
+
+
+class StandInServer(ThreadingHTTPServer):
+    """Local HTTP server standing in for a download host"""
+    daemon_threads = True
+
+    def __init__(self, file_size: int, latency: float = 0.0, content_length: bool = True, ranges: bool = True, bandwidth: Optional[float] = None):
+        super().__init__(("127.0.0.1", 0), StandInHandler)
+        self.file_size = file_size
+        self.latency = latency
+        self.content_length = content_length
+        self.ranges = ranges
+        self.throttle = Throttle(bandwidth)
+        self.requests = 0
+        self._lock = threading.Lock()
+
+    def count_request(self) -> None:
+        """Counts served request"""
+        with self._lock:
+            self.requests += 1
+
+
+def run_client(urls: List[str], destination_dir: str, result_path: str, segments: int, concurrency: int, per_host: int) -> None:
+    """
+    Downloads URLs with DownCLI and writes elapsed time, response times and peak RSS, runs in child process
+    :param urls: URLs to download
+    :param destination_dir: download directory
+    :param result_path: JSON result file
+    :param segments: maximum number of parallel segments per file
+    :param concurrency: maximum number of parallel downloads
+    :param per_host: maximum number of parallel downloads per host
+    """
+    import resource
+    from Plugins.DownCLI import DownCLI
+    ttfbs = []
+    create_session = DownCLI.create_session
+
+    def timed_session(*args, **kwargs):
+        session = create_session(*args, **kwargs)
+        session.hooks["response"].append(lambda response, *_, **__: ttfbs.append(response.elapsed.total_seconds()))
+        return session
+
+    DownCLI.create_session = timed_session
+    started = time.perf_counter()
+    summaries = DownCLI.downcli(urls, destination_dir, segments, DownCLI.MIN_SEGMENT_SIZE, concurrency, per_host, 0, cache=None)
+    elapsed = time.perf_counter() - started
+    with open(result_path, "w") as result_file:
+        json.dump({
+            "elapsed": elapsed,
+            "ttfbs": ttfbs,
+            "failures": sum(summary.failures for summary in summaries.values()),
+            "peak_rss": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+        }, result_file)
+
+
+def run_scenario(name: str, options: Dict[str, object], files: int, file_size: int, args: argparse.Namespace) -> Dict[str, float]:
+    """
+    Serves synthetic files and downloads them with DownCLI in a child process
+    :param name: scenario name
+    :param options: StandInServer options
+    :param files: number of files
+    :param file_size: bytes per file
+    :param args: command line arguments with downcli options
+    :return: metrics
+    """
+    server = StandInServer(file_size, **options)
+    threading.Thread(target=server.serve_forever, name=f"stand-in-{name}", daemon=True).start()
+    work_dir = tempfile.mkdtemp(prefix="downcli-bench-")
+    try:
+        result_path = os.path.join(work_dir, "result.json")
+        urls = [f"http://127.0.0.1:{server.server_address[1]}/file{index}" for index in range(files)]
+        command = [sys.executable, os.path.abspath(__file__), "--client", result_path, "--segments", str(args.segments), "--concurrency", str(args.concurrency), "--per-host", str(args.per_host), *urls]
+        subprocess.run(command, cwd=work_dir, env=dict(os.environ, PYSHELL_HOME=os.path.join(work_dir, "home")), stdout=subprocess.DEVNULL, check=True)
+        with open(result_path, "r") as result_file:
+            result = json.load(result_file)
+        downloaded = sum(os.path.getsize(os.path.join(work_dir, f"file{index}")) for index in range(files) if os.path.exists(os.path.join(work_dir, f"file{index}")))
+    finally:
+        server.shutdown()
+        server.server_close()
+        shutil.rmtree(work_dir, ignore_errors=True)
+    ttfbs = sorted(result["ttfbs"]) or [0.0]
+    return {
+        "mb_per_s": downloaded / result["elapsed"] / 1e6,
+        "seconds": result["elapsed"],
+        "requests_per_file": server.requests / files,
+        "ttfb_median_ms": statistics.median(ttfbs) * 1000,
+        "ttfb_p95_ms": ttfbs[min(int(len(ttfbs) * 0.95), len(ttfbs) - 1)] * 1000,
+        "peak_rss_mb": result["peak_rss"] / 1e6,
+        "failures": result["failures"],
+        "complete": downloaded == files * file_size
+    }
+
+
+def main() -> int:
+    """
+    Main Function
+    :return: exit code, 1 if a download failed
+    """
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--files", type=int, default=DEFAULT_FILES, help="number of synthetic files")
+    parser.add_argument("--size", type=int, default=DEFAULT_SIZE, help="bytes per synthetic file")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS), help="comma separated scenarios: " + ", ".join(SCENARIOS))
+    parser.add_argument("--latency", type=float, help="seconds added before every response (overrides scenarios)")
+    parser.add_argument("--bandwidth", type=float, help="bytes per second shared by all connections (overrides scenarios)")
+    parser.add_argument("--no-content-length", action="store_true", help="omit Content-Length in all scenarios")
+    parser.add_argument("--no-range", action="store_true", help="refuse Range requests in all scenarios")
+    parser.add_argument("--segments", type=int, default=4, help="downcli --segments")
+    parser.add_argument("--concurrency", type=int, default=16, help="downcli --concurrency")
+    parser.add_argument("--per-host", type=int, default=4, help="downcli --per-host")
+    parser.add_argument("--output", default="downcli_bench_output.json", help="results JSON file")
+    parser.add_argument("--client", metavar="RESULT", help=argparse.SUPPRESS)
+    parser.add_argument("urls", nargs="*", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.client:
+        run_client(args.urls, os.getcwd(), args.client, args.segments, args.concurrency, args.per_host)
+        return 0
+
+    results = {}
+    for name in [scenario for scenario in args.scenarios.split(",") if scenario]:
+        options = dict(SCENARIOS[name])
+        if args.latency is not None:
+            options["latency"] = args.latency
+        if args.bandwidth is not None:
+            options["bandwidth"] = args.bandwidth
+        if args.no_content_length:
+            options["content_length"] = False
+        if args.no_range:
+            options["ranges"] = False
+        results[name] = run_scenario(name, options, args.files, args.size, args)
+
+    report = {"python": platform.python_version(), "platform": " ".join(platform.uname()), "files": args.files, "size": args.size, "results": results}
+    with open(args.output, "w") as output_file:
+        json.dump(report, output_file, indent=2, sort_keys=True)
+    print(f"{'scenario':12} {'MB/s':>10} {'requests/file':>14} {'TTFB p50 ms':>12} {'TTFB p95 ms':>12} {'peak RSS MB':>12}")
+    for name, metrics in results.items():
+        print(f"{name:12} {metrics['mb_per_s']:10.1f} {metrics['requests_per_file']:14.2f} {metrics['ttfb_median_ms']:12.2f} {metrics['ttfb_p95_ms']:12.2f} {metrics['peak_rss_mb']:12.1f}" + ("" if metrics["complete"] else "  INCOMPLETE"))
+    return 0 if all(metrics["complete"] and not metrics["failures"] for metrics in results.values()) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
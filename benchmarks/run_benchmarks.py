@@ -0,0 +1,261 @@
+#!/usr/bin/env python3
+"""Startup and per-command benchmarks for PyShell"""
+import argparse
+import contextlib
+import json
+import os
+import platform
+import re
+import selectors
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Callable, Dict, List
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+DEFAULT_SIZES = [1000, 100000, 1000000]
+DEFAULT_THRESHOLD = 0.25
+DEFAULT_MIN_DELTA = 0.0001
+IMPORTED_MODULES = ["pyshell", "Plugins.Als.Als", "Plugins.DownCLI.DownCLI"]
+IMPORTTIME_LINE = re.compile(r"import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+PROMPT_SUFFIX = b"/> "
+sys.path.insert(0, ROOT_DIR)
+
+
+def import_times(module: str) -> Dict[str, float]:
+    """
+    Measures import time of module using -X importtime
+    :param module: module to import
+    :return: cumulative import time in seconds of module and its direct imports
+    """
+    completed = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"], cwd=ROOT_DIR, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, check=True)
+    times = {}
+    children = {}
+    for line in completed.stderr.decode().splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if match is None:
+            continue
+        depth = len(match.group(3)) // 2
+        if depth == 1:
+            children[match.group(4)] = int(match.group(2)) / 1e6
+        elif depth == 0:
+            if match.group(4) == module:
+                times[module] = int(match.group(2)) / 1e6
+                times.update(children)
+            children = {}
+    return times
+
+
+def start_to_prompt(home: str, work_dir: str, timeout: float = 120) -> float:
+    """
+    Measures time from process start to first prompt
+    :param home: PYSHELL_HOME of started shell
+    :param work_dir: working directory of started shell
+    :param timeout: seconds to wait for prompt
+    :return: seconds until prompt was printed
+    """
+    started = time.perf_counter()
+    process = subprocess.Popen([sys.executable, os.path.join(ROOT_DIR, "pyshell.py"), "-i"], cwd=work_dir, env=dict(os.environ, PYSHELL_HOME=home), stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+    selector = selectors.DefaultSelector()
+    selector.register(process.stdout, selectors.EVENT_READ)
+    output = b""
+    try:
+        while not output.rstrip().endswith(PROMPT_SUFFIX.rstrip()):
+            if time.perf_counter() - started > timeout or not selector.select(timeout):
+                raise TimeoutError("shell did not reach prompt")
+            chunk = os.read(process.stdout.fileno(), 65536)
+            if not chunk:
+                raise RuntimeError("shell exited before prompt")
+            output += chunk
+        elapsed = time.perf_counter() - started
+        process.stdin.write(b"exit\n")
+        process.stdin.close()
+        process.wait(timeout)
+    finally:
+        selector.close()
+        if process.poll() is None:
+            process.kill()
+    return elapsed
+
+
+def batch_start(home: str, work_dir: str) -> float:
+    """
+    Measures non-interactive run of a single command
+    :param home: PYSHELL_HOME of started shell
+    :param work_dir: working directory of started shell
+    :return: seconds until process exited
+    """
+    started = time.perf_counter()
+    subprocess.run([sys.executable, os.path.join(ROOT_DIR, "pyshell.py"), "-c", "echo ready"], cwd=work_dir, env=dict(os.environ, PYSHELL_HOME=home), stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=True)
+    return time.perf_counter() - started
+
+
+def measure(function: Callable[[], object], repeat: int = 5, number: int = 1) -> float:
+    """
+    Measures best time of function
+    :param function: function to measure
+    :param repeat: number of measurement rounds
+    :param number: calls per round
+    :return: best seconds per call
+    """
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for _ in range(number):
+            function()
+        best = min(best, (time.perf_counter() - started) / number)
+    return best
+
+
+def command_latencies(work_dir: str, number: int = 500) -> Dict[str, float]:
+    """
+    Measures steady-state latency of command_parser builtins
+    PyShell is imported with PYSHELL_HOME inside work_dir, so set doesn't change the user's configuration
+    :param work_dir: directory used by cd
+    :param number: commands per round
+    :return: seconds per command by benchmark name
+    """
+    os.environ["PYSHELL_HOME"] = os.path.join(work_dir, "latency-home")
+    import pyshell
+    if not pyshell.configuration.path.startswith(work_dir):
+        raise RuntimeError(f"pyshell was imported before PYSHELL_HOME was set, refusing to write {pyshell.configuration.path}")
+    pyshell.variables["HOME_PATH"] = pyshell.variables["CWD"] = work_dir
+    os.chdir(work_dir)
+    commands = {"echo": "echo hello world", "cd.directory": f"cd {work_dir}", "cd.home": "cd", "set": "set PS '$CWD$/> '", "get": "get PS"}
+    latencies = {}
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull), contextlib.redirect_stderr(devnull):
+        for name, command in commands.items():
+            latencies[name] = measure(lambda: pyshell.command_parser(command), number=number)
+            pyshell.flush_logs()
+    pyshell.variables["PS"] = "$USERNAME$@$COMPUTERNAME$:$CWD$ [$STATUS$] $TIME$%H:%M:%S$/TIME$> "
+    latencies["prompt"] = measure(lambda: pyshell.prompt_parser(pyshell.variables["PS"]), number=number)
+    pyshell.configuration.flush()
+    return latencies
+
+
+def build_fixture(root: str, size: int) -> Dict[str, str]:
+    """
+    Builds synthetic directory trees, reusing existing ones
+    :param root: fixtures directory
+    :param size: number of entries
+    :return: paths of "flat" (single directory) and "nested" fixture
+    """
+    paths = {"flat": os.path.join(root, f"flat-{size}"), "nested": os.path.join(root, f"nested-{size}")}
+    if not os.path.isdir(paths["flat"]):
+        os.makedirs(paths["flat"] + ".tmp", exist_ok=True)
+        for index in range(size):
+            open(os.path.join(paths["flat"] + ".tmp", f"file{index}{('.py', '.txt', '.mp3', '.tar.gz')[index % 4]}"), "w").close()
+        os.rename(paths["flat"] + ".tmp", paths["flat"])
+    if not os.path.isdir(paths["nested"]):
+        created = 0
+        directory = paths["nested"] + ".tmp"
+        while created < size:
+            directory = os.path.join(directory if created % 10000 else paths["nested"] + ".tmp", f"dir{created // 1000}")
+            os.makedirs(directory, exist_ok=True)
+            created += 1
+            for index in range(min(999, size - created)):
+                open(os.path.join(directory, f"file{index}.py"), "w").close()
+                created += 1
+        os.rename(paths["nested"] + ".tmp", paths["nested"])
+    return paths
+
+
+def plugin_runs(fixtures: str, sizes: List[int]) -> Dict[str, float]:
+    """
+    Measures als, tree and rich tree over synthetic trees
+    :param fixtures: fixtures directory
+    :param sizes: tree sizes
+    :return: seconds per run by benchmark name
+    """
+    from Plugins.Als import Als
+    results = {}
+    for size in sizes:
+        paths = build_fixture(fixtures, size)
+        repeat = 3 if size <= 100000 else 1
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+            results[f"als.ls.{size}"] = measure(lambda: Als.ls(path=paths["flat"]), repeat)
+            results[f"als.tree.{size}"] = measure(lambda: Als.tree_generator(paths["nested"]), repeat)
+            results[f"als.rich_tree.{size}"] = measure(lambda: Als.rich_tree(paths["nested"]), repeat)
+    return results
+
+
+def compare(results: Dict[str, float], baseline: Dict[str, dict], threshold: float, min_delta: float = DEFAULT_MIN_DELTA) -> List[str]:
+    """
+    Compares results against baseline
+    :param results: measured seconds by benchmark name
+    :param baseline: baseline metrics
+    :param threshold: default allowed slowdown ratio
+    :param min_delta: slowdowns smaller than this many seconds are treated as noise
+    :return: regression messages
+    """
+    regressions = []
+    for name, value in sorted(results.items()):
+        if name not in baseline:
+            continue
+        expected = baseline[name]["value"]
+        allowed = baseline[name].get("threshold", threshold)
+        if expected > 0 and value > expected * (1 + allowed) and value - expected > min_delta:
+            regressions.append(f"{name}: {value * 1000:.3f} ms vs baseline {expected * 1000:.3f} ms (+{(value / expected - 1) * 100:.0f}%, allowed +{allowed * 100:.0f}%)")
+    return regressions
+
+
+def main() -> int:
+    """
+    Main Function
+    :return: exit code, 1 if a benchmark regressed
+    """
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", default=",".join(map(str, DEFAULT_SIZES)), help="comma separated synthetic tree sizes")
+    parser.add_argument("--fixtures", default=os.path.join(tempfile.gettempdir(), "pyshell-bench-fixtures"), help="directory for synthetic trees (reused between runs)")
+    parser.add_argument("--output", default="bench_output.json", help="results JSON file")
+    parser.add_argument("--baseline", default=BASELINE_PATH, help="baseline JSON file")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD, help="default allowed slowdown ratio")
+    parser.add_argument("--min-delta", type=float, default=DEFAULT_MIN_DELTA, help="ignore slowdowns smaller than this many seconds")
+    parser.add_argument("--save-baseline", action="store_true", help="store results as new baseline")
+    parser.add_argument("--skip-startup", action="store_true", help="skip process start benchmarks")
+    args = parser.parse_args()
+    sizes = [int(size) for size in args.sizes.split(",") if size]
+
+    results = {}
+    for module in IMPORTED_MODULES:
+        for name, seconds in import_times(module).items():
+            results[f"import.{module}" if name == module else f"import.{module}/{name}"] = seconds
+    work_dir = tempfile.mkdtemp(prefix="pyshell-bench-")
+    try:
+        if not args.skip_startup:
+            home = os.path.join(work_dir, "home")
+            results["startup.cold"] = start_to_prompt(home, work_dir)
+            results["startup.warm"] = start_to_prompt(home, work_dir)
+            results["startup.batch"] = batch_start(home, work_dir)
+        for name, seconds in command_latencies(work_dir).items():
+            results[f"command.{name}"] = seconds
+    finally:
+        os.chdir(ROOT_DIR)
+        shutil.rmtree(work_dir, ignore_errors=True)
+    results.update(plugin_runs(args.fixtures, sizes))
+
+    report = {"python": platform.python_version(), "platform": " ".join(platform.uname()), "results": results}
+    with open(args.output, "w") as output_file:
+        json.dump(report, output_file, indent=2, sort_keys=True)
+    for name, seconds in sorted(results.items()):
+        print(f"{name:60} {seconds * 1000:12.3f} ms")
+
+    if args.save_baseline:
+        baseline = {name: {"value": seconds} for name, seconds in results.items() if "/" not in name}
+        with open(args.baseline, "w") as baseline_file:
+            json.dump(baseline, baseline_file, indent=2, sort_keys=True)
+        return 0
+    if not os.path.exists(args.baseline):
+        return 0
+    with open(args.baseline, "r") as baseline_file:
+        regressions = compare(results, json.load(baseline_file), args.threshold, args.min_delta)
+    for regression in regressions:
+        print(f"REGRESSION {regression}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -6,45 +6,72 @@ import os.path
 import getpass
 import sys
 import platform
-import requests
 import logging
 import rich
 import time
-import json
 import re
 import argparse
+import collections
+import collections.abc
+import contextlib
+import functools
+import signal
+import subprocess
+import threading
 from math import sin, pi
 from datetime import datetime
+from typing import Iterator, Optional
 from rich import print as printf
-from rich import box
 from rich.console import Console
-from rich.logging import RichHandler
-from rich.syntax import Syntax
+from rich.markup import escape
 from rich.traceback import install as rich_tracebackinstaller
-from rich.table import Table
-from rich.console import RenderGroup
-from rich.panel import Panel
-from rich.live import Live
-from Plugins.DownCLI.DownCLI import *
-from Plugins.Als.Als import *
 import urllib.request
-import speedtest
+try:
+    import readline
+except ImportError:
+    readline = None
+from Core.boot import BootPipeline
+from Core.completion import Completer
+from Core.config import ConfigStore
+from Core.jobs import JobTable
+from Core.logs import flush as flush_logs, logger, redirect_logs, setup_logging
+from Core.output import Output
+from Core.parser import AndOr, Command, CommandList, ParseError, Pipeline, Word, WordPart, parse, to_source, word_source
+from Core.expansion import DirectoryCache, expand_word
+from Core.external import CommandHash, spawn
+from Core.history import History
+from Core.pipeline import drain, hold_streams, plain_text, read_lines, start_feeder
+from Core.plugins import PluginRegistry
+from Core.prompt import render_prompt
 
 rich_tracebackinstaller()
 console = Console()
 
-logging.basicConfig(
-    level="NOTSET",
-    format="%(message)s",
-    datefmt="[%X]",
-    handlers=[RichHandler(rich_tracebacks=True)]
-)
+setup_logging()
 
-variables = {
+plugins = PluginRegistry()
+plugins.scan()
+command_hash = CommandHash()
+directory_cache = DirectoryCache()
+history = History()
+HISTORY_READLINE_LENGTH = 1000
+HISTORY_LIST_LENGTH = 20
+jobs = JobTable()
+
+last_command = {
+    "status": 0,
+    "duration": 0.0
+}
+
+configuration = ConfigStore({
     "PS": "$COMPUTERNAME$@$CWD$/> ",
     "CWD": "",
-    "HOME_PATH": ""
-}
+    "HOME_PATH": "",
+    "OUTPUT_FLUSH": "size"
+}, session_keys=["CWD", "HOME_PATH"])
+variables = configuration.values
+output = Output(console)
+completer = Completer(lambda: list(builtin_commands) + list(plugins.commands), variables, command_hash, directory_cache)
 
 
 def cd(new_directory: str) -> None:
@@ -56,7 +83,7 @@ def cd(new_directory: str) -> None:
     variables["CWD"] = new_directory
 
 
-log = logging.getLogger("rich")
+logging.getLogger("asyncio").setLevel(logging.WARNING)
 
 
 def detect_platform():
@@ -78,10 +105,10 @@ def detect_platform():
 
 def detect_configuration_file() -> bool:
     """
-    Detects if configuration file (conf.json) exists in HOME_PATH
+    Detects if configuration file (conf.json) exists in PyShell's directory
     :return: Result bool
     """
-    return True if os.path.exists("conf.json") else False
+    return configuration.exists()
 
 
 def create_configuration() -> None:
@@ -91,40 +118,28 @@ def create_configuration() -> None:
     if detect_configuration_file():
         logger("Configuration file already exists", "info")
     else:
-        conf = open("conf.json", "x")
+        configuration.save()
         logger("Configuration file created", "info")
-        conf.close()
 
 
 def save_configuration() -> None:
     """
     Saves Configuration to conf.json
     """
-    global variables
-    if detect_configuration_file():
-        os.remove("conf.json")
-        conf = open("conf.json", "w")
-        try:
-            json.dump(variables, conf)
-            logger("Configuration saved successfully!", "success")
-        except Exception:
-            logger("Configuration save failed!", "error")
-        conf.close()
-    else:
-        logger("Configuration file doesn't exists. Creating New...", "info")
-        create_configuration()
+    try:
+        configuration.save()
+        logger("Configuration saved successfully!", "success")
+    except Exception:
+        logger("Configuration save failed!", "error")
 
 
 def read_configuration() -> object:
     """
-    Reads Configuration from conf.json
+    Reads Configuration from conf.json, the file is parsed again only if it changed
     :return: configuration
     """
-    global variables
     if detect_configuration_file():
-        conf = open("conf.json", "r")
-        variables = json.load(conf)
-        conf.close()
+        configuration.load()
         return variables
     else:
         logger("Configuration file doesn't exists. Creating New...", "info")
@@ -158,7 +173,7 @@ def detect_internet_connection():
     :return: detection bool
     """
     try:
-        urllib.request.urlopen('http://google.com')
+        urllib.request.urlopen('http://google.com', timeout=5)
         return True
     except Exception:
         return False
@@ -213,28 +228,6 @@ def detect_internet_connection():
 #                 print(color2+cagain+"\033[0m", end="")
 #     print(end=end)
 
-def logger(message: str, severity: str) -> None:
-    """
-    Log Function
-    :param message: message to print
-    :param severity: level of severity
-    """
-    if severity == "warning":
-        log.warning(f"[bold yellow]{message}[/]", extra={"markup": True})
-    elif severity == "critical":
-        log.critical(f"[bold red]{message}[/]", extra={"markup": True})
-    elif severity == "fatal":
-        log.fatal(f"[bold red blink]{message}[/]", extra={"markup": True})
-    elif severity == "error":
-        log.error(f"[bold orange]{message}[/]", extra={"markup": True})
-    elif severity == "info":
-        log.info(f"[bold cyan]{message}[/]", extra={"markup": True})
-    elif severity == "success":
-        printf(f"[#1a3f5c][{datetime.now().strftime('%H:%M:%S')}][/] [bold green]SUCCESS[/]  [green]{message}[/]")
-    elif severity == "log":
-        printf(f"[gray]{message}[/]")
-
-
 def cwd_parser(cwd: str) -> str:
     """
     Parses CWD
@@ -254,220 +247,788 @@ def prompt_parser(prompt_string: str) -> str:
     :param prompt_string: prompt to parse
     :return: parsed prompt
     """
-    global variables
-    if "$COMPUTERNAME$" in prompt_string:
-        prompt_string = prompt_string.replace("$COMPUTERNAME$", platform.node())
-    if "$USERNAME$" in prompt_string:
-        prompt_string = prompt_string.replace("$USERNAME$", getpass.getuser())
-    if "$CWD$" in prompt_string:
-        if variables["CWD"] == variables["HOME_PATH"]:
-            prompt_string = prompt_string.replace("$CWD$", "~")
-        else:
-            prompt_string = prompt_string.replace("$CWD$", variables["CWD"])
-    if "$TIME$" in prompt_string and "$/TIME$" in prompt_string:
-        tmp1, tmp2 = prompt_string.split("$TIME$")
-        timeformat, tmp2 = tmp2.split("$/TIME$")
-        prompt_string = prompt_string.replace(f"$TIME${timeformat}$/TIME$", datetime.now().strftime(timeformat))
-    return prompt_string
+    running_jobs = sum(1 for job in list(jobs.jobs.values()) if job.status is None)
+    return render_prompt(prompt_string, variables["CWD"], variables["HOME_PATH"], last_command["status"], last_command["duration"], running_jobs)
 
 
-def boot():
+def load_boot_configuration() -> str:
     """
-    Boots Application and get information
+    Loads configuration for boot, creating it if it doesn't exist
+    :return: how configuration was obtained ("read", "generated" or "invalid")
     """
-    global variables
-    with console.status("[bold italic white]Booting[/]...") as status:
-        time.sleep(5)
-        status.update("[bold yellow]Detecting OS (Operating System) details...[/]")
-        sysdetails = platform.uname()
-        time.sleep(1)
-        console.log(f"OS Name: {sysdetails[0]}")
-        time.sleep(1)
-        console.log(f"System Release: {sysdetails[2]}")
-        time.sleep(1)
-        console.log(f"System Version: {sysdetails[3]}")
-        time.sleep(2)
-        status.update("[bold italic yellow]Detecting Computer Details...[/]")
-        time.sleep(1)
-        console.log(f"Computer Name: {sysdetails[1]}")
-        time.sleep(1)
-        console.log(f"Computer Architecture: {sysdetails[4]}")
-        time.sleep(1)
+    if not detect_configuration_file():
+        return "generated"
+    try:
+        configuration.load()
+    except ValueError:
+        return "invalid"
+    return "read"
+
+
+def detect_internet_details() -> dict:
+    """
+    Detects internet connection and, if connected, its speed
+    :return: detection results in dict (connected, download, upload)
+    """
+    details = {"connected": detect_internet_connection(), "download": None, "upload": None}
+    if details["connected"]:
+        import speedtest
+        try:
+            speed = speedtest.Speedtest()
+            details["download"] = speed.download() / 1024 / 1024
+            details["upload"] = speed.upload() / 1024 / 1024
+        except Exception:
+            pass
+    return details
+
+
+def log_boot_fact(stage: str, result) -> None:
+    """
+    Logs result of boot stage
+    :param stage: stage name
+    :param result: stage result
+    """
+    if stage == "os":
+        console.log(f"OS Name: {result[0]}")
+        console.log(f"System Release: {result[2]}")
+        console.log(f"System Version: {result[3]}")
+        console.log(f"Computer Name: {result[1]}")
+        console.log(f"Computer Architecture: {result[4]}")
         console.log(f"UserName: {getpass.getuser()}")
-        time.sleep(1)
         console.log(f"Current Working Directory: {os.getcwd()}")
-        time.sleep(1)
-        status.update("[italic yellow]Detecting if configuration file exists...[/]")
-        time.sleep(3)
-        if detect_configuration_file():
-            status.update("[bold green]Configuration File Exists! Reading Configuration...[/]")
-            conf_file = open("conf.json", "r")
-            variables = json.load(conf_file)
-            conf_file.close()
-            time.sleep(2)
-            status.update("[bold green]Configuration Reading Finished[/]")
-            time.sleep(2)
+    elif stage == "configuration":
+        if result == "read":
+            console.log("[bold green]Configuration Reading Finished[/]")
+        elif result == "generated":
+            console.log("[bold green]Configuration Generated![/]")
         else:
-            status.update("[bold red]Configuration File Does Not Exist! Generating New Configuration...[/]")
-            conf_file = open("conf.json", "x")
-            conf_file.close()
-            time.sleep(2)
-            status.update("[bold green]Configuration Generated![/]")
-            time.sleep(2)
-        variables["CWD"] = variables["HOME_PATH"] = os.getcwd()
+            console.log("[bold red]Configuration File Is Invalid! Using Defaults...[/]")
+    elif stage == "colors":
+        console.log(f"Support for Basic Colors (16 colors): {result[0]}")
+        console.log(f"Support for 256 Colors: {result[1]}")
+        console.log(f"Support for true Colors (16 million colors): {result[2]}")
+    elif stage == "internet":
+        console.log(f"Internet Access: {result['connected']}")
+        if result["download"] is not None:
+            console.log(f"Download speed: {'{:.2f}'.format(result['download'])} Mb/s")
+        if result["upload"] is not None:
+            console.log(f"Upload speed: {'{:.2f}'.format(result['upload'])} Mb/s")
+
+
+def boot(refresh: bool = False):
+    """
+    Boots Application and get information
+    :param refresh: ignore cached boot facts (default: False)
+    """
+    pipeline = BootPipeline()
+    pipeline.add_stage("os", lambda: list(platform.uname()), cacheable=True)
+    pipeline.add_stage("configuration", load_boot_configuration)
+    pipeline.add_stage("colors", lambda: list(detect_color_support()), cacheable=True)
+    pipeline.add_stage("internet", detect_internet_details, cacheable=True)
+    with console.status("[bold italic white]Booting[/]...") as status:
+        def on_complete(stage, result):
+            log_boot_fact(stage, result)
+            status.update(f"[bold yellow]Finished {stage} detection...[/]")
+        started = time.perf_counter()
+        pipeline.run(on_complete, refresh)
         status.update("[bold green]Updating Configuration File...[/]")
-        time.sleep(2)
-        os.remove("conf.json")
-        conf = open("conf.json", "w")
-        json.dump(variables, conf)
-        conf.close()
-        status.update("[bold green]Configuration File Updated![/]")
-        time.sleep(2)
-        status.update("[bold italic white]Detecting[/] [red]C[orange]o[cyan]l[green]o[purple]r[/] Support...[/]")
-        time.sleep(1)
-        colorsupport = detect_color_support()
-        console.log(f"Support for Basic Colors (16 colors): {colorsupport[0]}")
-        time.sleep(1)
-        console.log(f"Support for 256 Colors: {colorsupport[1]}")
-        time.sleep(1)
-        console.log(f"Support for true Colors (16 million colors): {colorsupport[2]}")
-        time.sleep(2)
-        status.update("[bold italic cyan]Detecting Internet Details...[/]")
-        time.sleep(1)
-        if detect_internet_connection():
-            console.log(f"Internet Access: {True}")
-            speed = speedtest.Speedtest()
-            status.update("[bold italic green] Detecting Download Speed...[/]")
-            console.log(f"Download speed: {'{:.2f}'.format(speed.download() / 1024 / 1024)} Mb/s")
-            status.update("[bold italic green] Detecting Upload Speed...[/]")
-            console.log(f"Upload speed: {'{:.2f}'.format(speed.upload() / 1024 / 1024)} Mb/s")
-        else:
-            console.log(f"Internet Access: {False}")
-        status.update("[bold yellow]Finishing Booting...[/]")
-        time.sleep(2)
+        variables["CWD"] = os.getcwd()
+        variables["HOME_PATH"] = os.getcwd()
+        configuration_started = time.perf_counter()
+        try:
+            if configuration.exists():
+                configuration.flush()
+            else:
+                configuration.save()
+        except OSError:
+            logger("Configuration save failed!", "error")
+        pipeline.timings["configuration"] += time.perf_counter() - configuration_started
+    for stage in pipeline.stages:
+        cached = " (cached)" if stage.name in pipeline.cached else ""
+        console.log(f"Boot stage [bold]{stage.name}[/]: {pipeline.timings[stage.name] * 1000:.1f} ms{cached}")
+    console.log(f"Boot total: {(time.perf_counter() - started) * 1000:.1f} ms")
     printf(f"[bold]:heavy_check_mark:[/] [bold italic green]Booting Successful![/]")
-    time.sleep(3)
     main()
 
 
-def command_parser(commands_string: str) -> None:
+builtin_commands = {}
+
+
+def builtin(*names: str, reads_stdin: bool = False):
     """
-    Parses commands from Command Line Prompt
-    :param commands_string: command string to parse
+    Registers function as builtin command
+    :param names: command names
+    :param reads_stdin: pass lines of previous pipeline stage as second argument (default: False)
+    :return: decorator
     """
-    global variables
-    commands = []
-    for command in commands_string.split("&&"):
-        commands.append(command.strip())
-    for command_str in commands:
-        command = command_str.split(" ")[0]
-        arguments = command_str.split(" ")[1:]
-        if command in ["echo", "print"]:
-            console.out(" ".join(arguments))
-        elif command == "cwd":
-            console.out(os.getcwd())
-        elif command == "cd":
-            if len(arguments) == 0:
-                os.chdir(variables["HOME_PATH"])
-                cd(variables["HOME_PATH"])
-            elif len(arguments) == 1:
-                if os.path.isdir(arguments[0]):
-                    os.chdir(arguments[0])
-                    cd(arguments[0])
-                else:
-                    logger("Directory Doesn't Exists!", "error")
-            else:
-                logger("Invalid amount of arguments! Only 1 is passed!", "error")
-        elif command in ["mkdir", "makedir"]:
-            if len(arguments) != 1:
-                logger("Only 1 argument - new directory name, is passed!", "error")
-            else:
-                if os.path.exists(arguments[0]):
-                    logger("Directory already exists", "info")
-                else:
-                    try:
-                        os.mkdir(arguments[0])
-                        logger("Directory created", "success")
-                    except Exception as except_error:
-                        logger(f"Failed to create directory! Exception Encountered: {except_error}", "error")
-        elif command == "eval":
-            if len(arguments) >= 1:
-                printf(eval(''.join(arguments)))
-            else:
-                logger("Need at expression to evaluate", "error")
-        elif command == "get":
-            if len(arguments) != 0:
-                try:
-                    printf(variables[arguments[0]])
-                except Exception:
-                    logger("Invalid Variable!", "error")
-        elif command == "set":
-            if len(arguments) == 2:
-                if arguments[0] in variables:
-                    try:
-                        variables[arguments[0]] = arguments[1]
-                        logger("Variable changed successfully!", "success")
-                    except Exception:
-                        logger("Variable change failed!", "error")
-                else:
-                    logger("Variable doesn't exist!", "error")
-            else:
-                logger("Need Variable and New Setting Arguments!", "error")
-        elif command == "downcli":
-            if len(arguments) >= 1:
-                if arguments[0] in ["-h", "--help"]:
-                    print_downcli_help_msg()
-                    if arguments[1] in ["-d", "--directory"]:
-                        downcli(arguments[3:], arguments[2])
-                    else:
-                        downcli(arguments[1:], "./")
-                elif arguments[0] in ["-d", "--directory"]:
-                    downcli(arguments[2:], arguments[1])
-                else:
-                    downcli(arguments[0:], "./")
-            else:
-                print_downcli_help_msg()
-        elif command == "downcli":
-            if len(arguments) >= 1:
-                if arguments[0] in ["-h", "--help"]:
-                    print_als_help_msg()
-                    if arguments[1] in ["-d", "--directory"]:
-                        downcli(arguments[3:], arguments[2])
-                    else:
-                        downcli(arguments[1:], "./")
-                elif arguments[0] in ["-d", "--directory"]:
-                    downcli(arguments[2:], arguments[1])
-                else:
-                    downcli(arguments[0:], "./")
+    def register(function):
+        function.reads_stdin = reads_stdin
+        for name in names:
+            builtin_commands[name] = function
+        return function
+    return register
+
+
+@builtin("echo", "print")
+def builtin_echo(arguments: list) -> Iterator[str]:
+    """Prints arguments"""
+    yield escape(" ".join(arguments))
+
+
+@builtin("cwd")
+def builtin_cwd(arguments: list) -> Iterator[str]:
+    """Prints current working directory"""
+    yield escape(os.getcwd())
+
+
+@builtin("cd")
+def builtin_cd(arguments: list) -> int:
+    """Changes current working directory"""
+    if len(arguments) == 0:
+        os.chdir(variables["HOME_PATH"])
+        cd(variables["HOME_PATH"])
+    elif len(arguments) == 1:
+        if os.path.isdir(arguments[0]):
+            os.chdir(arguments[0])
+            cd(arguments[0])
+        else:
+            logger("Directory Doesn't Exists!", "error")
+            return 1
+    else:
+        logger("Invalid amount of arguments! Only 1 is passed!", "error")
+        return 1
+    return 0
+
+
+@builtin("mkdir", "makedir")
+def builtin_mkdir(arguments: list) -> int:
+    """Creates directory"""
+    if len(arguments) != 1:
+        logger("Only 1 argument - new directory name, is passed!", "error")
+        return 1
+    if os.path.exists(arguments[0]):
+        logger("Directory already exists", "info")
+        return 0
+    try:
+        os.mkdir(arguments[0])
+        logger("Directory created", "success")
+    except Exception as except_error:
+        logger(f"Failed to create directory! Exception Encountered: {except_error}", "error")
+        return 1
+    return 0
+
+
+@builtin("eval")
+def builtin_eval(arguments: list) -> Iterator[str]:
+    """Evaluates Python expression"""
+    if len(arguments) == 0:
+        logger("Need at expression to evaluate", "error")
+        return 1
+    yield escape(str(eval(" ".join(arguments))))
+
+
+@builtin("get")
+def builtin_get(arguments: list) -> Iterator[str]:
+    """Prints variable"""
+    if len(arguments) != 0:
+        try:
+            value = variables[arguments[0]]
+        except Exception:
+            logger("Invalid Variable!", "error")
+            return 1
+        yield escape(str(value))
+
+
+@builtin("set")
+def builtin_set(arguments: list) -> int:
+    """Changes variable"""
+    if len(arguments) != 2:
+        logger("Need Variable and New Setting Arguments!", "error")
+        return 1
+    if arguments[0] not in variables:
+        logger("Variable doesn't exist!", "error")
+        return 1
+    try:
+        configuration.set(arguments[0], arguments[1])
+        logger("Variable changed successfully!", "success")
+    except Exception:
+        logger("Variable change failed!", "error")
+        return 1
+    return 0
+
+
+@builtin("plugins")
+def builtin_plugins(arguments: list) -> Iterator[str]:
+    """Lists installed plugins"""
+    for plugin in plugins.plugins:
+        yield f"[bold]{plugin.package}[/] v{plugin.version} - {plugin.description} ({', '.join(plugin.commands)})"
+
+
+def line_count(arguments: list) -> Optional[int]:
+    """
+    Parses line count of head and tail: N, -N or -n N
+    :param arguments: command arguments
+    :return: count (default: 10), None if arguments are invalid
+    """
+    if len(arguments) == 2 and arguments[0] == "-n":
+        text = arguments[1]
+    elif len(arguments) == 1:
+        text = arguments[0][1:] if arguments[0].startswith("-") else arguments[0]
+    elif not arguments:
+        return 10
+    else:
+        return None
+    return int(text) if text.isdigit() else None
+
+
+@builtin("head", reads_stdin=True)
+def builtin_head(arguments: list, stdin: Iterator[str]) -> Iterator[str]:
+    """Passes first lines of input (head [-n] N), stops reading input afterwards"""
+    count = line_count(arguments)
+    if count is None:
+        logger("Usage: head [-n] COUNT, COUNT must be a non-negative number", "error")
+        return 1
+    if count > 0:
+        for index, line in enumerate(stdin, 1):
+            yield line
+            if index >= count:
+                break
+
+
+@builtin("tail", reads_stdin=True)
+def builtin_tail(arguments: list, stdin: Iterator[str]) -> Iterator[str]:
+    """Passes last lines of input (tail [-n] N)"""
+    count = line_count(arguments)
+    if count is None:
+        logger("Usage: tail [-n] COUNT, COUNT must be a non-negative number", "error")
+        return 1
+    yield from collections.deque(stdin, maxlen=count)
+
+
+@builtin("hash")
+def builtin_hash(arguments: list) -> Iterator[str]:
+    """Shows, resets or fills remembered PATH lookups"""
+    if arguments == ["-r"]:
+        command_hash.reset()
+        return 0
+    status = 0
+    for name in arguments:
+        if command_hash.lookup(name) is None:
+            logger(f"Command not found: {name}", "error")
+            status = 1
+    if not arguments:
+        if not command_hash.hits:
+            logger("hash table empty", "info")
+        for name, (program, hits) in sorted(command_hash.hits.items()):
+            yield f"{hits:>4}    {escape(program)}"
+    return status
+
+
+@builtin("history")
+def builtin_history(arguments: list) -> Iterator[str]:
+    """Shows newest commands (history [count]) or searches them (history -s TEXT, history -p PREFIX), -v adds details"""
+    verbose = "-v" in arguments
+    arguments = [argument for argument in arguments if argument != "-v"]
+    if not history.opened:
+        history.open(background=False)
+    if len(arguments) == 2 and arguments[0] == "-s":
+        entries = history.search(arguments[1], HISTORY_LIST_LENGTH)
+    elif len(arguments) == 2 and arguments[0] == "-p":
+        entries = history.prefix_search(arguments[1], HISTORY_LIST_LENGTH)
+    elif len(arguments) <= 1 and all(argument.isdigit() for argument in arguments):
+        entries = history.tail(int(arguments[0]) if arguments else HISTORY_LIST_LENGTH)
+    else:
+        logger("Usage: history [-v] [count | -s TEXT | -p PREFIX]", "error")
+        return 1
+    for entry in entries:
+        if verbose:
+            started = datetime.fromtimestamp(entry.timestamp).strftime("%Y-%m-%d %H:%M:%S")
+            yield escape(f"{started}  {entry.status:>3}  {entry.duration:8.3f}s  {entry.cwd}  {entry.command}")
+        else:
+            yield escape(entry.command)
+
+
+def find_job(arguments: list):
+    """
+    Finds job named by first argument (latest job if none given)
+    :param arguments: builtin arguments
+    :return: job, None (after reporting error) if not found
+    """
+    job = jobs.find(arguments[0] if arguments else None)
+    if job is None:
+        logger("No such job!", "error")
+    return job
+
+
+@builtin("jobs")
+def builtin_jobs(arguments: list) -> Iterator[str]:
+    """Lists background jobs"""
+    for job in sorted(jobs.jobs.values(), key=lambda job: job.id):
+        yield f"[{job.id}]  {job.state:<10} {escape(job.command)}"
+
+
+@builtin("fg")
+def builtin_fg(arguments: list) -> int:
+    """Waits for background job in foreground"""
+    job = find_job(arguments)
+    if job is None:
+        return 1
+    console.out(job.command)
+    if job.state == "Stopped":
+        job.signal(signal.SIGCONT)
+    while True:
+        try:
+            return jobs.wait(job)
+        except KeyboardInterrupt:
+            job.signal(signal.SIGINT)
+
+
+@builtin("bg")
+def builtin_bg(arguments: list) -> int:
+    """Resumes stopped background job"""
+    job = find_job(arguments)
+    if job is None:
+        return 1
+    job.signal(signal.SIGCONT)
+    console.out(f"[{job.id}] {job.command} &")
+    return 0
+
+
+@builtin("wait")
+def builtin_wait(arguments: list) -> int:
+    """Waits for background jobs to finish"""
+    waited = [find_job([spec]) for spec in arguments] if arguments else list(jobs.jobs.values())
+    status = 0
+    for job in waited:
+        if job is None:
+            status = 127
+            continue
+        try:
+            status = jobs.wait(job)
+        except KeyboardInterrupt:
+            return 130
+    return status
+
+
+@builtin("kill")
+def builtin_kill(arguments: list) -> int:
+    """Sends signal (default: SIGTERM) to background jobs (%n) or processes"""
+    signal_number = signal.SIGTERM
+    if arguments and arguments[0] == "-s" and len(arguments) > 1:
+        arguments = ["-" + arguments[1]] + arguments[2:]
+    if arguments and arguments[0].startswith("-"):
+        name = arguments.pop(0)[1:].upper()
+        try:
+            signal_number = int(name) if name.isdigit() else getattr(signal, name if name.startswith("SIG") else "SIG" + name)
+        except AttributeError:
+            logger(f"Invalid signal: {name}", "error")
+            return 1
+    if not arguments:
+        logger("Need job (%n) or process ID!", "error")
+        return 1
+    status = 0
+    for target in arguments:
+        try:
+            if target.startswith("%"):
+                job = find_job([target])
+                if job is None:
+                    status = 1
+                    continue
+                job.signal(signal_number)
             else:
-                print_als_help_msg()
-        elif command == "exit":
-            if len(arguments) == 0:
-                exit()
-            elif len(arguments) == 1:
-                sys.exit(int(arguments[0]))
+                os.kill(int(target), signal_number)
+        except (ValueError, OSError) as kill_error:
+            logger(f"Failed to kill {target}! Exception Encountered: {kill_error}", "error")
+            status = 1
+    return status
+
+
+@builtin("exit")
+def builtin_exit(arguments: list) -> int:
+    """Exits shell"""
+    if len(arguments) == 0:
+        sys.exit(0)
+    elif len(arguments) == 1:
+        sys.exit(int(arguments[0]))
+    sys.exit(1)
+
+
+@contextlib.contextmanager
+def redirected(redirections, swap: bool = True):
+    """
+    Opens redirection targets and applies them to sys.stdin, sys.stdout and sys.stderr
+    :param redirections: parsed redirections of command
+    :param swap: replace sys streams, off for background jobs sharing them with the prompt (default: True)
+    :return: opened streams by file descriptor
+    """
+    saved = sys.stdin, sys.stdout, sys.stderr
+    streams = {}
+    try:
+        for redirection in redirections:
+            if redirection.operator == ">&":
+                streams[2] = streams.get(1, sys.stdout)
+                continue
+            mode = {"<": "r", ">": "w", ">>": "a"}[redirection.operator]
+            streams[redirection.fd] = open(redirection.target.value, mode)
+        if swap:
+            sys.stdin = streams.get(0, sys.stdin)
+            sys.stdout = streams.get(1, sys.stdout)
+            sys.stderr = streams.get(2, sys.stderr)
+        yield streams
+    finally:
+        sys.stdin, sys.stdout, sys.stderr = saved
+        for stream in set(streams.values()) - set(saved):
+            stream.close()
+
+
+def run_builtin(handler, arguments: list, command: Command, upstream, last: bool):
+    """
+    Runs builtin or plugin pipeline stage
+    Handlers with reads_stdin get previous stage's lines, handlers with terminal_output get terminal keyword
+    (True when their output is shown on a terminal) and cancel is called when their background job is killed
+    :param handler: command handler
+    :param arguments: command arguments
+    :param command: parsed command
+    :param upstream: previous stage output: None, iterator of lines or readable file descriptor
+    :param last: stage is last in pipeline
+    :return: (output for next stage, exit status)
+    """
+    job = jobs.current()
+    reads_stdin = getattr(handler, "reads_stdin", False)
+    if isinstance(upstream, int):
+        upstream = read_lines(upstream) if reads_stdin else os.close(upstream)
+    elif isinstance(upstream, collections.abc.Generator) and not reads_stdin:
+        upstream.close()
+    if job is not None and getattr(handler, "cancel", None) is not None:
+        job.cancel_callbacks.append(functools.partial(handler.cancel, threading.get_ident()))
+    cancelled = job.cancelled if job is not None else None
+    with redirected(command.redirections, swap=job is None) as streams, redirect_logs(streams.get(2)):
+        keywords = {}
+        if getattr(handler, "terminal_output", False):
+            keywords["terminal"] = last and 1 not in streams and console.is_terminal
+        if reads_stdin:
+            if 0 in streams:
+                upstream = (line.rstrip("\n") for line in streams[0])
+            elif upstream is None:
+                upstream = iter(()) if job is not None else (line.rstrip("\n") for line in sys.stdin)
+            result = handler(arguments, upstream, **keywords)
+        else:
+            result = handler(arguments, **keywords)
+        if not isinstance(result, collections.abc.Iterator):
+            return iter(()), result or 0
+        if 1 in streams:
+            return iter(()), drain(result, lambda line: streams[1].write(plain_text(line) + "\n"), cancelled)
+        if last:
+            output.policy = str(variables.get("OUTPUT_FLUSH", "size"))
+            try:
+                return None, drain(result, output.write_line, cancelled)
+            finally:
+                output.flush()
+        held = [stream for stream in set(streams.values()) if stream is not sys.stdout]
+        streams.clear()
+    return (hold_streams(result, held) if held else result), 0
+
+
+def run_external(arguments: list, command: Command, upstream, last: bool, processes: list):
+    """
+    Starts external program pipeline stage, connected with OS pipes
+    :param arguments: program name and arguments
+    :param command: parsed command
+    :param upstream: previous stage output: None, iterator of lines or readable file descriptor
+    :param last: stage is last in pipeline
+    :param processes: started processes, new process is appended
+    :return: (output for next stage, exit status)
+    """
+    job = jobs.current()
+    if job is not None and job.cancelled.is_set():
+        return None, 130
+    program = command_hash.lookup(arguments[0])
+    if program is None:
+        if isinstance(upstream, int):
+            os.close(upstream)
+        elif isinstance(upstream, collections.abc.Generator):
+            upstream.close()
+        logger(f"Command not found: {arguments[0]}", "error")
+        return None, 127
+    streams = {0: upstream, 1: None, 2: None}
+    opened = []
+    if isinstance(upstream, collections.abc.Iterator):
+        streams[0] = start_feeder(upstream)
+    elif upstream is None and job is not None:
+        streams[0] = os.open(os.devnull, os.O_RDONLY)
+    if isinstance(streams[0], int):
+        opened.append(streams[0])
+    output = None
+    for redirection in command.redirections:
+        if redirection.operator == ">&":
+            streams[2] = subprocess.STDOUT
+            continue
+        flags = {"<": os.O_RDONLY, ">": os.O_WRONLY | os.O_CREAT | os.O_TRUNC, ">>": os.O_WRONLY | os.O_CREAT | os.O_APPEND}[redirection.operator]
+        streams[redirection.fd] = os.open(redirection.target.value, flags, 0o666)
+        opened.append(streams[redirection.fd])
+    if streams[1] is None and not last:
+        output, streams[1] = os.pipe()
+        opened.append(streams[1])
+    try:
+        process_group = None if job is None else (job.process_group or 0)
+        process = spawn([program] + arguments[1:], streams[0], streams[1], streams[2], process_group)
+    except OSError as spawn_error:
+        if output is not None:
+            os.close(output)
+        logger(f"Failed to run {arguments[0]}! Exception Encountered: {spawn_error}", "error")
+        return None, 126
+    finally:
+        for fd in opened:
+            os.close(fd)
+    processes.append(process)
+    if job is not None:
+        job.process_group = job.process_group or process.pid
+        job.processes.append(process)
+        if job.cancelled.is_set():
+            process.send_signal(signal.SIGTERM)
+    return output, None
+
+
+def expand_command(command: Command) -> Command:
+    """
+    Expands words and redirection targets of command
+    :param command: parsed command
+    :return: command with expanded words, each holding one literal argument
+    :raises ValueError: redirection target expands to several files
+    """
+    words = tuple(
+        Word((WordPart(argument, "'"),))
+        for word in command.words
+        for argument in expand_word(word, variables, directory_cache)
+    )
+    redirections = []
+    for redirection in command.redirections:
+        if redirection.target is not None:
+            targets = expand_word(redirection.target, variables, directory_cache)
+            if len(targets) != 1:
+                raise ValueError(f"Ambiguous redirect: {word_source(redirection.target)}")
+            redirection = redirection._replace(target=Word((WordPart(targets[0], "'"),)))
+        redirections.append(redirection)
+    return Command(words, tuple(redirections))
+
+
+def execute_pipeline(pipeline: Pipeline) -> int:
+    """
+    Executes pipeline, builtin stages stream lines lazily and external stages are joined with OS pipes
+    Queued log records of earlier commands are rendered first, so they stay in order with output
+    :param pipeline: parsed pipeline
+    :return: exit status of last stage
+    """
+    if jobs.current() is None:
+        flush_logs()
+    upstream = None
+    status = 0
+    processes = []
+    last_index = len(pipeline.commands) - 1
+    try:
+        for index, command in enumerate(pipeline.commands):
+            command = expand_command(command)
+            arguments = [word.value for word in command.words]
+            if not arguments:
+                with redirected(command.redirections, swap=False):
+                    upstream, status = iter(()), 0
+                continue
+            handler = builtin_commands.get(arguments[0]) or plugins.get(arguments[0])
+            if handler is not None:
+                upstream, status = run_builtin(handler, arguments[1:], command, upstream, index == last_index)
             else:
-                sys.exit(1)
+                upstream, status = run_external(arguments, command, upstream, index == last_index, processes)
+            if upstream is None and index != last_index:
+                upstream = iter(())
+    finally:
+        if isinstance(upstream, int):
+            os.close(upstream)
+        elif isinstance(upstream, collections.abc.Generator):
+            upstream.close()
+        for process in processes:
+            returncode = process.wait()
+            if process is processes[-1] and status is None:
+                status = returncode
+    return status if status is not None else 0
+
+
+def execute_and_or(item: AndOr) -> int:
+    """
+    Executes pipelines joined by && and ||
+    :param item: parsed pipelines
+    :return: exit status of last executed pipeline
+    """
+    status = execute_pipeline(item.pipelines[0])
+    for operator, pipeline in zip(item.operators, item.pipelines[1:]):
+        if (operator == "&&") == (status == 0):
+            status = execute_pipeline(pipeline)
+    return status
+
+
+def execute(command_list: CommandList) -> int:
+    """
+    Executes parsed command line
+    :param command_list: parsed command line
+    :return: exit status of last executed pipeline
+    """
+    status = 0
+    for item in command_list.items:
+        if item.background:
+            job = jobs.submit(to_source(item), functools.partial(execute_and_or, item))
+            printf(f"[{job.id}] {escape(job.command)}")
+            status = 0
         else:
-            logger("Invalid Argument", "error")
-    main()
+            status = execute_and_or(item)
+    return status
+
+
+def command_parser(commands_string: str) -> int:
+    """
+    Parses and executes commands from Command Line Prompt
+    :param commands_string: command string to parse
+    :return: exit status of last executed command
+    """
+    try:
+        command_list = parse(commands_string)
+    except ParseError as parse_error:
+        logger(f"Syntax error: {parse_error}", "error")
+        return 2
+    return execute(command_list)
+
+
+def run_command(command: str) -> int:
+    """
+    Runs command line, reporting errors instead of raising them
+    :param command: command line to run
+    :return: exit status
+    """
+    try:
+        return command_parser(command)
+    except (SystemExit, KeyboardInterrupt):
+        raise
+    except Exception as except_error:
+        logger(f"Command failed! Exception Encountered: {except_error}", "error")
+        return 1
+
+
+def readline_prompt(prompt: str) -> str:
+    """
+    Renders prompt markup for input(), marking escape sequences as zero-width for readline
+    :param prompt: prompt with rich markup
+    :return: prompt with ANSI escape sequences
+    """
+    with console.capture() as capture:
+        console.print(prompt, end="")
+    return re.sub(r"(\x1b\[[0-9;]*m)", "\001\\1\002", capture.get())
+
+
+def setup_line_editing() -> None:
+    """
+    Opens history, loads newest commands into readline and enables tab completion
+    Ctrl-R and the arrow keys search readline's copy of the newest HISTORY_READLINE_LENGTH commands,
+    the whole history file is searched by the history builtin
+    """
+    history.open()
+    completer.warm()
+    if readline is None:
+        return
+    for entry in history.tail(HISTORY_READLINE_LENGTH):
+        readline.add_history(entry.command)
+    readline.set_completer(completer.complete)
+    readline.set_completer_delims(" \t\n;&|<>")
+    if "libedit" in (readline.__doc__ or ""):
+        readline.parse_and_bind("bind ^I rl_complete")
+    else:
+        readline.parse_and_bind("tab: complete")
+        readline.parse_and_bind('"\\e[A": history-search-backward')
+        readline.parse_and_bind('"\\e[B": history-search-forward')
 
 
-def command_line():
+def command_line() -> int:
     """
     Command Line Prompt Function
+    :return: exit status of entered command
     """
-    printf(prompt_parser(variables["PS"]), end="")
-    command = str(input())
-    command_parser(command)
+    flush_logs()
+    for job in jobs.pop_notices():
+        console.out(f"[{job.id}]  {job.state:<10} {job.command}")
+    try:
+        configuration.load()
+    except (OSError, ValueError):
+        pass
+    prompt = prompt_parser(variables["PS"])
+    try:
+        if readline is not None and sys.stdin.isatty():
+            command = str(input(readline_prompt(prompt)))
+        else:
+            printf(prompt, end="")
+            command = str(input())
+    except EOFError:
+        console.out("")
+        sys.exit(0)
+    directory = os.getcwd()
+    started = time.perf_counter()
+    try:
+        last_command["status"] = run_command(command)
+    except KeyboardInterrupt:
+        last_command["status"] = 130
+        raise
+    finally:
+        last_command["duration"] = time.perf_counter() - started
+        if command.strip():
+            try:
+                history.append(command, directory, last_command["status"], last_command["duration"])
+            except OSError:
+                pass
+        completer.warm()
+    return last_command["status"]
 
 
 def main():
     """
     Main Function
     """
-    command_line()
+    setup_line_editing()
+    while True:
+        try:
+            command_line()
+        except KeyboardInterrupt:
+            console.out("")
+
+
+def run_batch(lines) -> int:
+    """
+    Runs commands without interactive boot
+    :param lines: iterable of command lines (script file, stdin or -c argument)
+    :return: exit status of last command
+    """
+    try:
+        configuration.load()
+    except (OSError, ValueError):
+        pass
+    variables["CWD"] = os.getcwd()
+    variables["HOME_PATH"] = os.getcwd()
+    status = 0
+    for line in lines:
+        line = line.strip()
+        if line:
+            status = run_command(line)
+    return status
 
 
 if __name__ == "__main__":
-    boot()
+    argument_parser = argparse.ArgumentParser(description=__doc__)
+    argument_parser.add_argument("-c", dest="command", help="run command line and exit")
+    argument_parser.add_argument("-i", "--interactive", action="store_true", help="boot interactive shell even if stdin is not a terminal")
+    argument_parser.add_argument("--refresh-boot", action="store_true", help="ignore cached boot facts")
+    argument_parser.add_argument("script", nargs="?", help="PyShell script (.pps) to run")
+    cli_arguments = argument_parser.parse_args()
+    if cli_arguments.command is not None:
+        sys.exit(run_batch([cli_arguments.command]))
+    elif cli_arguments.script is not None:
+        with open(cli_arguments.script, "r") as script_file:
+            sys.exit(run_batch(script_file))
+    elif not cli_arguments.interactive and not sys.stdin.isatty():
+        sys.exit(run_batch(sys.stdin))
+    else:
+        boot(cli_arguments.refresh_boot)
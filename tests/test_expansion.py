@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+"""Unit tests for tilde, variable and glob expansion"""
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+
+from Core.expansion import DirectoryCache, escape_glob, expand_word, glob, substitute  # noqa: E402
+from Core.parser import tokenize  # noqa: E402
+
+FILES = [
+    "a.py",
+    "b.py",
+    "c.txt",
+    ".hidden.py",
+    "[x].py",
+    "src/main.py",
+    "src/util.txt",
+    "src/pkg/mod.py",
+    "src/.cache/skip.py",
+    ".git/config.py",
+    "dir with space/d.py"
+]
+
+
+def word(source: str):
+    """
+    Parses single word
+    :param source: word as typed on command line
+    :return: parsed word
+    """
+    tokens = tokenize(source)
+    assert len(tokens) == 1 and tokens[0][0] == "word"
+    return tokens[0][1]
+
+
+class ExpansionTestCase(unittest.TestCase):
+    def setUp(self):
+        self.cwd = os.getcwd()
+        self.root = tempfile.mkdtemp()
+        for name in FILES:
+            path = os.path.join(self.root, name)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            open(path, "w").close()
+        os.chdir(self.root)
+        self.cache = DirectoryCache()
+
+    def tearDown(self):
+        os.chdir(self.cwd)
+        shutil.rmtree(self.root)
+
+    def expand(self, source: str, variables: dict = None) -> list:
+        """
+        Expands word as typed on command line
+        :param source: word
+        :param variables: variables
+        :return: arguments
+        """
+        return expand_word(word(source), variables or {}, self.cache)
+
+
+class GlobTest(ExpansionTestCase):
+    def test_star(self):
+        self.assertEqual(glob("*.py", self.cache), ["[x].py", "a.py", "b.py"])
+
+    def test_question_mark_and_class(self):
+        self.assertEqual(glob("?.py", self.cache), ["a.py", "b.py"])
+        self.assertEqual(glob("[bc].*", self.cache), ["b.py", "c.txt"])
+
+    def test_hidden_files_need_explicit_dot(self):
+        self.assertNotIn(".hidden.py", glob("*", self.cache))
+        self.assertEqual(glob(".*.py", self.cache), [".hidden.py"])
+
+    def test_directories_in_middle_components(self):
+        self.assertEqual(glob("*/*.py", self.cache), ["dir with space/d.py", "src/main.py"])
+
+    def test_trailing_slash_matches_directories(self):
+        self.assertEqual(glob("*/", self.cache), ["dir with space/", "src/"])
+
+    def test_double_star_matches_any_depth(self):
+        self.assertEqual(glob("**/*.py", self.cache),
+                         ["[x].py", "a.py", "b.py", "dir with space/d.py", "src/main.py", "src/pkg/mod.py"])
+        self.assertEqual(glob("src/**/*.py", self.cache), ["src/main.py", "src/pkg/mod.py"])
+
+    def test_trailing_double_star_lists_everything(self):
+        self.assertEqual(glob("src/**", self.cache), ["src/main.py", "src/pkg", "src/pkg/mod.py", "src/util.txt"])
+
+    def test_double_star_skips_hidden_directories(self):
+        matches = glob("**/*.py", self.cache)
+        self.assertFalse(any("/." in match or match.startswith(".") for match in matches))
+
+    def test_dot_components(self):
+        self.assertEqual(glob("./a.*", self.cache), ["./a.py"])
+        self.assertEqual(glob("src/../?.py", self.cache), ["src/../a.py", "src/../b.py"])
+
+    def test_absolute_pattern(self):
+        self.assertEqual(glob(os.path.join(self.root, "src", "*.py"), self.cache),
+                         [os.path.join(self.root, "src", "main.py")])
+
+    def test_no_match(self):
+        self.assertEqual(glob("*.md", self.cache), [])
+        self.assertEqual(glob("missing/*", self.cache), [])
+
+    def test_escaped_magic_matches_literally(self):
+        self.assertEqual(escape_glob("[x]*?"), "[[]x][*][?]")
+        self.assertEqual(glob(escape_glob("[x].py"), self.cache), ["[x].py"])
+
+
+class DirectoryCacheTest(ExpansionTestCase):
+    def test_listing_is_sorted_with_types(self):
+        names = [(entry.name, entry.is_dir) for entry in self.cache.listing("src")]
+        self.assertEqual(names, [(".cache", True), ("main.py", False), ("pkg", True), ("util.txt", False)])
+
+    def test_listing_is_reused_until_mtime_changes(self):
+        listing = self.cache.listing("src")
+        self.assertIs(self.cache.listing("src"), listing)
+        open(os.path.join("src", "new.py"), "w").close()
+        stat = os.stat("src")
+        os.utime("src", ns=(stat.st_atime_ns, stat.st_mtime_ns + 1))
+        self.assertIn("new.py", [entry.name for entry in self.cache.listing("src")])
+
+    def test_missing_directory(self):
+        self.assertEqual(self.cache.listing("missing"), ())
+
+    def test_least_recently_used_listings_are_dropped(self):
+        cache = DirectoryCache(max_directories=1)
+        listing = cache.listing("src")
+        cache.listing(".")
+        self.assertIsNot(cache.listing("src"), listing)
+
+
+class SubstituteTest(unittest.TestCase):
+    def test_known_and_unknown_names(self):
+        self.assertEqual(substitute("$A$-$B$-$", {"A": 1}), "1-$B$-$")
+
+    def test_text_without_references(self):
+        self.assertEqual(substitute("plain", {"plain": 1}), "plain")
+
+
+class ExpandWordTest(ExpansionTestCase):
+    def test_unquoted_glob(self):
+        self.assertEqual(self.expand("?.py"), ["a.py", "b.py"])
+
+    def test_quoted_glob_is_literal(self):
+        self.assertEqual(self.expand("'*.py'"), ["*.py"])
+        self.assertEqual(self.expand('"*.py"'), ["*.py"])
+        self.assertEqual(self.expand(r"\*.py"), ["*.py"])
+
+    def test_quoted_part_matches_literally(self):
+        self.assertEqual(self.expand("'dir with space'/*"), ["dir with space/d.py"])
+        self.assertEqual(self.expand("'[x]'*"), ["[x].py"])
+
+    def test_unmatched_glob_is_kept(self):
+        self.assertEqual(self.expand("*.md"), ["*.md"])
+
+    def test_variables(self):
+        variables = {"NAME": "a", "EXT": "py"}
+        self.assertEqual(self.expand("$NAME$.$EXT$", variables), ["a.py"])
+        self.assertEqual(self.expand('"$NAME$"', variables), ["a"])
+        self.assertEqual(self.expand("'$NAME$'", variables), ["$NAME$"])
+
+    def test_glob_from_variable(self):
+        self.assertEqual(self.expand("$PATTERN$", {"PATTERN": "?.py"}), ["a.py", "b.py"])
+        self.assertEqual(self.expand('"$PATTERN$"', {"PATTERN": "?.py"}), ["?.py"])
+
+    def test_tilde(self):
+        variables = {"HOME_PATH": self.root}
+        self.assertEqual(self.expand("~", variables), [self.root])
+        self.assertEqual(self.expand("~/src/*.py", variables), [os.path.join(self.root, "src", "main.py")])
+        self.assertEqual(self.expand("'~'", variables), ["~"])
+        self.assertEqual(self.expand("a~", variables), ["a~"])
+
+    def test_empty_words(self):
+        self.assertEqual(self.expand("$EMPTY$", {"EMPTY": ""}), [])
+        self.assertEqual(self.expand("''"), [""])
+        self.assertEqual(self.expand('"$EMPTY$"', {"EMPTY": ""}), [""])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+"""Unit tests for the persistent command history"""
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+
+from Core import history as history_module  # noqa: E402
+from Core.history import Entry, History, escape_field, format_entry, parse_entry, unescape_field  # noqa: E402
+
+COMMANDS = ["ls", "git status", "git log", "echo git", "ls -la", "git status", "cd src", "git commit"]
+
+
+class FieldTest(unittest.TestCase):
+    def test_escape_round_trip(self):
+        for text in ["plain", "a\tb", "a\nb", "back\\slash", "\\t literal", "\\"]:
+            with self.subTest(text=text):
+                escaped = escape_field(text)
+                self.assertNotIn("\t", escaped)
+                self.assertNotIn("\n", escaped)
+                self.assertEqual(unescape_field(escaped), text)
+
+    def test_entry_round_trip(self):
+        entry = Entry("echo 'a\tb'\necho c", 1700000000.5, 2, 0.25, "/tmp/x y")
+        line = format_entry(entry)
+        self.assertEqual(line.count(b"\n"), 1)
+        self.assertEqual(parse_entry(line.rstrip(b"\n")), entry)
+
+    def test_malformed_lines(self):
+        self.assertIsNone(parse_entry(b"ls"))
+        self.assertIsNone(parse_entry(b"ls\tnot a time\t0\t0\t/"))
+        self.assertIsNone(parse_entry(b"ls\t1\t0\t0\t/\textra"))
+
+
+class HistoryTestCase(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, "history")
+        self.write(COMMANDS)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def write(self, commands: list) -> None:
+        """
+        Writes history file, entries get increasing timestamps and their position as status
+        :param commands: command lines, oldest first
+        """
+        with open(self.path, "wb") as history_file:
+            for position, command in enumerate(commands):
+                history_file.write(format_entry(Entry(command, 1000.0 + position, position, 0.0, "/")))
+
+    def open(self, **options) -> History:
+        """
+        Opens history at test path and builds its index
+        :return: history
+        """
+        history = History(self.path, **options)
+        history.open(background=False)
+        return history
+
+
+class HistoryTest(HistoryTestCase):
+    def test_count(self):
+        self.assertEqual(self.open().count, len(COMMANDS))
+
+    def test_tail(self):
+        history = self.open()
+        self.assertEqual([entry.command for entry in history.tail(3)], COMMANDS[-3:])
+        self.assertEqual([entry.command for entry in history.tail(100)], COMMANDS)
+        self.assertEqual(history.tail(0), [])
+
+    def test_tail_includes_session_entries(self):
+        history = self.open()
+        history.append("pwd", "/home", 0, 0.1)
+        entries = history.tail(2)
+        self.assertEqual([entry.command for entry in entries], ["git commit", "pwd"])
+        self.assertEqual(entries[1].cwd, "/home")
+
+    def test_append_writes_file(self):
+        history = self.open()
+        history.append("multi\nline\tcommand", "/", 1, 0.5)
+        self.assertEqual(self.open().tail(1)[0].command, "multi\nline\tcommand")
+        self.assertEqual(history.count, len(COMMANDS))
+
+    def test_missing_file(self):
+        history = History(os.path.join(self.directory, "missing", "history"))
+        history.open(background=False)
+        self.assertEqual(history.count, 0)
+        self.assertEqual(history.tail(5), [])
+        self.assertEqual(history.prefix_search("ls"), [])
+        self.assertEqual(history.search("ls"), [])
+        history.append("ls", "/", 0, 0.0)
+        self.assertEqual([entry.command for entry in history.prefix_search("l")], ["ls"])
+
+    def test_malformed_lines_are_skipped(self):
+        with open(self.path, "ab") as history_file:
+            history_file.write(b"garbage without fields\n")
+        history = self.open()
+        self.assertEqual(history.tail(1)[0].command, "git commit")
+        self.assertEqual([entry.command for entry in history.prefix_search("git c")], ["git commit"])
+
+
+class PrefixSearchTest(HistoryTestCase):
+    def check(self, history: History) -> None:
+        """
+        Checks prefix search results, shared by indexed and scanning searches
+        :param history: opened history
+        """
+        self.assertEqual([entry.command for entry in history.prefix_search("git")], ["git commit", "git status", "git log"])
+        self.assertEqual(history.prefix_search("git status")[0].status, 5)
+        self.assertEqual([entry.command for entry in history.prefix_search("ls")], ["ls -la", "ls"])
+        self.assertEqual([entry.command for entry in history.prefix_search("git", limit=1)], ["git commit"])
+        self.assertEqual(history.prefix_search("svn"), [])
+        self.assertEqual(history.prefix_search("status"), [])
+
+    def test_indexed(self):
+        self.check(self.open())
+
+    def test_scanning(self):
+        with mock.patch.object(history_module, "PREFIX_SCAN_RATIO", 0):
+            self.check(self.open())
+
+    def test_before_index_is_ready(self):
+        history = History(self.path)
+        with mock.patch.object(History, "_prepare"):
+            history.open(background=False)
+        self.check(history)
+
+    def test_first_line(self):
+        history = self.open()
+        self.assertEqual([entry.command for entry in history.prefix_search("l", limit=5)], ["ls -la", "ls"])
+
+    def test_session_entries_come_first(self):
+        history = self.open()
+        history.append("git push", "/", 0, 0.0)
+        history.append("git log", "/", 0, 0.0)
+        self.assertEqual([entry.command for entry in history.prefix_search("git")],
+                         ["git log", "git push", "git commit", "git status"])
+
+    def test_escaped_prefix(self):
+        self.write(["echo a\tb", "echo a b"])
+        self.assertEqual([entry.command for entry in self.open().prefix_search("echo a\t")], ["echo a\tb"])
+
+
+class SearchTest(HistoryTestCase):
+    def test_substring(self):
+        history = self.open()
+        self.assertEqual([entry.command for entry in history.search("git")],
+                         ["git commit", "git status", "echo git", "git log"])
+
+    def test_limit(self):
+        self.assertEqual([entry.command for entry in self.open().search("s", limit=2)], ["cd src", "git status"])
+
+    def test_cwd_and_numbers_are_not_matched(self):
+        self.write(["ls"])
+        history = self.open()
+        self.assertEqual(history.search("/"), [])
+        self.assertEqual(history.search("1000"), [])
+
+    def test_session_entries_come_first(self):
+        history = self.open()
+        history.append("grep git", "/", 0, 0.0)
+        self.assertEqual(history.search("git")[0].command, "grep git")
+
+
+class CompactTest(HistoryTestCase):
+    def test_keeps_newest_entry_of_each_command(self):
+        history = self.open()
+        history.compact()
+        self.assertEqual([entry.command for entry in history.tail(100)],
+                         ["ls", "git log", "echo git", "ls -la", "git status", "cd src", "git commit"])
+        self.assertEqual(history.count, len(set(COMMANDS)))
+        self.assertEqual(history.prefix_search("git status")[0].status, 5)
+
+    def test_max_entries(self):
+        history = self.open(max_entries=3)
+        self.assertEqual([entry.command for entry in history.tail(100)], ["git status", "cd src", "git commit"])
+        self.assertEqual([entry.command for entry in history.prefix_search("ls")], [])
+
+    def test_open_compacts_duplicated_history(self):
+        self.write(["ls", "pwd"] * 50)
+        with mock.patch.object(history_module, "COMPACT_MIN_ENTRIES", 10):
+            history = self.open()
+        self.assertEqual(history.count, 2)
+        with open(self.path, "rb") as history_file:
+            self.assertEqual(history_file.read().count(b"\n"), 2)
+
+    def test_leaves_no_temporary_files(self):
+        self.open().compact()
+        self.assertEqual(sorted(os.listdir(self.directory)), ["history", "history.lock"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+"""Unit tests for the command line lexer and parser"""
+import os
+import sys
+import unittest
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+
+from Core.parser import ParseError, Redirection, WordPart, parse, to_source, tokenize  # noqa: E402
+
+
+def words(source: str) -> list:
+    """
+    Values of word tokens in command line
+    :param source: command line
+    :return: word values
+    """
+    return [value.value for kind, value in tokenize(source) if kind == "word"]
+
+
+def single(source: str):
+    """
+    Parses command line made of one simple command
+    :param source: command line
+    :return: parsed command
+    """
+    items = parse(source).items
+    assert len(items) == 1 and len(items[0].pipelines) == 1 and len(items[0].pipelines[0].commands) == 1
+    return items[0].pipelines[0].commands[0]
+
+
+class TokenizeTest(unittest.TestCase):
+    def test_whitespace_splits_words(self):
+        self.assertEqual(words("  echo \t a   b "), ["echo", "a", "b"])
+
+    def test_empty_line(self):
+        self.assertEqual(tokenize(""), [])
+        self.assertEqual(tokenize("   "), [])
+
+    def test_single_quotes_are_literal(self):
+        self.assertEqual(words("echo 'a  b' '$HOME' '\\n'"), ["echo", "a  b", "$HOME", "\\n"])
+
+    def test_double_quotes_keep_spaces(self):
+        self.assertEqual(words('echo "a  b" "it\'s"'), ["echo", "a  b", "it's"])
+
+    def test_double_quote_escapes(self):
+        self.assertEqual(words(r'echo "a\"b" "c\\d" "\$x" "e\f"'), ["echo", 'a"b', "c\\d", "$x", "e\\f"])
+
+    def test_empty_quotes_make_word(self):
+        self.assertEqual(words("echo '' \"\""), ["echo", "", ""])
+
+    def test_backslash_escapes_next_character(self):
+        self.assertEqual(words(r"echo a\ b \; \|"), ["echo", "a b", ";", "|"])
+
+    def test_line_continuation(self):
+        self.assertEqual(words("echo a\\\nb"), ["echo", "ab"])
+        self.assertEqual(words('echo "a\\\nb"'), ["echo", "ab"])
+
+    def test_adjacent_parts_join_into_one_word(self):
+        token = tokenize("a'b c'\"d\"e")
+        self.assertEqual(len(token), 1)
+        word = token[0][1]
+        self.assertEqual(word.value, "ab cde")
+        self.assertEqual(word.parts, (WordPart("a", ""), WordPart("b c", "'"), WordPart("d", '"'), WordPart("e", "")))
+        self.assertTrue(word.quoted)
+
+    def test_unquoted_word_is_not_quoted(self):
+        self.assertFalse(tokenize("*.py")[0][1].quoted)
+
+    def test_comments(self):
+        self.assertEqual(words("echo a # b c"), ["echo", "a"])
+        self.assertEqual(words("echo a#b"), ["echo", "a#b"])
+        self.assertEqual(words("echo '#a'"), ["echo", "#a"])
+        self.assertEqual(tokenize("# a\necho b")[1:], [("word", tokenize("echo")[0][1]), ("word", tokenize("b")[0][1])])
+
+    def test_operators(self):
+        self.assertEqual([value for kind, value in tokenize("a&&b||c;d|e&f") if kind == "op"], ["&&", "||", ";", "|", "&"])
+
+    def test_quoted_operators_are_words(self):
+        self.assertEqual(words("echo '&&' \"|\" ';'"), ["echo", "&&", "|", ";"])
+
+    def test_redirections(self):
+        tokens = tokenize("a<in >out >>log 2>err 2>>errlog 2>&1")
+        self.assertEqual([value for kind, value in tokens if kind == "redirect"], ["<", ">", ">>", "2>", "2>>", "2>&1"])
+
+    def test_two_inside_word_is_not_redirection(self):
+        self.assertEqual(tokenize("a2>b"), [("word", tokenize("a2")[0][1]), ("redirect", ">"), ("word", tokenize("b")[0][1])])
+        self.assertEqual(words("echo 2"), ["echo", "2"])
+
+    def test_unterminated_quotes(self):
+        with self.assertRaises(ParseError):
+            tokenize("echo 'a")
+        with self.assertRaises(ParseError):
+            tokenize('echo "a')
+        with self.assertRaises(ParseError):
+            tokenize('echo "a\\"')
+
+
+class ParseTest(unittest.TestCase):
+    def test_simple_command(self):
+        command = single("echo a b")
+        self.assertEqual([word.value for word in command.words], ["echo", "a", "b"])
+        self.assertEqual(command.redirections, ())
+
+    def test_separators(self):
+        items = parse("a; b & c\nd").items
+        self.assertEqual(len(items), 4)
+        self.assertEqual([item.background for item in items], [False, True, False, False])
+
+    def test_trailing_separators_and_blank_lines(self):
+        self.assertEqual(len(parse("a;").items), 1)
+        self.assertEqual(len(parse("\n\na\n\n").items), 1)
+        self.assertEqual(parse("").items, ())
+        self.assertTrue(parse("a &").items[0].background)
+
+    def test_and_or(self):
+        item = parse("a && b || c").items[0]
+        self.assertEqual(len(item.pipelines), 3)
+        self.assertEqual(item.operators, ("&&", "||"))
+        self.assertFalse(item.background)
+
+    def test_newline_after_and_or_and_pipe(self):
+        item = parse("a &&\nb |\nc").items[0]
+        self.assertEqual(item.operators, ("&&",))
+        self.assertEqual(len(item.pipelines[1].commands), 2)
+
+    def test_pipeline(self):
+        pipeline = parse("a | b x | c").items[0].pipelines[0]
+        self.assertEqual([[word.value for word in command.words] for command in pipeline.commands],
+                         [["a"], ["b", "x"], ["c"]])
+
+    def test_background_applies_to_whole_and_or(self):
+        items = parse("a && b & c").items
+        self.assertTrue(items[0].background)
+        self.assertEqual(len(items[0].pipelines), 2)
+        self.assertFalse(items[1].background)
+
+    def test_redirections(self):
+        command = single("sort < in > out 2>> err")
+        self.assertEqual([word.value for word in command.words], ["sort"])
+        self.assertEqual([(redirection.fd, redirection.operator, redirection.target.value)
+                          for redirection in command.redirections],
+                         [(0, "<", "in"), (1, ">", "out"), (2, ">>", "err")])
+
+    def test_stderr_to_stdout(self):
+        command = single("a > out 2>&1")
+        self.assertEqual(command.redirections[1], Redirection(2, ">&", None))
+
+    def test_redirection_without_command(self):
+        command = single("> out")
+        self.assertEqual(command.words, ())
+        self.assertEqual(command.redirections[0].target.value, "out")
+
+    def test_quoted_redirection_target(self):
+        self.assertEqual(single("cat > 'a b'").redirections[0].target.value, "a b")
+
+    def test_syntax_errors(self):
+        for source in ["| a", "a |", "a &&", "a || ;", "; a", "a ;; b", "a >", "a > | b", "a < &", "&"]:
+            with self.subTest(source=source), self.assertRaises(ParseError):
+                parse(source)
+
+    def test_parse_error_is_value_error(self):
+        self.assertTrue(issubclass(ParseError, ValueError))
+
+    def test_results_are_cached(self):
+        self.assertIs(parse("echo cached"), parse("echo cached"))
+
+
+class ToSourceTest(unittest.TestCase):
+    def round_trip(self, source: str) -> str:
+        """
+        Formats parsed command line back into text
+        :param source: command line of one item
+        :return: formatted command line
+        """
+        return to_source(parse(source).items[0])
+
+    def test_plain(self):
+        self.assertEqual(self.round_trip("a  x|b&&c  ||  d"), "a x | b && c || d")
+
+    def test_redirections(self):
+        self.assertEqual(self.round_trip("a <in >out 2>>err 2>&1"), "a < in > out 2>> err 2>&1")
+
+    def test_quoting_is_kept(self):
+        for source in ["echo 'a b'", 'echo "$HOME x"', "echo '*.py'", "echo a'b'\"c\""]:
+            with self.subTest(source=source):
+                formatted = single(self.round_trip(source))
+                self.assertEqual([(word.value, word.quoted) for word in formatted.words[1:]],
+                                 [(word.value, word.quoted) for word in single(source).words[1:]])
+
+    def test_escapes_survive(self):
+        formatted = self.round_trip(r'echo "a\"b" c\ d')
+        self.assertEqual([word.value for word in single(formatted).words], ["echo", 'a"b', "c d"])
+
+
+if __name__ == "__main__":
+    unittest.main()